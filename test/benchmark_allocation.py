@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+'''
+Benchmark of the memory allocated to write the Galaxy XML of the test entries, with the
+shared EDAM to Galaxy mapping and with a mapping cloned for every function as before
+(not run by the unit tests).
+
+    python test/benchmark_allocation.py [ENTRY.json ...]
+'''
+
+#  Import  ------------------------------
+
+# General libraries
+import os
+import sys
+import glob
+import json
+import logging
+import shutil
+import tempfile
+import tracemalloc
+
+# Class and Objects
+from tooldog import main
+from tooldog.annotate.edam_to_galaxy import EdamToGalaxy, get_mapping
+
+#  Constant(s)  ------------------------------
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+#  Function(s)  ------------------------------
+
+
+class ClonedMapping(EdamToGalaxy):
+    '''
+    Mapping copied with the tools, as it was before the mapping was shared.
+    '''
+    __copy__ = None
+    __deepcopy__ = None
+
+
+def load_entry(path):
+    '''
+    Load an entry, keeping its DOIs as given so nothing is requested.
+    '''
+    with open(path, 'r') as entry_file:
+        biotool = main.json_to_biotool(json.load(entry_file))
+    for publication in biotool.informations.publications:
+        publication.doi = publication.stored_doi
+    return biotool
+
+
+def measure(biotool, etog, outdir):
+    '''
+    Write the XML of an entry and return the memory allocated (current and peak).
+    '''
+    tracemalloc.start()
+    main.write_xml(biotool, outfile=os.path.join(outdir, biotool.tool_id + '.xml'),
+                   etog=etog)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, peak
+
+
+def main_benchmark():
+    '''
+    Compare the peak of memory allocated per entry.
+    '''
+    logging.disable(logging.INFO)
+    paths = sys.argv[1:] or sorted(glob.glob(os.path.join(TEST_DIR, '*.json')))
+    shared = get_mapping()
+    cloned = ClonedMapping(use_compact=False)
+    outdir = tempfile.mkdtemp()
+    try:
+        print('%-20s %10s %14s %14s' % ('entry', 'functions', 'cloned (KiB)',
+                                        'shared (KiB)'))
+        for path in paths:
+            biotool = load_entry(path)
+            peaks = [measure(biotool, etog, outdir)[1] for etog in (cloned, shared)]
+            print('%-20s %10d %14.1f %14.1f' % (biotool.tool_id[:20], len(biotool.functions),
+                                                peaks[0] / 1024, peaks[1] / 1024))
+    finally:
+        shutil.rmtree(outdir)
+
+
+if __name__ == "__main__":
+    main_benchmark()
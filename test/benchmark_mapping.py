@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+'''
+Benchmark of the generation of the EDAM to Galaxy datatypes mapping on a synthetic
+ontology (not run by the unit tests).
+
+    python test/benchmark_mapping.py [NB_TERMS]
+'''
+
+#  Import  ------------------------------
+
+# General libraries
+import sys
+import time
+import random
+
+# Class and Objects
+from tooldog.annotate.edam_to_galaxy import map_hierarchy
+
+#  Constant(s)  ------------------------------
+
+NB_TERMS = 100000
+MAPPED_RATIO = 0.02  # Part of the terms described by Galaxy
+
+#  Function(s)  ------------------------------
+
+
+def synthetic_ontology(nb_terms, seed=42):
+    '''
+    Build a random hierarchy where each term has one to three parents among the previous
+    terms (a few roots), and a Galaxy mapping for some of the terms.
+    '''
+    rand = random.Random(seed)
+    hierarchy = {}
+    galaxy_mapping = {}
+    for index in range(nb_terms):
+        term = 'format_' + str(index)
+        if index < 10:
+            hierarchy[term] = []
+        else:
+            parents = set(rand.randrange(max(0, index - 50), index)
+                          for _ in range(rand.randint(1, 3)))
+            hierarchy[term] = ['format_' + str(parent) for parent in sorted(parents)]
+        if rand.random() < MAPPED_RATIO:
+            galaxy_mapping[term] = ['ext' + str(index % 97)]
+            if rand.random() < 0.1:
+                galaxy_mapping[term].append('ext' + str(index % 89))
+    return hierarchy, galaxy_mapping
+
+
+def main():
+    '''
+    Time the mapping of the synthetic ontology.
+    '''
+    nb_terms = int(sys.argv[1]) if len(sys.argv) > 1 else NB_TERMS
+    hierarchy, galaxy_mapping = synthetic_ontology(nb_terms)
+    start = time.perf_counter()
+    mapping, report = map_hierarchy(hierarchy, galaxy_mapping, lambda datatypes: datatypes[0])
+    elapsed = time.perf_counter() - start
+    print(str(nb_terms) + " terms mapped in " + '%.3f' % elapsed + "s (" +
+          str(len(report['unmapped'])) + " unmapped, " + str(len(report['cycles'])) +
+          " cycles)")
+
+
+if __name__ == "__main__":
+    main()
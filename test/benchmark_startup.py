@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+'''
+Benchmark of the cold startup of `tooldog --cwl --annotate ENTRY.json` (imports, parsing
+of the arguments and of the entry, loading of the CWL backend) in new interpreters. Exits
+with an error if the startup is over budget or loads libraries of other backends (not run
+by the unit tests).
+
+    python test/benchmark_startup.py [BUDGET_MS]
+'''
+
+#  Import  ------------------------------
+
+# General libraries
+import os
+import sys
+import time
+import statistics
+import subprocess
+
+#  Constant(s)  ------------------------------
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+ENTRY = os.path.join(TEST_DIR, 'MEMHDX.json')
+RUNS = 10
+BUDGET_MS = 150  # Startup time on top of the interpreter
+# Libraries a CWL annotation must not load
+FORBIDDEN = ['galaxyxml', 'rdflib', 'docker', 'requests', 'lxml']
+
+STARTUP = '''
+import sys
+from tooldog import main
+sys.argv = ['tooldog', '--cwl', '--annotate', %r]
+args = main.parse_arguments()
+biotool = main.json_to_biotool(main.json_from_entry(args.biotool_entry[0]))
+from tooldog.annotate import cwl
+print(','.join(module for module in %r if module in sys.modules))
+''' % (ENTRY, FORBIDDEN)
+
+#  Function(s)  ------------------------------
+
+
+def run_python(code):
+    '''
+    Run code in a new interpreter and return its output and the elapsed time in ms.
+    '''
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(TEST_DIR))
+    start = time.perf_counter()
+    output = subprocess.check_output([sys.executable, '-c', code], env=env)
+    return output.decode('utf-8').strip(), (time.perf_counter() - start) * 1000
+
+
+def main():
+    '''
+    Compare the median startup time with the budget.
+    '''
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else BUDGET_MS
+    interpreter = statistics.median(run_python('pass')[1] for _ in range(RUNS))
+    timings = []
+    loaded = ''
+    for _ in range(RUNS):
+        loaded, elapsed = run_python(STARTUP)
+        timings.append(elapsed - interpreter)
+    startup = statistics.median(timings)
+    print("Startup of --cwl --annotate: " + '%.1f' % startup + " ms (interpreter: " +
+          '%.1f' % interpreter + " ms, budget: " + '%.0f' % budget + " ms)")
+    failed = False
+    if loaded:
+        print("Libraries of other backends loaded: " + loaded)
+        failed = True
+    if startup > budget:
+        print("Startup over budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
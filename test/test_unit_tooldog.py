@@ -7,17 +7,36 @@ Unit tests for ToolDog
 #  Import  ------------------------------
 
 # General libraries
+import io
+import copy
 import os
+import sys
+import stat
+import gzip
 import json
+import shutil
+import tarfile
 import filecmp
+import argparse
+import tempfile
 import unittest
+import subprocess
+import threading
+import time
+import socketserver
+import urllib.parse
+from http.server import HTTPServer, BaseHTTPRequestHandler
 
 # External libraries
+import rdflib
+import requests
 import requests_mock
 
 # Class and Objects
-from tooldog import main, biotool_model
-from tooldog.annotate import galaxy, cwl, edam_to_galaxy
+from tooldog import main, biotool_model, batch, fetch, dump, readers, http_cache, \
+    http_client, doi, serve, manifest, render_cache
+from tooldog.annotate import galaxy, cwl, edam_to_galaxy, edam_snapshot, edam_owl, \
+    compact_mapping
 
 #  Constant(s)  ------------------------------
 
@@ -33,6 +52,72 @@ EDAM_FORMAT = {'uri':'http://edamontology.org/format_1930',
 
 #  Function(s)  ------------------------------
 
+def make_args(**kwargs):
+    '''
+    Build parsed arguments of ToolDog with default values.
+    '''
+    args = {'biotool_entry': [], 'ANALYSE': False, 'ANNOTATE': True, 'ORI_DESC': None,
+            'OUTFILE': None, 'OUTDIR': None, 'REPORT': None, 'JOBS': 1, 'VERBOSE': False,
+            'GALAXY': False, 'CWL': True, 'LANG': None, 'SOURCE': None,
+            'INOUT_BIOT': False, 'GAL_URL': None, 'EDAM_URL': None, 'MAP_FILE': None}
+    args.update(kwargs)
+    return argparse.Namespace(**args)
+
+
+class StandInServer(socketserver.ThreadingMixIn, HTTPServer):
+    '''
+    Local HTTP server standing in for remote services. `routes` maps paths (with or
+    without query) to (status, headers, body) and every request is recorded in `requests`.
+    '''
+    daemon_threads = True
+
+    def __init__(self, routes, delay=0):
+        self.routes = routes
+        self.delay = delay
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        HTTPServer.__init__(self, ('127.0.0.1', 0), StandInHandler)
+        self.url = 'http://127.0.0.1:' + str(self.server_address[1])
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    '''
+    Answer requests of :class:`StandInServer` from its routes.
+    '''
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, dict(self.headers)))
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        time.sleep(server.delay)
+        not_found = (404, {}, json.dumps({'detail': 'Not found.'}))
+        route = server.routes.get(self.path,
+                                  server.routes.get(self.path.split('?')[0], not_found))
+        status, headers, body = route(self) if callable(route) else route
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        with server.lock:
+            server.active -= 1
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
 #  Class(es)  ------------------------------
 
 class TestBiotool(unittest.TestCase):
@@ -287,6 +372,15 @@ class TestImportJson(unittest.TestCase):
         self.assertEqual(j['owner'], 'bneron')
         self.assertEqual(j['id'], 'MacSyFinder')
 
+    def test_json_from_entry(self):
+        # An ID containing '.json' is not taken as a local file
+        self.assertTrue(main.is_file_entry(os.path.dirname(__file__) + '/MacSyFinder.json'))
+        self.assertFalse(main.is_file_entry('foo.jsonify/1.0'))
+        with requests_mock.mock() as m:
+            m.get('https://bio.tools/api/tool/foo.jsonify/version/1.0',
+                  json={'id': 'foo.jsonify', 'name': 'foo'})
+            self.assertEqual(main.json_from_entry('foo.jsonify/1.0')['id'], 'foo.jsonify')
+
     #def test_json_from_biotool(self):
 
 
@@ -316,6 +410,59 @@ class TestMainFunctions(unittest.TestCase):
         # Check few arguments from topics
         self.assertEqual(biot.topics[0].term, 'Functional genomics')
 
+    def test_convert(self):
+        test_dir = os.path.dirname(__file__)
+        tmp_dir = tempfile.mkdtemp()
+        stdout = sys.stdout
+        try:
+            for fmt, write, extension in [('galaxy', main.write_xml, '.xml'),
+                                          ('cwl', main.write_cwl, '.cwl')]:
+                json_tool = main.json_from_file(os.path.join(test_dir, 'MacSyFinder.json'))
+                # Nothing is printed
+                sys.stdout = io.StringIO()
+                rendered = main.convert(json_tool, fmt)
+                self.assertEqual(sys.stdout.getvalue(), '')
+                sys.stdout = stdout
+                self.assertListEqual([name for name, content in rendered],
+                                     ['MacSyFinder1' + extension, 'MacSyFinder2' + extension])
+                # Same content as the files written by the command line
+                write(main.json_to_biotool(json_tool),
+                      outfile=os.path.join(tmp_dir, 'MacSyFinder' + extension))
+                for name, content in rendered:
+                    with open(os.path.join(tmp_dir, name), 'rb') as tool_file:
+                        self.assertEqual(content, tool_file.read())
+                second = main.convert(json_tool, fmt, {'functions': [2]})
+                self.assertListEqual(second, rendered[1:])
+            with self.assertRaises(IndexError):
+                main.convert(json_tool, 'cwl', {'functions': [3]})
+            with self.assertRaises(ValueError):
+                main.convert(json_tool, 'pdf')
+        finally:
+            sys.stdout = stdout
+            shutil.rmtree(tmp_dir)
+
+
+class TestLazyImports(unittest.TestCase):
+
+    def test_cwl_startup(self):
+        # A CWL annotation does not load the libraries of the other backends
+        code = '; '.join([
+            "import sys, tempfile",
+            "from tooldog import main, tmp",
+            "sys.argv = ['tooldog', '--cwl', '--annotate', 'MEMHDX.json']",
+            "args = main.parse_arguments()",
+            "biotool = main.json_to_biotool(main.json_from_entry(" +
+            repr(os.path.join(os.path.dirname(__file__), 'MEMHDX.json')) + "))",
+            "from tooldog.annotate import cwl",
+            "print(sorted(module for module in ['galaxyxml', 'rdflib', 'docker', " +
+            "'requests', 'lxml'] if module in sys.modules))",
+            "print(tmp._TMP_DIR)"])
+        env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))))
+        output = subprocess.check_output([sys.executable, '-c', code], env=env,
+                                         stderr=subprocess.DEVNULL)
+        self.assertListEqual(output.decode('utf-8').split('\n')[:2], ['[]', 'None'])
+
 
 class TestGalaxyToolGen(unittest.TestCase):
 
@@ -385,6 +532,18 @@ class TestGalaxyToolGen(unittest.TestCase):
         self.assertEqual(output_attrib['format'], 'fastq')
         self.assertEqual(output_attrib['from_work_dir'], 'OUTPUT1.fastq')
 
+    def test_set_function(self):
+        first = biotool_model.Function([EDAM_OPE])
+        first.add_inputs([{'data': EDAM_DATA, 'format': [EDAM_FORMAT]}] * 2)
+        second = biotool_model.Function([EDAM_OPE])
+        second.add_outputs([{'data': EDAM_DATA, 'format': [EDAM_FORMAT]}])
+        self.genxml.set_function(first)
+        self.assertEqual(len(self.genxml.tool.inputs.children), 2)
+        self.genxml.set_function(second)
+        # Inputs of the first function are dropped, numbering starts again
+        self.assertFalse(hasattr(self.genxml.tool, 'inputs'))
+        self.assertEqual(self.genxml.tool.outputs.children[0].node.attrib['name'], 'OUTPUT1')
+
     def test_add_citation(self):
         # Create a Publication object
         dict_pub = {'doi':'doi:123', 'pmid':'', 'pmcid':'', 'type':'a_type'}
@@ -394,6 +553,16 @@ class TestGalaxyToolGen(unittest.TestCase):
         self.assertEqual(self.genxml.tool.citations.children[0].node.text, 'doi:123')
         self.assertEqual(self.genxml.tool.citations.children[0].node.attrib['type'], 'doi')
 
+    def test_export_xml(self):
+        self.genxml.add_input_file(biotool_model.Input(EDAM_DATA, [EDAM_FORMAT]))
+        self.genxml.tool.help = 'Non ASCII characters: é 中'
+        for keep_old_command in [False, True]:
+            stream = io.BytesIO()
+            self.genxml.export_xml(stream, keep_old_command)
+            self.assertEqual(stream.getvalue(), self.genxml.tool.export(keep_old_command))
+        # The tool is not changed by the export
+        self.assertIsNone(self.genxml.tool.root.find('inputs'))
+
     def test_write_xml(self):
         tmp_file = 'tmp_test_write_xml.xml'
         self.genxml.write_xml(tmp_file)
@@ -407,6 +576,10 @@ class TestGalaxyToolGen(unittest.TestCase):
 class TestGalaxyInfo(unittest.TestCase):
 
     def setUp(self):
+        # Answers of the Galaxy API are cached, not in the cache of the user
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_env = os.environ.get('TOOLDOG_CACHE_DIR')
+        os.environ['TOOLDOG_CACHE_DIR'] = self.tmp_dir
         # Create two GalaxyInfo objects
         self.gi = edam_to_galaxy.GalaxyInfo(None)
         with requests_mock.mock() as m:
@@ -428,6 +601,13 @@ class TestGalaxyInfo(unittest.TestCase):
                   json=version_answer)
             self.gi_url = edam_to_galaxy.GalaxyInfo('http://supergalaxy.com')
 
+    def tearDown(self):
+        if self.cache_env is None:
+            del os.environ['TOOLDOG_CACHE_DIR']
+        else:
+            os.environ['TOOLDOG_CACHE_DIR'] = self.cache_env
+        shutil.rmtree(self.tmp_dir)
+
     def test_init(self):
         # Tests URLs
         self.assertEqual(self.gi.galaxy_url, 'https://usegalaxy.org')
@@ -449,6 +629,42 @@ class TestGalaxyInfo(unittest.TestCase):
             self.assertEqual(root, 'fastq')
 
 
+class TestFetchGalaxyApi(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_env = os.environ.get('TOOLDOG_CACHE_DIR')
+        os.environ['TOOLDOG_CACHE_DIR'] = self.tmp_dir
+        self.version = {'version_major': '17.09', 'version_minor': '1'}
+        routes = {'/api/version': lambda handler: (200, {}, json.dumps(self.version))}
+        for key, api_path in edam_to_galaxy.GALAXY_API.items():
+            with open(edam_to_galaxy.LOCAL_DATA + '/' + key + '.json', 'rb') as json_file:
+                routes[api_path] = (200, {}, json_file.read())
+        self.server = StandInServer(routes, delay=0.2)
+
+    def tearDown(self):
+        self.server.stop()
+        if self.cache_env is None:
+            del os.environ['TOOLDOG_CACHE_DIR']
+        else:
+            os.environ['TOOLDOG_CACHE_DIR'] = self.cache_env
+        shutil.rmtree(self.tmp_dir)
+
+    def test_fetch_galaxy_api(self):
+        galaxy_info = edam_to_galaxy.GalaxyInfo(self.server.url)
+        self.assertEqual(galaxy_info.version, '17.09')
+        self.assertEqual(galaxy_info.edam_formats['format_3579'][0], 'jpg')
+        self.assertEqual(len(self.server.requests), 4)
+        self.assertEqual(self.server.max_active, 3)
+        # Same version: answers taken from the cache
+        edam_to_galaxy.GalaxyInfo(self.server.url)
+        self.assertEqual(len(self.server.requests), 5)
+        # New version: fetched again
+        self.version['version_minor'] = '2'
+        edam_to_galaxy.GalaxyInfo(self.server.url)
+        self.assertEqual(len(self.server.requests), 9)
+
+
 class TestEdamInfo(unittest.TestCase):
 
     def setUp(self):
@@ -468,6 +684,69 @@ class TestEdamInfo(unittest.TestCase):
         self.assertEqual(self.ei.edam_format_hierarchy['format_1930'][0], 'format_2182')
 
 
+class TestEdamSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_env = os.environ.get('TOOLDOG_CACHE_DIR')
+        os.environ['TOOLDOG_CACHE_DIR'] = self.tmp_dir
+        self.owl = os.path.join(os.path.dirname(__file__), 'EDAM_test.owl')
+
+    def tearDown(self):
+        if self.cache_env is None:
+            del os.environ['TOOLDOG_CACHE_DIR']
+        else:
+            os.environ['TOOLDOG_CACHE_DIR'] = self.cache_env
+        shutil.rmtree(self.tmp_dir)
+
+    def test_detect_version(self):
+        self.assertEqual(edam_snapshot.detect_version(self.owl), '1.99')
+        with open(self.owl, 'rb') as owl_file:
+            server = StandInServer({'/EDAM.owl': (200, {}, owl_file.read())})
+        try:
+            self.assertEqual(edam_snapshot.detect_version(server.url + '/EDAM.owl'), '1.99')
+            self.assertIsNone(edam_snapshot.detect_version(server.url + '/missing.owl'))
+        finally:
+            server.stop()
+
+    def test_snapshot(self):
+        self.assertIsNone(edam_snapshot.load_snapshot('1.99'))
+        edam = edam_to_galaxy.EdamInfo(self.owl, streaming=False)
+        self.assertIsInstance(edam.edam_ontology, rdflib.Graph)
+        edam.generate_hierarchy()
+        self.assertTrue(os.path.isfile(edam_snapshot.snapshot_path('1.99')))
+        # Loaded from the snapshot without parsing the ontology
+        edam = edam_to_galaxy.EdamInfo(self.owl)
+        self.assertIsNone(edam.edam_ontology)
+        edam.generate_hierarchy()
+        self.assertListEqual(edam.edam_format_hierarchy['format_1930'], ['format_2182'])
+        self.assertListEqual(sorted(edam.edam_data_hierarchy['data_2887']),
+                             ['data_0006', 'data_2044'])
+        self.assertEqual(edam.edam_labels['format_1930'], 'FASTQ')
+        self.assertNotIn('operation_0004', edam.edam_labels)
+
+    def test_streaming_parser(self):
+        graph = edam_to_galaxy.EdamInfo(self.owl, use_snapshot=False, streaming=False)
+        graph.generate_hierarchy()
+        edam = edam_owl.parse_edam(self.owl)
+        self.assertEqual(edam['version'], '1.99')
+        self.assertDictEqual(edam['format_hierarchy'], graph.edam_format_hierarchy)
+        self.assertListEqual(sorted(edam['data_hierarchy']['data_2887']),
+                             sorted(graph.edam_data_hierarchy['data_2887']))
+        self.assertDictEqual(edam['labels'], graph.edam_labels)
+        # From an URL, without any graph
+        with open(self.owl, 'rb') as owl_file:
+            server = StandInServer({'/EDAM.owl': (200, {}, owl_file.read())})
+        try:
+            edam_info = edam_to_galaxy.EdamInfo(server.url + '/EDAM.owl')
+        finally:
+            server.stop()
+        self.assertIsNone(edam_info.edam_ontology)
+        self.assertEqual(edam_info.version, '1.99')
+        self.assertDictEqual(edam_info.edam_format_hierarchy, edam['format_hierarchy'])
+        self.assertTrue(os.path.isfile(edam_snapshot.snapshot_path('1.99')))
+
+
 class TestEdamToGalaxy(unittest.TestCase):
 
     def setUp(self):
@@ -485,6 +764,178 @@ class TestEdamToGalaxy(unittest.TestCase):
         self.assertEqual(self.etog_url.galaxy.galaxy_url, 'https://usegalaxy.org')
 
 
+class TestSharedMapping(unittest.TestCase):
+
+    def test_shared_mapping(self):
+        edam_to_galaxy.clear_mappings()
+        try:
+            etog = edam_to_galaxy.get_mapping()
+            self.assertIs(edam_to_galaxy.get_mapping(), etog)
+            self.assertEqual(etog.get_datatype(edam_format='format_1930'), 'fastq')
+            with self.assertRaises(TypeError):
+                etog.format_to_datatype['format_1930'] = 'txt'
+            # Tools use the shared mapping, and copies of a tool do not clone it
+            biotool = main.json_to_biotool(json.loads(open(
+                os.path.join(os.path.dirname(__file__), "MEMHDX.json")).read()))
+            tool = galaxy.GalaxyToolGen(biotool)
+            self.assertIs(tool.etog, etog)
+            self.assertIs(copy.deepcopy(tool).etog, etog)
+        finally:
+            edam_to_galaxy.clear_mappings()
+
+
+class TestCompactMapping(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.mapping_json = os.path.join(self.tmpdir, 'mapping.json')
+        shutil.copy(edam_to_galaxy.LOCAL_DATA + '/edam_to_galaxy.json', self.mapping_json)
+        with open(self.mapping_json, 'r') as json_file:
+            self.content = json.load(json_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_convert(self):
+        path = compact_mapping.convert(self.mapping_json)
+        self.assertEqual(path, os.path.join(self.tmpdir, 'mapping.map'))
+        compact = compact_mapping.load_compact(path, source=self.mapping_json)
+        self.assertEqual(compact.info['edam_version'], self.content['edam_version'])
+        self.assertDictEqual(dict(compact.format_to_datatype), self.content['format'])
+        self.assertDictEqual(dict(compact.data_to_datatype), self.content['data'])
+        self.assertEqual(compact.format_to_datatype['format_1930'], 'fastq')
+        for term in ['format_9999', 'format_1930x', 'data_3002', 'format_01930', 1930]:
+            self.assertNotIn(term, compact.format_to_datatype)
+        # Outdated once the JSON mapping changes
+        self.content['format']['format_1930'] = 'txt'
+        with open(self.mapping_json, 'w') as json_file:
+            json.dump(self.content, json_file)
+        self.assertIsNone(compact_mapping.load_compact(path, source=self.mapping_json))
+
+    def test_unsupported_id(self):
+        with self.assertRaises(ValueError):
+            compact_mapping.pack_mapping({'format_1930': 'fastq', 'data_0006': 'data'}, {},
+                                         {})
+
+    def test_edam_to_galaxy(self):
+        path = compact_mapping.convert(self.mapping_json)
+        for mapping in [path, self.mapping_json]:
+            etog = edam_to_galaxy.EdamToGalaxy(mapping_json=mapping)
+            self.assertEqual(etog.compact.path, path)
+            self.assertEqual(etog.get_datatype(edam_data='data_3002'), 'genetrack')
+            self.assertEqual(etog.galaxy_version, self.content['galaxy_version'])
+        etog = edam_to_galaxy.EdamToGalaxy(mapping_json=self.mapping_json, use_compact=False)
+        self.assertIsNone(etog.compact)
+        self.assertIsInstance(etog.format_to_datatype, dict)
+
+    def test_packaged_mapping(self):
+        # The compact mapping shipped with ToolDog is built from the JSON one
+        etog = edam_to_galaxy.EdamToGalaxy()
+        self.assertIsNotNone(etog.compact)
+
+
+class TestMapHierarchy(unittest.TestCase):
+
+    def test_map_hierarchy(self):
+        hierarchy = {'format_1': ['format_2'], 'format_2': ['format_3', 'format_4'],
+                     'format_3': ['format_1'], 'format_4': ['format_root'],
+                     'format_5': ['format_missing', 'format_2'], 'format_6': []}
+        calls = []
+
+        def select_root(datatypes):
+            calls.append(datatypes)
+            return datatypes[-1]
+        mapping, report = edam_to_galaxy.map_hierarchy(
+            hierarchy, {'format_root': ['txt'], 'format_6': ['a', 'b']}, select_root)
+        # Second parent used when the first one has no datatype, missing parent skipped
+        self.assertEqual(mapping['format_1'], 'txt')
+        self.assertEqual(mapping['format_5'], 'txt')
+        self.assertEqual(mapping['format_6'], 'b')
+        self.assertEqual(mapping['format_3'], edam_to_galaxy.NO_MAPPING)
+        self.assertListEqual(report['cycles'],
+                             [['format_1', 'format_2', 'format_3', 'format_1']])
+        self.assertListEqual(report['unmapped'], ['format_3'])
+        self.assertEqual(len(calls), 1)
+
+    def test_deep_hierarchy(self):
+        depth = 3 * sys.getrecursionlimit()
+        hierarchy = {'data_' + str(i): ['data_' + str(i + 1)] for i in range(depth)}
+        mapping, report = edam_to_galaxy.map_hierarchy(
+            hierarchy, {'data_' + str(depth): ['txt']}, None)
+        self.assertEqual(mapping['data_0'], 'txt')
+        self.assertListEqual(report['unmapped'], [])
+
+
+class TestUpdateMapping(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_env = os.environ.get('TOOLDOG_CACHE_DIR')
+        os.environ['TOOLDOG_CACHE_DIR'] = self.tmp_dir
+        self.owl = os.path.join(os.path.dirname(__file__), 'EDAM_test.owl')
+        self.mapping_json = os.path.join(self.tmp_dir, 'mapping.json')
+
+    def tearDown(self):
+        if self.cache_env is None:
+            del os.environ['TOOLDOG_CACHE_DIR']
+        else:
+            os.environ['TOOLDOG_CACHE_DIR'] = self.cache_env
+        shutil.rmtree(self.tmp_dir)
+
+    def test_update_mapping(self):
+        edam_to_galaxy.EdamToGalaxy(edam_url=self.owl, mapping_json=self.mapping_json)
+        etog = edam_to_galaxy.EdamToGalaxy(mapping_json=self.mapping_json)
+        self.assertIn('format_1930', etog.loaded_inputs['format_hierarchy'])
+        # New EDAM release and Galaxy version
+        edam = edam_to_galaxy.EdamInfo(self.owl)
+        edam.version = '2.0'
+        edam.edam_format_hierarchy['format_2182'] = ['format_1915']
+        galaxy = edam_to_galaxy.GalaxyInfo(None)
+        del galaxy.edam_formats['format_1930']
+        log = etog.update_mapping(edam, galaxy)
+        self.assertEqual(log['from']['edam_version'], '1.99')
+        self.assertEqual(log['to']['edam_version'], '2.0')
+        self.assertListEqual([change['term'] for change in log['format']],
+                             ['format_1930', 'format_2182'])
+        self.assertEqual(log['format'][0]['new'], etog.format_to_datatype['format_2182'])
+        self.assertListEqual(log['data'], [])
+        # Same result as a full generation
+        full = edam_to_galaxy.EdamToGalaxy(mapping_json=self.mapping_json)
+        full.edam, full.galaxy = edam, galaxy
+        full.generate_mapping()
+        self.assertDictEqual(etog.format_to_datatype, full.format_to_datatype)
+        self.assertDictEqual(etog.data_to_datatype, full.data_to_datatype)
+
+    def test_mapping_cache(self):
+        cwd = os.getcwd()
+        os.chdir(self.tmp_dir)
+        try:
+            etog = edam_to_galaxy.EdamToGalaxy(edam_url=self.owl)
+        finally:
+            os.chdir(cwd)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, 'edam_to_galaxy.json')))
+        path = edam_to_galaxy.mapping_cache_path('https://usegalaxy.org',
+                                                 etog.galaxy.release, '1.99')
+        self.assertTrue(os.path.isfile(path))
+        self.assertIn(os.path.join(self.tmp_dir, 'mapping', 'usegalaxy.org'), path)
+        # Loaded from the cache without parsing EDAM
+        cached = edam_to_galaxy.EdamToGalaxy(edam_url=self.owl)
+        self.assertFalse(hasattr(cached, 'edam'))
+        # Through the compact mapping written with it
+        self.assertEqual(cached.compact.path, compact_mapping.compact_path(path))
+        self.assertDictEqual(dict(cached.format_to_datatype), etog.format_to_datatype)
+        # Another EDAM version has its own mapping
+        self.assertNotEqual(path, edam_to_galaxy.mapping_cache_path(
+            'https://usegalaxy.org', etog.galaxy.release, '2.0'))
+
+    def test_update_mapping_file(self):
+        edam_to_galaxy.EdamToGalaxy(edam_url=self.owl, mapping_json=self.mapping_json)
+        log = edam_to_galaxy.update_mapping_file(self.mapping_json, edam_url=self.owl)
+        self.assertListEqual(log['format'] + log['data'], [])
+        with open(os.path.join(self.tmp_dir, 'mapping.changes.json')) as changelog:
+            self.assertDictEqual(json.load(changelog), log)
+
+
 class TestCwlToolGen(unittest.TestCase):
 
     def setUp(self):
@@ -538,6 +989,18 @@ class TestCwlToolGen(unittest.TestCase):
         self.assertEqual(output_attrib.format, EDAM_FORMAT['uri'])
         self.assertEqual(output_attrib.outputBinding.glob, 'OUTPUT1.ext')
 
+    def test_set_function(self):
+        first = biotool_model.Function([EDAM_OPE])
+        first.add_inputs([{'data': EDAM_DATA, 'format': [EDAM_FORMAT]}] * 2)
+        second = biotool_model.Function([EDAM_OPE])
+        second.add_outputs([{'data': EDAM_DATA, 'format': [EDAM_FORMAT]}])
+        self.gencwl.set_function(first)
+        self.assertEqual(len(self.gencwl.tool.inputs), 2)
+        self.gencwl.set_function(second)
+        # Inputs of the first function are dropped, numbering starts again
+        self.assertListEqual(self.gencwl.tool.inputs, [])
+        self.assertEqual(self.gencwl.tool.outputs[0].id, 'OUTPUT1')
+
     def test_write_cwl(self):
         tmp_file = 'tmp_test_write_cwl.cwl'
         self.gencwl.write_cwl(tmp_file, 1)
@@ -547,6 +1010,919 @@ class TestCwlToolGen(unittest.TestCase):
         finally:
             os.remove('tmp_test_write_cwl1.cwl')
 
+    def test_export_cwl(self):
+        self.gencwl.add_input_file(biotool_model.Input(EDAM_DATA, [EDAM_FORMAT]))
+        self.gencwl.add_edam_topic(biotool_model.Topic(EDAM_TOPIC))
+        self.gencwl.add_edam_operation(biotool_model.Operation(EDAM_OPE))
+        self.gencwl.add_publication(biotool_model.Publication(
+            {'doi': 'a_doi', 'pmid': None, 'pmcid': None, 'type': 'Primary'}))
+        stream = io.BytesIO()
+        self.gencwl.export_cwl(stream)
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            tmp_file = os.path.join(tmp_dir, 'exported.cwl')
+            self.gencwl.tool.export(tmp_file)
+            with open(tmp_file, 'rb') as cwl_file:
+                self.assertEqual(stream.getvalue(), cwl_file.read())
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_export_cwl_entry(self):
+        # Same bytes as cwlgen's own export for each function of an entry with topics and
+        # publications
+        json_tool = main.json_from_file(os.path.join(os.path.dirname(__file__),
+                                                     'MacSyFinder.json'))
+        biotool = main.json_to_biotool(json_tool)
+        gencwl = main.cwl_generator(biotool)
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            for index, function in enumerate(biotool.functions):
+                gencwl.set_function(function)
+                stream = io.BytesIO()
+                gencwl.export_cwl(stream)
+                tmp_file = os.path.join(tmp_dir, 'exported' + str(index) + '.cwl')
+                gencwl.tool.export(tmp_file)
+                with open(tmp_file, 'rb') as cwl_file:
+                    self.assertEqual(stream.getvalue(), cwl_file.read())
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+class TestBatchRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.json_dir = os.path.dirname(__file__)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_expand_entries(self):
+        entries = list(batch.expand_entries([self.json_dir, 'an_id/1.0', '', '# comment']))
+        self.assertIn(os.path.join(self.json_dir, 'MacSyFinder.json'), entries)
+        self.assertEqual(entries[-1], 'an_id/1.0')
+        self.assertEqual(len(entries), 5)
+
+    def test_entry_name(self):
+        self.assertEqual(batch.entry_name('/a/path/MEMHDX.json'), 'MEMHDX')
+        self.assertEqual(batch.entry_name('integron_finder/1.5.1'), 'integron_finder_1.5.1')
+        self.assertEqual(batch.entry_name('src/tool_1.5.0.json'), 'tool_1.5.0')
+        self.assertEqual(batch.entry_name('src/dump.jsonl#tool/1.5'), 'tool_1.5')
+
+    def test_run_versions(self):
+        # Versions of one tool are written to different files
+        out_dir = os.path.join(self.tmp_dir, 'out')
+        entry = main.json_from_file(os.path.join(self.json_dir, 'MEMHDX.json'))
+        with requests_mock.mock() as m:
+            for version in ['1.5.0', '1.5.1']:
+                m.get('https://bio.tools/api/tool/MEMHDX/version/' + version,
+                      json=dict(entry, version=version))
+            results = batch.BatchRunner(make_args(OUTDIR=out_dir)).run(['MEMHDX/1.5.0',
+                                                                        'MEMHDX/1.5.1'])
+        self.assertListEqual([result['outputs'] for result in results],
+                             [[os.path.join(out_dir, 'MEMHDX_1.5.0.cwl')],
+                              [os.path.join(out_dir, 'MEMHDX_1.5.1.cwl')]])
+        src_dir = os.path.join(self.tmp_dir, 'src')
+        os.makedirs(src_dir)
+        jsonl = os.path.join(self.tmp_dir, 'dump.jsonl')
+        with open(jsonl, 'w') as jsonl_file:
+            for version in ['1.5.0', '1.5.1']:
+                with open(os.path.join(src_dir, 'tool_' + version + '.json'), 'w') as json_file:
+                    json.dump(dict(entry, version=version), json_file)
+                jsonl_file.write(json.dumps(dict(entry, version=version)) + '\n')
+        for args in [make_args(OUTDIR=out_dir), make_args(OUTDIR=out_dir, GALAXY=True,
+                                                          CWL=False, MANIFEST=os.path.join(
+                                                              self.tmp_dir, 'manifest.json'))]:
+            results = batch.BatchRunner(args).run([src_dir])
+            self.assertListEqual([result['status'] for result in results], ['ok', 'ok'])
+            self.assertListEqual(
+                [os.path.basename(result['outputs'][0]) for result in results],
+                ['tool_1.5.0' + batch.BatchRunner(args).extension(),
+                 'tool_1.5.1' + batch.BatchRunner(args).extension()])
+        # Entries of a dump with the same ID are named after their version
+        results = batch.BatchRunner(make_args(OUTDIR=out_dir)).run([jsonl])
+        self.assertListEqual([result['outputs'] for result in results],
+                             [[os.path.join(out_dir, 'MEMHDX.cwl')],
+                              [os.path.join(out_dir, 'MEMHDX_1.5.1.cwl')]])
+        # An entry writing the file of another one fails instead of overwriting it
+        shutil.copy(os.path.join(self.json_dir, 'MEMHDX.json'),
+                    os.path.join(src_dir, 'MacSyFinder1.json'))
+        with open(jsonl, 'a') as jsonl_file:
+            jsonl_file.write(json.dumps(dict(entry, version='1.5.1')) + '\n')
+        for options in [{'JOBS': 1}, {'JOBS': 2},
+                        {'MANIFEST': os.path.join(self.tmp_dir, 'clash.json')}]:
+            shutil.rmtree(out_dir)
+            results = batch.BatchRunner(make_args(OUTDIR=out_dir, **options)).run(
+                [os.path.join(self.json_dir, 'MacSyFinder.json'),
+                 os.path.join(src_dir, 'MacSyFinder1.json'), jsonl])
+            self.assertListEqual([result['status'] for result in results],
+                                 ['ok', 'failed', 'ok', 'ok', 'failed'])
+            self.assertIn('already written by entry', results[1]['error'])
+            self.assertListEqual(results[1]['outputs'], [])
+            self.assertIn('already used', results[4]['error'])
+            # The file of the first entry is kept
+            with open(os.path.join(out_dir, 'MacSyFinder1.cwl')) as cwl_file:
+                self.assertNotIn('MEMHDX', cwl_file.read())
+
+    def test_run(self):
+        report = os.path.join(self.tmp_dir, 'report.jsonl')
+        out_dir = os.path.join(self.tmp_dir, 'out')
+        args = make_args(OUTDIR=out_dir, REPORT=report)
+        entries = [os.path.join(self.json_dir, 'MEMHDX.json'), 'unknown_tool/1.0',
+                   os.path.join(self.json_dir, 'sequana_coverage.json')]
+        with requests_mock.mock() as m:
+            m.get('https://bio.tools/api/tool/unknown_tool/version/1.0',
+                  json={'detail': 'Not found.'})
+            results = batch.BatchRunner(args).run(entries)
+        # The failing entry does not stop the run
+        self.assertListEqual([result['status'] for result in results],
+                             ['ok', 'failed', 'ok'])
+        self.assertIn('EntryNotFoundError', results[1]['error'])
+        self.assertListEqual(results[0]['outputs'], [os.path.join(out_dir, 'MEMHDX.cwl')])
+        self.assertTrue(os.path.isfile(os.path.join(out_dir, 'sequana_coverage.cwl')))
+        # One record per entry in the report
+        with open(report) as report_file:
+            records = [json.loads(line) for line in report_file]
+        self.assertListEqual(records, results)
+
+    def test_run_jobs(self):
+        entries = [os.path.join(self.json_dir, name + '.json') for name in
+                   ['sequana_coverage', 'MEMHDX', 'not_a_file', 'integron_finder']]
+        seq_dir = os.path.join(self.tmp_dir, 'seq')
+        seq_results = batch.BatchRunner(make_args(OUTDIR=seq_dir)).run(entries)
+        par_dir = os.path.join(self.tmp_dir, 'par')
+        report = os.path.join(self.tmp_dir, 'report.jsonl')
+        par_results = batch.BatchRunner(make_args(OUTDIR=par_dir, JOBS=2,
+                                                  REPORT=report)).run(entries)
+        # Same order and statuses as a sequential run
+        self.assertListEqual([r['entry'] for r in par_results], entries)
+        self.assertListEqual([r['status'] for r in par_results],
+                             [r['status'] for r in seq_results])
+        # Same outputs
+        for seq_res, par_res in zip(seq_results, par_results):
+            for seq_out, par_out in zip(seq_res['outputs'], par_res['outputs']):
+                self.assertTrue(filecmp.cmp(seq_out, par_out, shallow=False))
+        with open(report) as report_file:
+            self.assertEqual(len(report_file.readlines()), 4)
+
+    def test_run_jsonl(self):
+        jsonl = os.path.join(self.tmp_dir, 'entries.jsonl')
+        with open(jsonl, 'w') as jsonl_file:
+            for name in ['MEMHDX', 'sequana_coverage']:
+                entry = main.json_from_file(os.path.join(self.json_dir, name + '.json'))
+                jsonl_file.write(json.dumps(entry) + '\n')
+            jsonl_file.write('{"id": "broken"')
+        out_dir = os.path.join(self.tmp_dir, 'out')
+        results = batch.BatchRunner(make_args(OUTDIR=out_dir)).run([jsonl])
+        self.assertListEqual([result['entry'] for result in results],
+                             [jsonl + '#MEMHDX', jsonl + '#sequana_coverage', jsonl])
+        self.assertListEqual([result['status'] for result in results], ['ok', 'ok', 'failed'])
+        self.assertListEqual(results[0]['outputs'], [os.path.join(out_dir, 'MEMHDX.cwl')])
+
+    def test_run_fetch_concurrency(self):
+        args = make_args(OUTDIR=os.path.join(self.tmp_dir, 'out'), FETCH_CONC=2)
+        with requests_mock.mock() as m:
+            m.get('https://bio.tools/api/tool/MEMHDX/version/1.0',
+                  json=main.json_from_file(os.path.join(self.json_dir, 'MEMHDX.json')))
+            m.get('https://bio.tools/api/tool/unknown_tool/version/1.0',
+                  json={'detail': 'Not found.'})
+            results = batch.BatchRunner(args).run(['MEMHDX/1.0', 'unknown_tool/1.0'])
+        statuses = dict((result['entry'], result['status']) for result in results)
+        self.assertDictEqual(statuses, {'MEMHDX/1.0': 'ok', 'unknown_tool/1.0': 'failed'})
+
+    def test_run_fetch_concurrency_order(self):
+        # Results are in the order of the entries, whatever the order of arrival
+        def slow(request, context):
+            time.sleep(0.3)
+            return main.json_from_file(os.path.join(self.json_dir, 'MacSyFinder.json'))
+        args = make_args(OUTDIR=os.path.join(self.tmp_dir, 'out'), FETCH_CONC=3)
+        local_entry = os.path.join(self.json_dir, 'integron_finder.json')
+        entries = ['MacSyFinder/1.0', local_entry, 'MEMHDX/1.0', 'MacSyFinder/1.0']
+        with requests_mock.mock() as m:
+            m.get('https://bio.tools/api/tool/MacSyFinder/version/1.0', json=slow)
+            m.get('https://bio.tools/api/tool/MEMHDX/version/1.0',
+                  json=main.json_from_file(os.path.join(self.json_dir, 'MEMHDX.json')))
+            runner = batch.BatchRunner(args)
+            items = list(runner.load(entries))
+        self.assertListEqual([entry for entry, _ in items], entries)
+        self.assertIsNone(items[1][1])
+        self.assertEqual(items[2][1]['id'], 'MEMHDX')
+
+
+    def test_run_manifest(self):
+        entry_dir = os.path.join(self.tmp_dir, 'entries')
+        os.makedirs(entry_dir)
+        for name in ['MEMHDX', 'MacSyFinder']:
+            shutil.copy(os.path.join(self.json_dir, name + '.json'), entry_dir)
+        out_dir = os.path.join(self.tmp_dir, 'out')
+        manifest_path = os.path.join(self.tmp_dir, 'manifest.json')
+        args = make_args(OUTDIR=out_dir, MANIFEST=manifest_path)
+        first = batch.BatchRunner(args).run([entry_dir])
+        self.assertListEqual([result['skipped'] for result in first], [False, False])
+        self.assertListEqual(first[0]['outputs'],
+                             [os.path.join(out_dir, 'MEMHDX.cwl')])
+        self.assertEqual(len(first[1]['outputs']), 2)
+        mtimes = dict((path, os.stat(path).st_mtime_ns) for path in first[0]['outputs'] +
+                      first[1]['outputs'])
+        # Same files as without manifest
+        plain_dir = os.path.join(self.tmp_dir, 'plain')
+        plain = batch.BatchRunner(make_args(OUTDIR=plain_dir)).run([entry_dir])
+        for result, plain_result in zip(first, plain):
+            self.assertListEqual([os.path.basename(path) for path in result['outputs']],
+                                 [os.path.basename(path) for path in plain_result['outputs']])
+            for path, plain_path in zip(result['outputs'], plain_result['outputs']):
+                self.assertTrue(filecmp.cmp(path, plain_path, shallow=False))
+        # Nothing changed: entries are skipped
+        second = batch.BatchRunner(args).run([entry_dir])
+        self.assertListEqual([result['skipped'] for result in second], [True, True])
+        self.assertListEqual([result['outputs'] for result in second],
+                             [result['outputs'] for result in first])
+        # A change of the entry which does not change the tool: the file is kept
+        entry_file = os.path.join(entry_dir, 'MEMHDX.json')
+        entry = main.json_from_file(entry_file)
+        entry['lastUpdate'] = 'today'
+        with open(entry_file, 'w') as json_file:
+            json.dump(entry, json_file)
+        third = batch.BatchRunner(args).run([entry_dir])
+        self.assertListEqual([result['skipped'] for result in third], [False, True])
+        for path, mtime in mtimes.items():
+            self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+        # Another format is generated again
+        xml_results = batch.BatchRunner(make_args(OUTDIR=out_dir, MANIFEST=manifest_path,
+                                                  GALAXY=True, CWL=False)).run([entry_dir])
+        self.assertListEqual([result['skipped'] for result in xml_results], [False, False])
+        self.assertTrue(os.path.isfile(os.path.join(out_dir, 'MEMHDX.xml')))
+
+    def test_fingerprint_mapping(self):
+        # An edited mapping with the same versions changes the fingerprint
+        mapping_json = os.path.join(self.tmp_dir, 'mapping.json')
+        shutil.copy(edam_to_galaxy.LOCAL_DATA + '/edam_to_galaxy.json', mapping_json)
+        entry = main.json_from_file(os.path.join(self.json_dir, 'MEMHDX.json'))
+        args = make_args(GALAXY=True, CWL=False, MAP_FILE=mapping_json)
+        try:
+            key = batch.BatchRunner(args).fingerprint(entry)
+            self.assertEqual(batch.BatchRunner(args).fingerprint(entry), key)
+            with open(mapping_json, 'r') as json_file:
+                content = json.load(json_file)
+            content['format']['format_1930'] = 'txt'
+            with open(mapping_json, 'w') as json_file:
+                json.dump(content, json_file)
+            edam_to_galaxy.clear_mappings()
+            self.assertNotEqual(batch.BatchRunner(args).fingerprint(entry), key)
+        finally:
+            edam_to_galaxy.clear_mappings()
+
+    def test_run_manifest_dois(self):
+        # Unchanged entries are skipped before their DOIs are resolved
+        entry = main.json_from_file(os.path.join(self.json_dir, 'MEMHDX.json'))
+        entry['publication'] = [{'doi': None, 'pmid': '1234', 'pmcid': None,
+                                 'type': 'Primary'}]
+        entry_file = os.path.join(self.tmp_dir, 'dump.jsonl')
+        with open(entry_file, 'w') as json_file:
+            json_file.write(json.dumps(entry) + '\n')
+        args = make_args(OUTDIR=os.path.join(self.tmp_dir, 'out'),
+                         MANIFEST=os.path.join(self.tmp_dir, 'manifest.json'))
+        server = StandInServer({'/idconv/': (200, {'Content-Type': 'application/xml'},
+                                             '<pmcids status="ok"><record requested-id=' +
+                                             '"1234" doi="10.1/a"/></pmcids>')})
+        idconv_url = doi.IDCONV_URL
+        doi.IDCONV_URL = server.url + '/idconv/'
+        try:
+            first = batch.BatchRunner(args).run([entry_file])
+            self.assertEqual(len(server.requests), 1)
+            with open(first[0]['outputs'][0]) as cwl_file:
+                self.assertIn('10.1/a', cwl_file.read())
+            second = batch.BatchRunner(args).run([entry_file])
+            self.assertListEqual([result['skipped'] for result in second], [True])
+            self.assertEqual(len(server.requests), 1)
+        finally:
+            doi.IDCONV_URL = idconv_url
+            server.stop()
+
+
+    def test_run_render_cache(self):
+        entries = [os.path.join(self.json_dir, name + '.json') for name in
+                   ['MEMHDX', 'MacSyFinder']]
+        plain = batch.BatchRunner(make_args(OUTDIR=os.path.join(self.tmp_dir, 'plain'),
+                                            GALAXY=True, CWL=False)).run(entries)
+        cache = render_cache.configure(os.path.join(self.tmp_dir, 'tools.sqlite'))
+        try:
+            for run in ['first', 'second']:
+                args = make_args(OUTDIR=os.path.join(self.tmp_dir, run), GALAXY=True,
+                                 CWL=False)
+                results = batch.BatchRunner(args).run(entries)
+                for result, plain_result in zip(results, plain):
+                    for path, plain_path in zip(result['outputs'], plain_result['outputs']):
+                        self.assertTrue(filecmp.cmp(path, plain_path, shallow=False))
+        finally:
+            render_cache.disable()
+        self.assertDictEqual(cache.stats, {'hits': 3, 'misses': 3})
+
+class TestManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_fingerprint(self):
+        entry = {'id': 'a_tool', 'function': [{'operation': []}], 'name': 'é'}
+        reordered = json.loads(json.dumps(entry, indent=4, sort_keys=True))
+        self.assertEqual(manifest.entry_hash(entry), manifest.entry_hash(reordered))
+        self.assertEqual(manifest.fingerprint(entry), manifest.fingerprint(reordered))
+        self.assertNotEqual(manifest.fingerprint(entry),
+                            manifest.fingerprint(entry, options={'format': 'cwl'}))
+
+    def test_write_if_changed(self):
+        path = os.path.join(self.tmp_dir, 'tool.xml')
+        self.assertTrue(manifest.write_if_changed(path, b'<tool/>'))
+        self.assertFalse(manifest.write_if_changed(path, b'<tool/>'))
+        self.assertTrue(manifest.write_if_changed(path, b'<tool></tool>'))
+        with open(path, 'rb') as tool_file:
+            self.assertEqual(tool_file.read(), b'<tool></tool>')
+        # New files get the default permissions, rewritten files keep theirs
+        umask = os.umask(0o022)
+        os.umask(umask)
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o666 & ~umask)
+        os.chmod(path, 0o640)
+        self.assertTrue(manifest.write_if_changed(path, b'<tool/>'))
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o640)
+
+    def test_manifest(self):
+        path = os.path.join(self.tmp_dir, 'manifest.json')
+        output = os.path.join(self.tmp_dir, 'tool.cwl')
+        key = manifest.fingerprint({'id': 'a_tool'})
+        records = manifest.Manifest(path)
+        self.assertFalse(records.is_current('a_tool', key))
+        records.record('a_tool', key, {output: manifest.content_hash(b'cwl')})
+        records.save()
+        records = manifest.Manifest(path)
+        # The written file is missing
+        self.assertFalse(records.is_current('a_tool', key))
+        manifest.write_if_changed(output, b'cwl')
+        self.assertTrue(records.is_current('a_tool', key))
+        self.assertListEqual(records.outputs('a_tool'), [output])
+        records.forget('a_tool')
+        records.save()
+        self.assertDictEqual(manifest.Manifest(path).entries, {})
+        # An invalid manifest is ignored
+        with open(path, 'w') as manifest_file:
+            manifest_file.write('{')
+        self.assertDictEqual(manifest.Manifest(path).entries, {})
+
+class TestRenderCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache = render_cache.RenderCache(os.path.join(self.tmp_dir, 'tools.sqlite'))
+        self.json_tool = main.json_from_file(os.path.join(os.path.dirname(__file__),
+                                                          'MacSyFinder.json'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_render_key(self):
+        biotool = main.json_to_biotool(self.json_tool)
+        other_version = dict(self.json_tool, version='2.0', credit=[])
+        other = main.json_to_biotool(other_version)
+        # The version and credits are not part of the CWL
+        self.assertEqual(render_cache.render_key(biotool, biotool.functions[0], 'cwl'),
+                         render_cache.render_key(other, other.functions[0], 'cwl'))
+        etog = edam_to_galaxy.get_mapping()
+        self.assertNotEqual(render_cache.render_key(biotool, biotool.functions[0], 'galaxy',
+                                                    etog),
+                            render_cache.render_key(other, other.functions[0], 'galaxy',
+                                                    etog))
+        self.assertNotEqual(render_cache.render_key(biotool, biotool.functions[0], 'cwl'),
+                            render_cache.render_key(biotool, biotool.functions[1], 'cwl'))
+
+    def test_render_from_cache(self):
+        expected = main.render_cwl(main.json_to_biotool(self.json_tool))
+        self.assertListEqual(main.render_cwl(main.json_to_biotool(self.json_tool),
+                                             cache=self.cache), expected)
+        self.assertEqual(self.cache.stats['misses'], 2)
+        # A hit does not build the generator
+        cwl_generator = main.cwl_generator
+        main.cwl_generator = None
+        try:
+            other_version = dict(self.json_tool, version='2.0')
+            rendered = main.render_cwl(main.json_to_biotool(other_version), cache=self.cache)
+        finally:
+            main.cwl_generator = cwl_generator
+        self.assertListEqual(rendered, expected)
+        self.assertEqual(self.cache.stats['hits'], 2)
+        xml = main.render_xml(main.json_to_biotool(self.json_tool), cache=self.cache)
+        self.assertListEqual(xml, main.render_xml(main.json_to_biotool(self.json_tool)))
+        self.assertEqual(self.cache.stats['misses'], 4)
+
+    def test_evict(self):
+        self.cache.max_size = 25
+        for key in ['a', 'b', 'c']:
+            self.cache.store(key, b'0123456789')
+        self.assertIsNone(self.cache.lookup('a'))
+        # b is used, c is then the least recently used
+        self.assertEqual(self.cache.lookup('b'), b'0123456789')
+        self.cache.store('d', b'0123456789')
+        self.assertIsNone(self.cache.lookup('c'))
+        self.assertEqual(self.cache.lookup('b'), b'0123456789')
+        self.assertEqual(self.cache.lookup('d'), b'0123456789')
+
+class TestHttpCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.etag = '"v1"'
+
+        def entry(handler):
+            if handler.headers.get('If-None-Match') == self.etag:
+                return (304, {'ETag': self.etag}, '')
+            return (200, {'ETag': self.etag, 'Content-Type': 'application/json'},
+                    json.dumps({'id': 'a_tool', 'etag': self.etag}))
+        self.server = StandInServer({'/api/tool/a_tool/': entry,
+                                     '/big': (200, {}, 'x' * 600),
+                                     '/big2': (200, {}, 'y' * 600)})
+        self.cache = http_cache.HttpCache(os.path.join(self.tmp_dir, 'cache.sqlite'),
+                                          max_size=1000)
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_revalidation(self):
+        url = self.server.url + '/api/tool/a_tool/'
+        self.assertEqual(self.cache.get(url).json()['etag'], '"v1"')
+        # Revalidated with the ETag and served from the cache
+        response = self.cache.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['etag'], '"v1"')
+        self.assertEqual(self.server.requests[-1][1]['If-None-Match'], '"v1"')
+        self.assertDictEqual(self.cache.stats, {'hits': 0, 'revalidated': 1, 'misses': 1})
+        # Resource changed
+        self.etag = '"v2"'
+        self.assertEqual(self.cache.get(url).json()['etag'], '"v2"')
+        # Persistent and fresh with a TTL: no request at all
+        cache = http_cache.HttpCache(self.cache.path, ttl=3600)
+        nb_requests = len(self.server.requests)
+        self.assertEqual(cache.get(url).json()['etag'], '"v2"')
+        self.assertEqual(len(self.server.requests), nb_requests)
+        self.assertEqual(cache.stats['hits'], 1)
+
+    def test_eviction(self):
+        self.cache.get(self.server.url + '/api/tool/a_tool/')
+        self.cache.get(self.server.url + '/big')
+        self.assertIsNotNone(self.cache.lookup(self.server.url + '/big'))
+        self.assertIsNotNone(self.cache.lookup(self.server.url + '/api/tool/a_tool/'))
+        self.cache.get(self.server.url + '/big2')
+        # Least recently used response was evicted
+        self.assertIsNone(self.cache.lookup(self.server.url + '/api/tool/a_tool/'))
+        self.assertIsNone(self.cache.lookup(self.server.url + '/big'))
+        self.assertIsNotNone(self.cache.lookup(self.server.url + '/big2'))
+
+    def test_cached_get(self):
+        url = self.server.url + '/api/tool/a_tool/'
+        http_cache.configure(self.cache.path, ttl=3600)
+        try:
+            main.json_from_biotools('a_tool', api_url=self.server.url + '/api')
+            main.json_from_biotools('a_tool', api_url=self.server.url + '/api')
+        finally:
+            http_cache.disable()
+        self.assertEqual(len(self.server.requests), 1)
+
+
+class TestHttpClient(unittest.TestCase):
+
+    def setUp(self):
+        self.attempts = 0
+
+        def flaky(handler):
+            self.attempts += 1
+            if self.attempts < 3:
+                return (503, {}, 'unavailable')
+            return (200, {}, 'ok')
+        self.server = StandInServer({'/entry': (200, {}, 'an entry'), '/flaky': flaky})
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_keep_alive(self):
+        client = http_client.HttpClient()
+        for _ in range(5):
+            self.assertEqual(client.get(self.server.url + '/entry').text, 'an entry')
+        self.assertDictEqual(client.stats(), {'requests': 5, 'connections_opened': 1,
+                                              'connections_reused': 4})
+
+    def test_retries(self):
+        client = http_client.HttpClient(backoff=0)
+        self.assertEqual(client.get(self.server.url + '/flaky').text, 'ok')
+        self.assertEqual(self.attempts, 3)
+        # Last answer is returned when retries are exhausted
+        self.attempts = 0
+        client = http_client.HttpClient(retries=1, backoff=0)
+        self.assertEqual(client.get(self.server.url + '/flaky').status_code, 503)
+
+    def test_timeout(self):
+        self.server.delay = 0.5
+        client = http_client.HttpClient(timeout=0.1, retries=0)
+        with self.assertRaises(requests.exceptions.RequestException):
+            client.get(self.server.url + '/entry')
+
+    def test_shared_client(self):
+        try:
+            http_client.configure(retries=0)
+            client = http_client.get_client()
+            self.assertIs(http_client.get_client(), client)
+            self.assertEqual(client.adapter.max_retries.total, 0)
+            http_client.configure()
+            self.assertIsNot(http_client.get_client(), client)
+        finally:
+            http_client.configure()
+
+
+class TestDoi(unittest.TestCase):
+
+    def setUp(self):
+        known = {'1234': '10.1/a', 'PMC42': '10.1/b'}
+
+        def idconv(handler):
+            query = urllib.parse.parse_qs(urllib.parse.urlparse(handler.path).query)
+            records = ''
+            for id_query in query['ids'][0].split(','):
+                if id_query in known:
+                    records += '<record requested-id="' + id_query + '" doi="' + \
+                               known[id_query] + '"/>'
+                else:
+                    records += '<record requested-id="' + id_query + '" status="error"/>'
+            return (200, {'Content-Type': 'application/xml'},
+                    '<pmcids status="ok">' + records + '</pmcids>')
+        self.server = StandInServer({'/idconv/': idconv})
+        self.idconv_url = doi.IDCONV_URL
+        doi.IDCONV_URL = self.server.url + '/idconv/'
+
+    def tearDown(self):
+        doi.IDCONV_URL = self.idconv_url
+        self.server.stop()
+
+    def test_resolve_dois(self):
+        max_ids = doi.MAX_IDS
+        doi.MAX_IDS = 2
+        try:
+            dois = doi.resolve_dois(['1234', 'PMC42', '999', '1234'])
+        finally:
+            doi.MAX_IDS = max_ids
+        self.assertDictEqual(dois, {'1234': '10.1/a', 'PMC42': '10.1/b', '999': None})
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_set_informations(self):
+        publications = [{'doi': None, 'pmid': '1234', 'pmcid': None, 'type': None},
+                        {'doi': None, 'pmid': None, 'pmcid': 'PMC42', 'type': None},
+                        {'doi': '10.1/c', 'pmid': '5678', 'pmcid': None, 'type': None},
+                        {'doi': None, 'pmid': None, 'pmcid': None, 'type': None}]
+        biotool = biotool_model.Biotool('name', 'an_id', '1.0', 'desc', 'http://home')
+        biotool.set_informations([], [], publications, [], [], [], [])
+        # Nothing is resolved while building the model
+        self.assertEqual(len(self.server.requests), 0)
+        self.assertListEqual([pub.doi for pub in biotool.informations.publications],
+                             ['10.1/a', '10.1/b', '10.1/c', None])
+        # One request for the whole entry
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_enrich_dois(self):
+        publications = [{'doi': None, 'pmid': '1234', 'pmcid': None, 'type': None},
+                        {'doi': None, 'pmid': '999', 'pmcid': None, 'type': None}]
+        biotool = biotool_model.Biotool('name', 'an_id', '1.0', 'desc', 'http://home')
+        biotool.set_informations([], [], publications, [], [], [], [])
+        biotool.enrich_dois()
+        biotool.enrich_dois()
+        genxml = galaxy.GalaxyToolGen(biotool)
+        for publication in biotool.informations.publications:
+            genxml.add_citation(publication)
+        self.assertEqual(genxml.tool.citations.children[0].node.text, '10.1/a')
+        self.assertEqual(len(genxml.tool.citations.children), 1)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertIsNone(biotool.pending_dois.publications[1].doi)
+
+    def test_background_pool(self):
+        # Entries resolved in the background share a few threads
+        self.server.delay = 0.05
+        pendings = []
+        for _ in range(3 * doi.MAX_WORKERS):
+            publication = biotool_model.Publication({'doi': None, 'pmid': '1234',
+                                                     'pmcid': None, 'type': None})
+            pendings.append(doi.PendingDois([publication]))
+        for pending in pendings:
+            pending.start()
+        for pending in pendings:
+            pending.wait()
+        self.assertListEqual([pending.publications[0].doi for pending in pendings],
+                             ['10.1/a'] * len(pendings))
+        self.assertLessEqual(self.server.max_active, doi.MAX_WORKERS)
+        self.assertIs(doi.get_executor(), doi.get_executor())
+
+    def test_fill_entry_dois(self):
+        json_tools = [{'publication': [{'doi': None, 'pmid': '1234', 'pmcid': None}]},
+                      {'publication': [{'doi': None, 'pmid': None, 'pmcid': 'PMC42'}]},
+                      {'publication': []}]
+        doi.fill_entry_dois(json_tools)
+        self.assertEqual(json_tools[0]['publication'][0]['doi'], '10.1/a')
+        self.assertEqual(json_tools[1]['publication'][0]['doi'], '10.1/b')
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_cache(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            cache = doi.DoiCache(os.path.join(tmp_dir, 'dois.sqlite'))
+            dois = doi.resolve_dois(['1234', '999'], cache=cache)
+            self.assertDictEqual(dois, {'1234': '10.1/a', '999': None})
+            # Shared by another process: no more request, unknown ID cached too
+            cache = doi.DoiCache(cache.path)
+            self.assertDictEqual(doi.resolve_dois(['1234', '999'], cache=cache), dois)
+            self.assertEqual(len(self.server.requests), 1)
+            self.assertDictEqual(cache.stats, {'hits': 2, 'misses': 0})
+            # Unknown ID asked again once expired, only the missing ID is requested
+            cache.negative_ttl = 0
+            doi.resolve_dois(['1234', '999', 'PMC42'], cache=cache)
+            self.assertEqual(len(self.server.requests), 2)
+            self.assertIn('ids=999%2CPMC42', self.server.requests[-1][0])
+            self.assertDictEqual(cache.stats, {'hits': 3, 'misses': 2})
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_cache_errors(self):
+        def idconv(handler):
+            query = urllib.parse.parse_qs(urllib.parse.urlparse(handler.path).query)
+            ids = query['ids'][0].split(',')
+            if 'PMC42' in ids:
+                return (503, {'Content-Type': 'application/xml'}, '<pmcids/>')
+            # No record for 555
+            records = ''.join('<record requested-id="' + id_query + '" doi="10.1/a"/>'
+                              if id_query == '1234' else
+                              '<record requested-id="' + id_query + '" status="error"/>'
+                              for id_query in ids if id_query != '555')
+            return (200, {'Content-Type': 'application/xml'},
+                    '<pmcids status="ok">' + records + '</pmcids>')
+        self.server.routes['/idconv/'] = idconv
+        tmp_dir = tempfile.mkdtemp()
+        max_ids = doi.MAX_IDS
+        doi.MAX_IDS = 2
+        try:
+            cache = doi.DoiCache(os.path.join(tmp_dir, 'dois.sqlite'))
+            # The first chunk is kept, the failed one is not taken as IDs without DOI
+            with self.assertRaises(requests.HTTPError):
+                # Without the retries of the shared client
+                doi.resolve_dois(['1234', '555', '999', 'PMC42'], cache=cache,
+                                 session=requests.Session())
+            self.assertDictEqual(cache.lookup(['1234', '555', '999', 'PMC42']),
+                                 {'1234': '10.1/a'})
+            # IDs missing from the answer are not cached
+            self.assertDictEqual(doi.resolve_dois(['555', '999'], cache=cache),
+                                 {'555': None, '999': None})
+            self.assertDictEqual(cache.lookup(['555', '999']), {'999': None})
+        finally:
+            doi.MAX_IDS = max_ids
+            shutil.rmtree(tmp_dir)
+
+
+class TestReaders(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.entries = []
+        for name in ['integron_finder', 'MEMHDX', 'MacSyFinder', 'sequana_coverage']:
+            self.entries.append(main.json_from_file(os.path.join(os.path.dirname(__file__),
+                                                                 name + '.json')))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_iter_json_stream(self):
+        # Array read with chunks much smaller than an entry
+        stream = io.StringIO(json.dumps(self.entries, indent=2))
+        self.assertListEqual(list(readers.iter_json_stream(stream, chunk_size=7)),
+                             self.entries)
+        # Single object and concatenated objects
+        stream = io.StringIO(json.dumps(self.entries[0]))
+        self.assertListEqual(list(readers.iter_json_stream(stream)), self.entries[:1])
+        stream = io.StringIO('\n'.join(json.dumps(entry) for entry in self.entries))
+        self.assertListEqual(list(readers.iter_json_stream(stream, chunk_size=100)),
+                             self.entries)
+        self.assertListEqual(list(readers.iter_json_stream(io.StringIO(' [ 1 , 22 ] '),
+                                                           chunk_size=2)), [1, 22])
+        with self.assertRaises(ValueError):
+            list(readers.iter_json_stream(io.StringIO('[{"id": "a"}, {"id": ')))
+        # A malformed entry fails once max_record_size characters are buffered, without
+        # reading the rest of the stream
+        stream = io.StringIO('{"id": "a"}\n{"id": b}\n' + '{"id": "c"}\n' * 1000)
+        values = readers.iter_json_stream(stream, chunk_size=16, max_record_size=100)
+        self.assertDictEqual(next(values), {'id': 'a'})
+        with self.assertRaisesRegex(ValueError, 'offset 12'):
+            next(values)
+        self.assertLess(stream.tell(), 200)
+        # An entry larger than a chunk but within the limit is read
+        stream = io.StringIO(json.dumps(self.entries[0]))
+        self.assertListEqual(list(readers.iter_json_stream(stream, chunk_size=16,
+                                                           max_record_size=1 << 20)),
+                             self.entries[:1])
+
+    def test_iter_jsonl(self):
+        stream = io.StringIO('\n'.join(json.dumps(entry) for entry in self.entries) + '\n\n')
+        self.assertListEqual(list(readers.iter_jsonl(stream)), self.entries)
+
+    def test_iter_tar(self):
+        tar_path = os.path.join(self.tmp_dir, 'entries.tar.gz')
+        with tarfile.open(tar_path, 'w:gz') as archive:
+            for name, content in [('one.json', json.dumps(self.entries[0])),
+                                  ('README', 'not an entry'),
+                                  ('others.jsonl', '\n'.join(json.dumps(entry) for entry
+                                                             in self.entries[1:]))]:
+                data = content.encode('utf-8')
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+        self.assertTrue(readers.is_multi_entry_source(tar_path))
+        self.assertListEqual(list(readers.iter_entries(tar_path)), self.entries)
+
+    def test_is_json_array(self):
+        array_path = os.path.join(self.tmp_dir, 'entries.json')
+        with open(array_path, 'w') as array_file:
+            array_file.write('\n  ' + json.dumps(self.entries))
+        self.assertTrue(readers.is_json_array(array_path))
+        self.assertFalse(readers.is_json_array(os.path.join(os.path.dirname(__file__),
+                                                            'MEMHDX.json')))
+        self.assertListEqual(list(readers.iter_entries(array_path)), self.entries)
+
+    def test_compressed_json(self):
+        # Compressed array of entries, streamed, and compressed single entry
+        array_path = os.path.join(self.tmp_dir, 'entries.json.gz')
+        with gzip.open(array_path, 'wt') as array_file:
+            array_file.write(json.dumps(self.entries[:3]))
+        self.assertTrue(readers.is_multi_entry_source(array_path))
+        self.assertListEqual(list(readers.iter_entries(array_path)), self.entries[:3])
+        entry_path = os.path.join(self.tmp_dir, 'sequana_coverage.json.gz')
+        with gzip.open(entry_path, 'wt') as entry_file:
+            entry_file.write(json.dumps(self.entries[3]))
+        self.assertFalse(readers.is_multi_entry_source(entry_path))
+        self.assertDictEqual(main.json_from_file(entry_path), self.entries[3])
+        out_dir = os.path.join(self.tmp_dir, 'out')
+        results = batch.BatchRunner(make_args(OUTDIR=out_dir)).run([array_path, entry_path])
+        self.assertListEqual([result['status'] for result in results], ['ok'] * 4)
+        self.assertListEqual([result['entry'] for result in results][-2:],
+                             [array_path + '#MacSyFinder', entry_path])
+        self.assertTrue(os.path.isfile(os.path.join(out_dir, 'MEMHDX.cwl')))
+        self.assertTrue(os.path.isfile(os.path.join(out_dir, 'sequana_coverage.cwl')))
+
+
+class TestBiotoolsFetcher(unittest.TestCase):
+
+    def setUp(self):
+        self.names = ['integron_finder', 'MEMHDX', 'MacSyFinder', 'sequana_coverage']
+        routes = {}
+        for name in self.names:
+            with open(os.path.join(os.path.dirname(__file__), name + '.json')) as json_file:
+                routes['/api/tool/' + name + '/version/1.0'] = (200, {}, json_file.read())
+        self.server = StandInServer(routes, delay=0.2)
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_iter_fetched(self):
+        fetcher = fetch.BiotoolsFetcher(concurrency=2, api_url=self.server.url + '/api')
+        entries = [name + '/1.0' for name in self.names] + ['unknown/1.0']
+        fetched = dict(fetcher.iter_fetched(entries))
+        self.assertSetEqual(set(fetched), set(entries))
+        self.assertEqual(fetched['MEMHDX/1.0']['id'], 'MEMHDX')
+        self.assertIsInstance(fetched['unknown/1.0'], main.EntryNotFoundError)
+        # Downloads are concurrent but limited
+        self.assertEqual(self.server.max_active, 2)
+        # Parsed JSON can be given to json_to_biotool
+        biotool = main.json_to_biotool(fetched['integron_finder/1.0'])
+        self.assertEqual(biotool.tool_id, 'integron_finder')
+
+
+class TestRegistryDumper(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.fail_page_3 = True
+        routes = {}
+        for page in range(1, 5):
+            content = {'count': 8, 'next': '?page=' + str(page + 1) if page < 4 else None,
+                       'list': [{'id': 'tool_' + str(page) + '_' + str(i)} for i in range(2)]}
+            routes['/api/tool/?format=json&page=' + str(page)] = (200, {}, json.dumps(content))
+        page_3 = routes['/api/tool/?format=json&page=3']
+
+        def flaky_page_3(handler):
+            if self.fail_page_3:
+                return (500, {}, 'Server error')
+            return page_3
+        routes['/api/tool/?format=json&page=3'] = flaky_page_3
+        self.server = StandInServer(routes)
+        self.outfile = os.path.join(self.tmp_dir, 'biotools.jsonl')
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def read_ids(self):
+        with open(self.outfile) as jsonl:
+            return [json.loads(line)['id'] for line in jsonl]
+
+    def test_dump_and_resume(self):
+        dumper = dump.RegistryDumper(self.outfile, api_url=self.server.url + '/api',
+                                     prefetch=3)
+        # Interrupted on page 3
+        with self.assertRaises(Exception):
+            dumper.dump()
+        self.assertListEqual(self.read_ids(), ['tool_1_0', 'tool_1_1', 'tool_2_0', 'tool_2_1'])
+        self.assertEqual(dumper.read_state()['page'], 2)
+        # Resume from page 3 only
+        self.fail_page_3 = False
+        del self.server.requests[:]
+        self.assertEqual(dumper.dump(), 4)
+        self.assertEqual(len(self.read_ids()), 8)
+        self.assertEqual(len(set(self.read_ids())), 8)
+        self.assertNotIn('/api/tool/?format=json&page=1',
+                         [path for path, headers in self.server.requests])
+        self.assertIsNone(dumper.read_state())
+
+
+class TestServe(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_env = os.environ.get('TOOLDOG_CACHE_DIR')
+        os.environ['TOOLDOG_CACHE_DIR'] = self.tmp_dir
+        with open(os.path.join(os.path.dirname(__file__), "MEMHDX.json")) as entry:
+            self.entry = entry.read()
+        self.biotools = StandInServer({'/api/tool/MEMHDX/': (200, {}, self.entry)})
+        self.server = serve.ToolDogServer(('127.0.0.1', 0),
+                                          api_url=self.biotools.url + '/api',
+                                          max_concurrency=1, queue_timeout=0.2,
+                                          session=http_client.HttpClient(retries=0))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:' + str(self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.biotools.stop()
+        if self.cache_env is None:
+            del os.environ['TOOLDOG_CACHE_DIR']
+        else:
+            os.environ['TOOLDOG_CACHE_DIR'] = self.cache_env
+        shutil.rmtree(self.tmp_dir)
+
+    def written(self, write, extension):
+        # Same entry written by the command line functions
+        outfile = os.path.join(self.tmp_dir, 'MEMHDX' + extension)
+        write(main.json_to_biotool(json.loads(self.entry)), outfile=outfile)
+        with open(outfile, 'rb') as tool_file:
+            return tool_file.read()
+
+    def test_health(self):
+        response = requests.get(self.url + '/health')
+        self.assertEqual(response.status_code, 200)
+        health = response.json()
+        self.assertEqual(health['status'], 'ok')
+        self.assertEqual(health['max_concurrency'], 1)
+        self.assertIn('edam_version', health['mapping'])
+
+    def test_convert_entry(self):
+        response = requests.get(self.url + '/tool/MEMHDX?format=cwl')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-ToolDog-Functions'], '1')
+        self.assertEqual(response.content, self.written(main.write_cwl, '.cwl'))
+        response = requests.post(self.url + '/convert', data=self.entry)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Type'], 'application/xml')
+        self.assertEqual(response.content, self.written(main.write_xml, '.xml'))
+        # The entry was only fetched once
+        self.assertEqual(len(self.biotools.requests), 1)
+
+    def test_errors(self):
+        self.assertEqual(requests.get(self.url + '/tool/unknown').status_code, 404)
+        self.assertEqual(requests.get(self.url + '/nothing').status_code, 404)
+        self.assertEqual(requests.get(self.url + '/tool/MEMHDX?format=pdf').status_code, 400)
+        self.assertEqual(requests.get(self.url + '/tool/MEMHDX?function=2').status_code, 400)
+        self.assertEqual(requests.post(self.url + '/convert', data='{').status_code, 400)
+        entry = json.loads(self.entry)
+        entry['function'] = []
+        response = requests.post(self.url + '/convert', data=json.dumps(entry))
+        self.assertEqual(response.status_code, 422)
+
+    def test_concurrency_limit(self):
+        # The only conversion slot is taken
+        self.server.slots.acquire()
+        try:
+            response = requests.post(self.url + '/convert', data=self.entry)
+        finally:
+            self.server.slots.release()
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+        self.assertEqual(self.server.health()['rejected'], 1)
+        self.assertEqual(requests.post(self.url + '/convert', data=self.entry).status_code,
+                         200)
+
 
 ###########  Main  ###########
 
@@ -1,5 +1,4 @@
 from .version import __version__
-from .tmp import TMP_DIR
 from tooldog.biotool_model import Biotool, Informations, Credit, Publication, Documentation,\
                                   Contact, Function, Data, Input, Output, Edam, Operation,\
                                   DataType, Format, Topic
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
-from .tool_analyzer import ToolAnalyzer
-from .code_collector import CodeCollector
-from .language_analyzer import PythonAnalyzer
+"""
+Analysis of the source code of tools (:mod:`tooldog.analyse.tool_analyzer`). Its
+dependencies (docker) are only loaded when an analysis is run.
+"""
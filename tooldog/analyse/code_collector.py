@@ -5,7 +5,7 @@ import os
 import urllib.parse
 import urllib.request
 import tarfile
-from tooldog import TMP_DIR
+from tooldog.tmp import get_tmp_dir
 
 from .utils import *
 
@@ -54,8 +54,8 @@ class CodeCollector(object):
             data = response.read()
 
             LOGGER.info('Writing data to zip file...')
-            zip_path = os.path.join(TMP_DIR, self.ZIP_NAME)
-            tar_path = os.path.join(TMP_DIR, self.TAR_NAME)
+            zip_path = os.path.join(get_tmp_dir(), self.ZIP_NAME)
+            tar_path = os.path.join(get_tmp_dir(), self.TAR_NAME)
 
             write_to_file(zip_path, data, 'wb')
 
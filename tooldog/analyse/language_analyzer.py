@@ -5,7 +5,7 @@ import os
 import codecs
 from .container import Container
 from .utils import *
-from tooldog import TMP_DIR
+from tooldog.tmp import get_tmp_dir
 
 LOGGER = logging.getLogger(__name__)
 
@@ -94,7 +94,7 @@ class PythonAnalyzer(LanguageAnalyzer):
             if output.startswith("b'"):
                 output = codecs.decode(output, 'unicode_escape')[2:-1]
         if if_installed(toolname, output) and not output.lstrip().startswith('Traceback'):
-            output_path = os.path.join(TMP_DIR, tool_filename(toolname, self.gen_format))
+            output_path = os.path.join(get_tmp_dir(), tool_filename(toolname, self.gen_format))
 
             write_to_file(output_path, output, 'w')
 
@@ -1,3 +1,5 @@
-from .galaxy import GalaxyToolGen
-from .cwl import CwlToolGen
-from .edam_to_galaxy import GalaxyInfo, EdamInfo, EdamToGalaxy
+"""
+Generation of Galaxy XML (:mod:`tooldog.annotate.galaxy`) and CWL
+(:mod:`tooldog.annotate.cwl`). The backends are not imported with the package so each run
+only loads the libraries of the format it generates.
+"""
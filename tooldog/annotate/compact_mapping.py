@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+
+"""
+Compact binary format of the EDAM to Galaxy datatypes mapping.
+
+The file is memory-mapped and read in place: loading it parses nothing but a small
+header, and all processes using the same file share one copy in the page cache.
+
+Layout (little-endian)::
+
+    header    magic, format version, sizes of the sections, SHA-1 of the JSON mapping
+              the file was built from
+    info      JSON object with edam_version, galaxy_url and galaxy_version
+    datatypes offsets (uint32) and UTF-8 names of the distinct Galaxy datatypes
+    format    sorted numbers of the EDAM formats (uint32, e.g. 1930 for format_1930)
+              followed by the index of their datatype (uint16)
+    data      same for the EDAM data
+"""
+
+#  Import  ------------------------------
+
+# General libraries
+import os
+import re
+import json
+import mmap
+import struct
+import hashlib
+import logging
+from collections.abc import Mapping
+
+# Class and Objects
+from tooldog.cache import write_bytes
+
+#  Constant(s)  ------------------------------
+
+LOGGER = logging.getLogger(__name__)
+
+MAGIC = b'TDGMAP'
+FORMAT_VERSION = 1
+EXTENSION = '.map'
+KINDS = ['format', 'data']
+# magic, version, info size, number of datatypes, size of datatype names,
+# number of formats, number of data, SHA-1 of the source
+HEADER = struct.Struct('<6sHIIIII20s')
+TERM_REGEX = re.compile(r'^(format|data)_([0-9]+)$')
+ID_WIDTH = 4  # EDAM numbers are written with at least 4 digits
+
+#  Function(s)  ------------------------------
+
+
+def _align(offset):
+    """
+    Next offset aligned on 4 bytes.
+    """
+    return (offset + 3) & ~3
+
+
+def term_number(term, kind):
+    """
+    :return: number of an EDAM term of a kind (e.g. 1930 for format_1930), None if the id
+        is not a canonical EDAM id of this kind.
+    :rtype: INT
+    """
+    match = TERM_REGEX.match(term) if isinstance(term, str) else None
+    if match is None or match.group(1) != kind:
+        return None
+    number = int(match.group(2))
+    if str(number).zfill(ID_WIDTH) != match.group(2):
+        return None
+    return number
+
+
+def compact_path(mapping_json):
+    """
+    :param mapping_json: path to a mapping in JSON.
+    :type mapping_json: STRING
+    :return: path to the compact mapping built from it.
+    :rtype: STRING
+    """
+    return os.path.splitext(mapping_json)[0] + EXTENSION
+
+
+def file_digest(path):
+    """
+    :return: SHA-1 of the content of a file.
+    :rtype: BYTES
+    """
+    with open(path, 'rb') as source:
+        return hashlib.sha1(source.read()).digest()
+
+
+def is_compact(path):
+    """
+    :return: True if the file is a compact mapping.
+    :rtype: BOOLEAN
+    """
+    try:
+        with open(path, 'rb') as mapping_file:
+            return mapping_file.read(len(MAGIC)) == MAGIC
+    except (IOError, OSError):
+        return False
+
+
+def pack_mapping(format_to_datatype, data_to_datatype, info, digest=b''):
+    """
+    Build the compact mapping.
+
+    :param format_to_datatype: datatype of each EDAM format.
+    :type format_to_datatype: DICT
+    :param data_to_datatype: datatype of each EDAM data.
+    :type data_to_datatype: DICT
+    :param info: edam_version, galaxy_url and galaxy_version of the mapping.
+    :type info: DICT
+    :param digest: SHA-1 of the JSON mapping it is built from.
+    :type digest: BYTES
+    :return: content of the compact mapping.
+    :rtype: BYTES
+    """
+    mappings = {'format': format_to_datatype, 'data': data_to_datatype}
+    # Intern datatypes: each name is stored once
+    datatypes = sorted(set(mappings['format'].values()) | set(mappings['data'].values()))
+    if len(datatypes) > 0xFFFF:
+        raise ValueError("Too many datatypes for a compact mapping: " + str(len(datatypes)))
+    datatype_index = {datatype: index for index, datatype in enumerate(datatypes)}
+    names = [datatype.encode('utf-8') for datatype in datatypes]
+    offsets = [0]
+    for name in names:
+        offsets.append(offsets[-1] + len(name))
+    sections = []
+    for kind in KINDS:
+        terms = []
+        for term, datatype in mappings[kind].items():
+            number = term_number(term, kind)
+            if number is None:
+                raise ValueError("EDAM " + kind + " id not supported: " + term)
+            terms.append((number, datatype_index[datatype]))
+        terms.sort()
+        sections.append(terms)
+    info_bytes = json.dumps(info, sort_keys=True).encode('utf-8')
+    content = bytearray(HEADER.pack(MAGIC, FORMAT_VERSION, len(info_bytes), len(datatypes),
+                                    offsets[-1], len(sections[0]), len(sections[1]),
+                                    digest.ljust(20, b'\0')))
+    content += info_bytes
+    content += b'\0' * (_align(len(content)) - len(content))
+    content += struct.pack('<' + str(len(offsets)) + 'I', *offsets)
+    content += b''.join(names)
+    for terms in sections:
+        content += b'\0' * (_align(len(content)) - len(content))
+        content += struct.pack('<' + str(len(terms)) + 'I', *[term[0] for term in terms])
+        content += struct.pack('<' + str(len(terms)) + 'H', *[term[1] for term in terms])
+    return bytes(content)
+
+
+def write_compact(path, format_to_datatype, data_to_datatype, info, source=None):
+    """
+    Write a compact mapping (atomically, see :func:`tooldog.cache.write_bytes`).
+
+    :param path: path to the compact mapping.
+    :type path: STRING
+    :param source: path to the JSON mapping it is built from (checked when loading it).
+    :type source: STRING
+
+    See :func:`tooldog.annotate.compact_mapping.pack_mapping` for the other parameters.
+    """
+    digest = file_digest(source) if source is not None else b''
+    write_bytes(path, pack_mapping(format_to_datatype, data_to_datatype, info, digest))
+    LOGGER.info("Wrote compact EDAM mapping to Galaxy datatypes to " + path)
+
+
+def convert(mapping_json, path=None):
+    """
+    Build the compact mapping of a JSON mapping (as exported by
+    :meth:`tooldog.annotate.edam_to_galaxy.EdamToGalaxy.export_info`).
+
+    :param mapping_json: path to the JSON mapping.
+    :type mapping_json: STRING
+    :param path: path to the compact mapping (next to the JSON mapping by default).
+    :type path: STRING
+    :return: path to the compact mapping.
+    :rtype: STRING
+    """
+    if path is None:
+        path = compact_path(mapping_json)
+    with open(mapping_json, 'r') as json_file:
+        content = json.load(json_file)
+    info = {key: content[key] for key in ['edam_version', 'galaxy_url', 'galaxy_version']}
+    write_compact(path, content['format'], content['data'], info, source=mapping_json)
+    return path
+
+
+def load_compact(path, source=None):
+    """
+    Open a compact mapping.
+
+    :param path: path to the compact mapping.
+    :type path: STRING
+    :param source: path to the JSON mapping it should be built from. The compact mapping
+        is not used if it was built from another content.
+    :type source: STRING
+    :return: compact mapping, None if it is missing, invalid or outdated.
+    :rtype: :class:`tooldog.annotate.compact_mapping.CompactMapping`
+    """
+    try:
+        compact = CompactMapping(path)
+    except (IOError, OSError, ValueError):
+        return None
+    if source is not None and os.path.isfile(source) and \
+       compact.digest != file_digest(source):
+        LOGGER.info("Compact mapping " + path + " is outdated")
+        return None
+    return compact
+
+#  Class(es)  ------------------------------
+
+
+class CompactMapping(object):
+    """
+    Memory-mapped compact mapping. The datatypes of EDAM formats and data are read in
+    place through :attr:`format_to_datatype` and :attr:`data_to_datatype`.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: path to the compact mapping.
+        :type path: STRING
+        """
+        self.path = path
+        with open(path, 'rb') as mapping_file:
+            self.buffer = mmap.mmap(mapping_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.buffer) < HEADER.size:
+            raise ValueError("Not a compact mapping: " + path)
+        magic, version, info_size, nb_datatypes, names_size, nb_format, nb_data, digest = \
+            HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a compact mapping (version " + str(FORMAT_VERSION) +
+                             "): " + path)
+        self.digest = digest
+        offset = HEADER.size
+        self.info = json.loads(self.buffer[offset:offset + info_size].decode('utf-8'))
+        self.nb_datatypes = nb_datatypes
+        self.offsets_start = _align(offset + info_size)
+        self.names_start = self.offsets_start + 4 * (nb_datatypes + 1)
+        offset = self.names_start + names_size
+        sections = {}
+        for kind, size in zip(KINDS, [nb_format, nb_data]):
+            offset = _align(offset)
+            sections[kind] = (offset, offset + 4 * size, size)
+            offset += 6 * size
+        if offset > len(self.buffer):
+            raise ValueError("Truncated compact mapping: " + path)
+        self.datatypes = {}  # Datatypes decoded so far, by index
+        self.format_to_datatype = CompactSection(self, 'format', *sections['format'])
+        self.data_to_datatype = CompactSection(self, 'data', *sections['data'])
+
+    def datatype(self, index):
+        """
+        :param index: index of a datatype.
+        :type index: INT
+        :return: name of the datatype.
+        :rtype: STRING
+        """
+        if index not in self.datatypes:
+            start, end = struct.unpack_from('<II', self.buffer,
+                                            self.offsets_start + 4 * index)
+            self.datatypes[index] = \
+                self.buffer[self.names_start + start:self.names_start + end].decode('utf-8')
+        return self.datatypes[index]
+
+
+class CompactSection(Mapping):
+    """
+    Read-only mapping of the EDAM terms of one kind (format or data) to their datatype,
+    looked up by binary search in the memory-mapped file.
+    """
+
+    def __init__(self, compact, kind, ids_start, indexes_start, size):
+        self.compact = compact
+        self.kind = kind
+        self.ids_start = ids_start
+        self.indexes_start = indexes_start
+        self.size = size
+
+    def _term_id(self, position):
+        return struct.unpack_from('<I', self.compact.buffer, self.ids_start + 4 * position)[0]
+
+    def _datatype(self, position):
+        index = struct.unpack_from('<H', self.compact.buffer,
+                                   self.indexes_start + 2 * position)[0]
+        return self.compact.datatype(index)
+
+    def __getitem__(self, term):
+        term_id = term_number(term, self.kind)
+        if term_id is None:
+            raise KeyError(term)
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self._term_id(middle) < term_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.size and self._term_id(low) == term_id:
+            return self._datatype(low)
+        raise KeyError(term)
+
+    def __iter__(self):
+        for position in range(self.size):
+            yield self.kind + '_' + str(self._term_id(position)).zfill(ID_WIDTH)
+
+    def __len__(self):
+        return self.size
@@ -13,6 +13,7 @@ import logging
 
 # External libraries
 import cwlgen
+import ruamel.yaml
 from cwlgen.import_cwl import CWLToolParser
 
 # Class and Objects
@@ -21,6 +22,49 @@ from cwlgen.import_cwl import CWLToolParser
 
 LOGGER = logging.getLogger(__name__)
 
+# Multiline doc of the tools, registered once (cwlgen does it on each export)
+ruamel.yaml.add_representer(cwlgen.literal, cwlgen.literal_presenter)
+
+#  Function(s)  ------------------------------
+
+
+def dump_cwl(tool):
+    """
+    Build the CWL of a tool in memory. The YAML is built from the same content as
+    :meth:`cwlgen.CommandLineTool.export`, which can only write to a path or to STDOUT.
+    It is used for both the files and the in-memory export, so they are identical.
+
+    :param tool: CWL tool.
+    :type tool: :class:`cwlgen.CommandLineTool`
+    :return: CWL of the tool.
+    :rtype: STRING
+    """
+    cwl_tool = {k: v for k, v in vars(tool).items() if v is not None and type(v) is str}
+    cwl_tool['class'] = tool.__CLASS__
+    if tool.doc:
+        cwl_tool['doc'] = cwlgen.literal(tool.doc)
+    cwl_tool['arguments'] = [in_arg.get_dict() for in_arg in tool.arguments]
+    cwl_tool['inputs'] = {}
+    for in_param in tool.inputs:
+        cwl_tool['inputs'][in_param.id] = in_param.get_dict()
+    cwl_tool['outputs'] = {}
+    for out_param in tool.outputs:
+        cwl_tool['outputs'][out_param.id] = out_param.get_dict()
+    if getattr(tool, 'metadata', None):
+        for key, value in tool.metadata.__dict__.items():
+            cwl_tool["s:" + key] = value
+        # Namespaces, without the ones of imported descriptions ($namespaces)
+        cwl_tool[tool.namespaces.name] = {}
+        for key, value in tool.namespaces.__dict__.items():
+            if '$' not in value:
+                cwl_tool[tool.namespaces.name][key] = value
+    requirements = {}
+    for requirement in getattr(tool, 'requirements', []):
+        requirement.add(requirements)
+    if requirements:
+        cwl_tool['requirements'] = requirements
+    return cwlgen.CWL_SHEBANG + '\n\n' + ruamel.yaml.dump(cwl_tool)
+
 #  Class(es)  ------------------------------
 
 
@@ -58,6 +102,24 @@ class CwlToolGen(object):
                                                cwl_version='v1.0')
         self._set_meta_from_biotool(biotool)
 
+    def set_function(self, function):
+        """
+        Replace the inputs and outputs of the tool by the ones of a function. The tools of
+        all the functions of an entry are written from the same object, the rest of the
+        description being shared.
+
+        :param function: Function object.
+        :type function: :class:`tooldog.biotool_model.Function`
+        """
+        self.tool.inputs = []
+        self.tool.outputs = []
+        self.input_ct = 0
+        self.output_ct = 0
+        for inp in function.inputs:
+            self.add_input_file(inp)
+        for outp in function.outputs:
+            self.add_output_file(outp)
+
     def add_input_file(self, input_obj):
         """
         Add an input to the CWL tool.
@@ -176,6 +238,9 @@ class CwlToolGen(object):
         :type out_file: STRING
         :param index: Index in case more than one function is described.
         :type index: INT
+
+        :return: path to the written file (None if written on STDOUT).
+        :rtype: STRING
         """
         # Give CWL on STDout
         if out_file is None:
@@ -183,6 +248,7 @@ class CwlToolGen(object):
                 print('########## CWL number ' + str(index) + ' ##########')
             LOGGER.info("Writing CWL file to STDOUT...")
             self.tool.export()
+            return None
         else:
             # Format name for output file(s)
             if index is not None:
@@ -190,4 +256,16 @@ class CwlToolGen(object):
             else:
                 out_file = os.path.splitext(out_file)[0] + '.cwl'
             LOGGER.info("Writing CWL file to " + out_file)
-            self.tool.export(out_file)
+            with open(out_file, 'w', encoding='utf-8') as cwl_file:
+                cwl_file.write(dump_cwl(self.tool))
+            return out_file
+
+    def export_cwl(self, handle):
+        """
+        Write the CWL of the tool to a binary file object (same bytes as the files written
+        by :meth:`tooldog.annotate.cwl.CwlToolGen.write_cwl`).
+
+        :param handle: binary file object.
+        :type handle: file object
+        """
+        handle.write(dump_cwl(self.tool).encode('utf-8'))
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+"""
+Streaming parser of the EDAM ontology (`EDAM.owl`, RDF/XML).
+
+Only what ToolDog uses is extracted: `rdfs:subClassOf` edges, `oboInOwl:inSubset`
+membership, `rdfs:label` and `doap:Version`. Classes are read one at a time with
+lxml iterparse and dropped once read, so no graph of the ontology is ever built.
+"""
+
+#  Import  ------------------------------
+
+# General libraries
+import os
+import logging
+
+# External libraries
+from lxml import etree
+
+#  Constant(s)  ------------------------------
+
+LOGGER = logging.getLogger(__name__)
+
+RDF = '{http://www.w3.org/1999/02/22-rdf-syntax-ns#}'
+RDFS = '{http://www.w3.org/2000/01/rdf-schema#}'
+OWL = '{http://www.w3.org/2002/07/owl#}'
+OBO_IN_OWL = '{http://www.geneontology.org/formats/oboInOwl#}'
+DOAP = '{http://usefulinc.com/ns/doap#}'
+
+FORMATS_SUBSET = 'http://purl.obolibrary.org/obo/edam#formats'
+DATA_SUBSET = 'http://purl.obolibrary.org/obo/edam#data'
+
+#  Function(s)  ------------------------------
+
+
+def _edam_id(uri):
+    """
+    Get the EDAM id (e.g. format_1930) from the uri.
+    """
+    return uri.split('/')[-1]
+
+
+def iter_classes(source):
+    """
+    Read the named classes of an OWL file.
+
+    :param source: path or binary stream of the OWL file.
+    :type source: STRING or file object
+    :return: generator of (uri, label, parent uris, subset uris) or ('version', version)
+        when the version of the ontology is read.
+    :rtype: GENERATOR of TUPLE
+    """
+    context = etree.iterparse(source, events=('end',), tag=(OWL + 'Class', DOAP + 'Version'),
+                              huge_tree=True)
+    for _, elem in context:
+        if elem.tag == DOAP + 'Version':
+            yield ('version', (elem.text or '').strip())
+            continue
+        parent = elem.getparent()
+        if parent is None or parent.tag != RDF + 'RDF':
+            # Anonymous classes nested in restrictions are read with their named class
+            continue
+        uri = elem.get(RDF + 'about')
+        if uri is not None:
+            label = None
+            parents = []
+            subsets = []
+            for child in elem:
+                if child.tag == RDFS + 'subClassOf':
+                    resource = child.get(RDF + 'resource')
+                    if resource is not None:
+                        parents.append(resource)
+                elif child.tag == OBO_IN_OWL + 'inSubset':
+                    subsets.append(child.get(RDF + 'resource'))
+                elif child.tag == RDFS + 'label' and label is None:
+                    label = child.text
+            yield (uri, label, parents, subsets)
+        # Free the class and the ones read before
+        elem.clear()
+        while elem.getprevious() is not None:
+            del parent[0]
+
+
+def _open_source(edam_url):
+    """
+    Open a local or remote OWL file as a binary stream.
+    """
+    if os.path.isfile(edam_url):
+        return open(edam_url, 'rb')
+    from tooldog.http_client import get_client
+    response = get_client().get(edam_url, stream=True)
+    response.raise_for_status()
+    response.raw.decode_content = True
+    return response.raw
+
+
+def parse_edam(edam_url):
+    """
+    Parse an EDAM ontology.
+
+    :param edam_url: path or URL to the EDAM.owl file.
+    :type edam_url: STRING
+    :return: version, format_hierarchy and data_hierarchy (parents of each term within
+        the formats or data subset) and labels of the formats and data.
+    :rtype: DICT
+    """
+    LOGGER.info("Parsing EDAM ontology from " + edam_url)
+    version = None
+    parents = {}
+    subsets = {}
+    labels = {}
+    with _open_source(edam_url) as stream:
+        for item in iter_classes(stream):
+            if item[0] == 'version':
+                version = version or item[1]
+                continue
+            uri, label, term_parents, term_subsets = item
+            if term_parents:
+                parents[uri] = term_parents
+            if term_subsets:
+                subsets[uri] = set(term_subsets)
+            if label is not None:
+                labels[uri] = label
+
+    def make_hierarchy(subset):
+        """
+        Keep the parents belonging to the subset.
+        """
+        hierarchy = {}
+        for uri, term_parents in parents.items():
+            in_subset = [_edam_id(p_uri) for p_uri in term_parents
+                         if subset in subsets.get(p_uri, ())]
+            if in_subset:
+                hierarchy[_edam_id(uri)] = in_subset
+        return hierarchy
+
+    terms_labels = {}
+    for uri, label in labels.items():
+        if subsets.get(uri, set()) & set([FORMATS_SUBSET, DATA_SUBSET]):
+            terms_labels[_edam_id(uri)] = label
+    return {'version': version,
+            'format_hierarchy': make_hierarchy(FORMATS_SUBSET),
+            'data_hierarchy': make_hierarchy(DATA_SUBSET),
+            'labels': terms_labels}
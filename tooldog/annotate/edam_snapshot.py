@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+"""
+Compiled snapshots of the EDAM ontology.
+
+Parsing `EDAM.owl` is slow and needs a lot of memory, while ToolDog only uses the
+hierarchies of formats and data, their labels and the version of the ontology. These are
+saved in a small JSON snapshot per EDAM release in the ToolDog cache directory. The
+version is read from the header of the OWL file, so a snapshot is found without parsing
+the ontology.
+"""
+
+#  Import  ------------------------------
+
+# General libraries
+import os
+import re
+import json
+import logging
+
+# Class and Objects
+from tooldog.cache import cache_dir, write_json
+
+#  Constant(s)  ------------------------------
+
+LOGGER = logging.getLogger(__name__)
+
+EDAM_URL = 'http://edamontology.org/EDAM.owl'
+SNAPSHOT_FORMAT = 1  # Changed when the content of snapshots changes
+HEADER_SIZE = 1 << 16  # The version is given in the first lines of EDAM.owl
+VERSION_REGEX = re.compile(r'<doap:Version>\s*([^<\s]+)\s*</doap:Version>')
+
+#  Function(s)  ------------------------------
+
+
+def _read_header(edam_url, size=HEADER_SIZE):
+    """
+    Read the beginning of a local or remote OWL file.
+    """
+    if os.path.isfile(edam_url):
+        with open(edam_url, 'rb') as owl_file:
+            return owl_file.read(size).decode('utf-8', 'replace')
+    from tooldog.http_client import get_client
+    response = get_client().get(edam_url, stream=True)
+    try:
+        response.raise_for_status()
+        header = b''
+        for chunk in response.iter_content(chunk_size=8192):
+            header += chunk
+            if len(header) >= size or VERSION_REGEX.search(header.decode('utf-8', 'replace')):
+                break
+        return header.decode('utf-8', 'replace')
+    finally:
+        response.close()
+
+
+def detect_version(edam_url=EDAM_URL):
+    """
+    Detect the version of an EDAM ontology from the header of its OWL file.
+
+    :param edam_url: path or URL to the EDAM.owl file.
+    :type edam_url: STRING
+    :return: version of EDAM, None if it is not found.
+    :rtype: STRING
+    """
+    try:
+        match = VERSION_REGEX.search(_read_header(edam_url))
+    except Exception as exc:
+        LOGGER.warning("Could not read the header of " + edam_url + ": " + repr(exc))
+        return None
+    if match is None:
+        return None
+    return match.group(1)
+
+
+def snapshot_path(version):
+    """
+    :param version: version of EDAM.
+    :type version: STRING
+    :return: path to the snapshot of this version in the cache.
+    :rtype: STRING
+    """
+    name = re.sub(r'[^A-Za-z0-9._-]', '_', version)
+    return os.path.join(cache_dir('edam'), 'EDAM_' + name + '.json')
+
+
+def load_snapshot(version):
+    """
+    Load the snapshot of an EDAM version if it was built before.
+
+    :param version: version of EDAM.
+    :type version: STRING
+    :return: snapshot with keys version, format_hierarchy, data_hierarchy and labels,
+        None if there is none.
+    :rtype: DICT
+    """
+    path = snapshot_path(version)
+    try:
+        with open(path, 'r') as snapshot_file:
+            snapshot = json.load(snapshot_file)
+    except (IOError, OSError, ValueError):
+        return None
+    if snapshot.get('snapshot_format') != SNAPSHOT_FORMAT or \
+       snapshot.get('version') != version:
+        return None
+    LOGGER.info("Loaded EDAM " + version + " from snapshot " + path)
+    return snapshot
+
+
+def save_snapshot(version, format_hierarchy, data_hierarchy, labels):
+    """
+    Save the snapshot of an EDAM version. The file is replaced atomically so concurrent
+    runs never read a partial snapshot.
+
+    :param version: version of EDAM.
+    :type version: STRING
+    :param format_hierarchy: parents of each EDAM format.
+    :type format_hierarchy: DICT
+    :param data_hierarchy: parents of each EDAM data.
+    :type data_hierarchy: DICT
+    :param labels: label of each EDAM term.
+    :type labels: DICT
+    :return: path to the snapshot.
+    :rtype: STRING
+    """
+    path = snapshot_path(version)
+    write_json(path, {'snapshot_format': SNAPSHOT_FORMAT, 'version': version,
+                      'format_hierarchy': format_hierarchy,
+                      'data_hierarchy': data_hierarchy, 'labels': labels},
+               sort_keys=True)
+    LOGGER.info("Saved snapshot of EDAM " + version + " to " + path)
+    return path
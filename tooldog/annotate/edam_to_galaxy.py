@@ -9,20 +9,337 @@ and EDAM ontology (by default from http://edamontology.org/EDAM.owl)
 
 # General libraries
 import os
+import re
 import json
 import logging
+import threading
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
 
-# External libraries
-import requests
-import rdflib
+# Class and Objects
+from tooldog.cache import cache_dir, write_json
+from tooldog.annotate import edam_snapshot, edam_owl, compact_mapping
 
 #  Constant(s)  ------------------------------
 
 LOCAL_DATA = os.path.dirname(__file__) + "/data"
+# Parts of the Galaxy API needed for the mapping (besides /api/version)
+GALAXY_API = {'edam_formats': "/api/datatypes/edam_formats",
+              'edam_data': "/api/datatypes/edam_data",
+              'mapping': "/api/datatypes/mapping"}
 
 # Logger
 LOGGER = logging.getLogger(__name__)
 
+NO_MAPPING = "NO mapping"
+
+# Mappings shared by the whole process, keyed by their source
+_MAPPINGS = {}
+_MAPPINGS_LOCK = threading.Lock()
+
+#  Function(s)  ------------------------------
+
+
+def map_hierarchy(edam_hierarchy, galaxy_mapping, select_root, known=None):
+    """
+    Maps all EDAM terms of a hierarchy to a Galaxy datatype.
+
+    A term described by Galaxy takes its datatype (select_root chooses between several
+    ones), other terms take the datatype of their first parent that has one. Terms are
+    resolved in topological order (parents first) without recursion and the datatype of
+    each term is computed once and reused by all its descendants. Parents missing from the
+    hierarchy are roots and parents closing a cycle are ignored.
+
+    :param edam_hierarchy: edam_hierarchy from :class:`tooldog.edam_to_galaxy.EdamInfo`
+    :type edam_hierarchy: DICT
+    :param galaxy_mapping: mapping from :class:`tooldog.edam_to_galaxy.GalaxyInfo`
+    :type galaxy_mapping: DICT
+    :param select_root: function choosing the datatype among several ones.
+    :type select_root: FUNCTION
+    :param known: datatypes of terms that are not computed again.
+    :type known: DICT
+    :return: mapping EDAM term to Galaxy datatype (unique mapping) and report with the
+        cycles found and the unmapped terms.
+    :rtype: TUPLE of (DICT, DICT)
+    """
+    resolved = dict(known or {})
+    in_progress = set()
+    cycles = []
+
+    def direct_datatype(edam):
+        """
+        Datatype given by Galaxy for the term itself, None if there is none.
+        """
+        datatypes = galaxy_mapping.get(edam)
+        if not datatypes:
+            return None
+        if len(datatypes) == 1:
+            return datatypes[0]
+        LOGGER.debug("More than one datatypes found for " + edam)
+        return select_root(datatypes)
+
+    def start(edam, stack):
+        """
+        Resolve the term if Galaxy describes it, put it on the stack otherwise.
+        """
+        datatype = direct_datatype(edam)
+        if datatype is not None:
+            resolved[edam] = datatype
+        else:
+            in_progress.add(edam)
+            stack.append([edam, 0])
+
+    for term in edam_hierarchy:
+        if term in resolved:
+            continue
+        stack = []
+        start(term, stack)
+        while stack:
+            edam, index = stack[-1]
+            parents = edam_hierarchy.get(edam, [])
+            datatype = NO_MAPPING
+            pushed = False
+            while index < len(parents):
+                parent = parents[index]
+                if parent not in resolved and parent not in in_progress:
+                    # Resolve the parent first, then come back to it
+                    stack[-1][1] = index
+                    start(parent, stack)
+                    if parent not in resolved:
+                        pushed = True
+                        break
+                if parent in resolved:
+                    if resolved[parent] != NO_MAPPING:
+                        datatype = resolved[parent]
+                        break
+                else:
+                    cycle = [item[0] for item in stack]
+                    cycles.append(cycle[cycle.index(parent):] + [parent])
+                index += 1
+            if pushed:
+                continue
+            if datatype == NO_MAPPING:
+                LOGGER.debug("No datatype found for " + edam + " and its parents.")
+            resolved[edam] = datatype
+            in_progress.discard(edam)
+            stack.pop()
+
+    mapping = {}
+    unmapped = []
+    for term in edam_hierarchy:
+        mapping[term] = resolved[term]
+        if mapping[term] == NO_MAPPING:
+            unmapped.append(term)
+    for cycle in cycles:
+        LOGGER.warning("Cycle in EDAM hierarchy: " + " -> ".join(cycle))
+    LOGGER.info(str(len(mapping) - len(unmapped)) + " EDAM terms mapped to a datatype, " +
+                str(len(unmapped)) + " without datatype.")
+    return mapping, {'cycles': cycles, 'unmapped': unmapped}
+
+
+def galaxy_cache_path(galaxy_url, version):
+    """
+    Path to the cached answers of the API of a Galaxy instance for a given version.
+
+    :param galaxy_url: URL of the Galaxy instance.
+    :type galaxy_url: STRING
+    :param version: answer of /api/version.
+    :type version: DICT
+    :rtype: STRING
+    """
+    instance = re.sub(r'[^A-Za-z0-9.-]+', '_', galaxy_url.split('://')[-1].strip('/'))
+    return os.path.join(cache_dir('galaxy', instance),
+                        'api_' + galaxy_release(version) + '.json')
+
+
+def galaxy_release(version):
+    """
+    :param version: answer of /api/version of a Galaxy instance.
+    :type version: DICT
+    :return: full version of the instance (e.g. 17.09.1).
+    :rtype: STRING
+    """
+    release = str(version.get('version_major'))
+    if version.get('version_minor'):
+        release += '.' + str(version['version_minor'])
+    return release
+
+
+def fetch_galaxy_api(galaxy_url, use_cache=True):
+    """
+    Get the answers of the Galaxy API used for the mapping. Only /api/version is asked if
+    the answers for this version are cached, otherwise the other parts of the API are
+    fetched concurrently and cached.
+
+    :param galaxy_url: URL of the Galaxy instance.
+    :type galaxy_url: STRING
+    :param use_cache: use and fill the cache of the answers.
+    :type use_cache: BOOLEAN
+    :return: answers of the API (version, edam_formats, edam_data and mapping).
+    :rtype: DICT
+    """
+    from tooldog.http_cache import cached_get
+    from tooldog.http_client import get_client
+    response = get_client().get(galaxy_url + "/api/version")
+    response.raise_for_status()
+    version = response.json()
+    path = galaxy_cache_path(galaxy_url, version) if use_cache else None
+    if path is not None and os.path.isfile(path):
+        LOGGER.info("Loading galaxy info of " + galaxy_url + " from " + path)
+        with open(path, 'r') as json_file:
+            return json.load(json_file)
+    with ThreadPoolExecutor(max_workers=len(GALAXY_API)) as executor:
+        futures = {}
+        for key, api_path in GALAXY_API.items():
+            futures[key] = executor.submit(cached_get, galaxy_url + api_path)
+        answers = {'version': version}
+        for key, future in futures.items():
+            response = future.result()
+            response.raise_for_status()
+            answers[key] = response.json()
+    if path is not None:
+        write_json(path, answers)
+    return answers
+
+
+def mapping_cache_path(galaxy_url, galaxy_release, edam_version):
+    """
+    Path to the mapping of a Galaxy instance and version with an EDAM version in the
+    cache. A new version of Galaxy or EDAM gives a new path, so outdated mappings are
+    never used.
+
+    :param galaxy_url: URL of the Galaxy instance.
+    :type galaxy_url: STRING
+    :param galaxy_release: full version of the Galaxy instance.
+    :type galaxy_release: STRING
+    :param edam_version: version of EDAM.
+    :type edam_version: STRING
+    :rtype: STRING
+    """
+    instance = re.sub(r'[^A-Za-z0-9.-]+', '_', galaxy_url.split('://')[-1].strip('/'))
+    name = 'galaxy_' + galaxy_release + '_edam_' + edam_version
+    name = re.sub(r'[^A-Za-z0-9._-]+', '_', name)
+    return os.path.join(cache_dir('mapping', instance), name + '.json')
+
+
+def get_mapping(galaxy_url=None, edam_url=None, mapping_json=None):
+    """
+    Get the mapping of a source, loaded once per process and shared by all the tools
+    generated afterwards. Shared mappings are read-only.
+
+    :param galaxy_url: URL of the galaxy instance.
+    :type galaxy_url: STRING
+    :param edam_url: path to EDAM.owl file (URL or local path).
+    :type edam_url: STRING
+    :param mapping_json: path to personnalized EDAM mapping to Galaxy.
+    :type mapping_json: STRING
+    :rtype: :class:`tooldog.annotate.edam_to_galaxy.EdamToGalaxy`
+    """
+    if mapping_json is not None:
+        mapping_json = os.path.abspath(mapping_json)
+    key = (galaxy_url, edam_url, mapping_json)
+    with _MAPPINGS_LOCK:
+        if key not in _MAPPINGS:
+            etog = EdamToGalaxy(galaxy_url=galaxy_url, edam_url=edam_url,
+                                mapping_json=mapping_json)
+            # Compact mappings are read-only already
+            if isinstance(etog.format_to_datatype, dict):
+                etog.format_to_datatype = MappingProxyType(etog.format_to_datatype)
+                etog.data_to_datatype = MappingProxyType(etog.data_to_datatype)
+            _MAPPINGS[key] = etog
+        return _MAPPINGS[key]
+
+
+def clear_mappings():
+    """
+    Forget the shared mappings (they are loaded again on next use).
+    """
+    with _MAPPINGS_LOCK:
+        _MAPPINGS.clear()
+
+
+def affected_terms(old_hierarchy, new_hierarchy, old_galaxy, new_galaxy):
+    """
+    Find the EDAM terms whose datatype may change between two versions of the hierarchy
+    and of the Galaxy mapping: terms whose parents or datatypes changed, and all their
+    descendants in the new hierarchy.
+
+    :param old_hierarchy: previous EDAM hierarchy.
+    :type old_hierarchy: DICT
+    :param new_hierarchy: new EDAM hierarchy.
+    :type new_hierarchy: DICT
+    :param old_galaxy: previous mapping EDAM term to LIST of Galaxy datatypes.
+    :type old_galaxy: DICT
+    :param new_galaxy: new mapping EDAM term to LIST of Galaxy datatypes.
+    :type new_galaxy: DICT
+    :rtype: SET of STRING
+    """
+    changed = set()
+    for term in set(old_hierarchy) | set(new_hierarchy):
+        if old_hierarchy.get(term) != new_hierarchy.get(term):
+            changed.add(term)
+    for term in set(old_galaxy) | set(new_galaxy):
+        if old_galaxy.get(term) != new_galaxy.get(term):
+            changed.add(term)
+    children = {}
+    for term, parents in new_hierarchy.items():
+        for parent in parents:
+            children.setdefault(parent, []).append(term)
+    affected = set()
+    stack = list(changed)
+    while stack:
+        term = stack.pop()
+        if term in affected:
+            continue
+        affected.add(term)
+        stack.extend(children.get(term, []))
+    return affected
+
+
+def diff_mapping(old_mapping, new_mapping):
+    """
+    List the differences between two mappings of EDAM terms to datatypes.
+
+    :return: one change per term (term, old datatype, new datatype), None for missing.
+    :rtype: LIST of DICT
+    """
+    changes = []
+    for term in sorted(set(old_mapping) | set(new_mapping)):
+        old, new = old_mapping.get(term), new_mapping.get(term)
+        if old != new:
+            changes.append({'term': term, 'old': old, 'new': new})
+    return changes
+
+
+def update_mapping_file(mapping_json, galaxy_url=None, edam_url=None, changelog=None):
+    """
+    Update a mapping file previously exported by ToolDog to a new version of EDAM and/or
+    of the Galaxy instance, and write the changes to a JSON change log.
+
+    :param mapping_json: path to the mapping file (updated in place).
+    :type mapping_json: STRING
+    :param galaxy_url: URL of the galaxy instance.
+    :type galaxy_url: STRING
+    :param edam_url: path to EDAM.owl file (URL or local path).
+    :type edam_url: STRING
+    :param changelog: path to the change log (default: mapping_json with .changes.json).
+    :type changelog: STRING
+    :return: the change log.
+    :rtype: DICT
+    """
+    etog = EdamToGalaxy(mapping_json=mapping_json, use_compact=False)
+    edam = EdamInfo(edam_url)
+    edam.generate_hierarchy()
+    log = etog.update_mapping(edam, GalaxyInfo(galaxy_url))
+    etog.export_info(mapping_json,
+                     compact=os.path.isfile(compact_mapping.compact_path(mapping_json)))
+    if changelog is None:
+        changelog = os.path.splitext(mapping_json)[0] + '.changes.json'
+    with open(changelog, 'w') as changelog_file:
+        json.dump(log, changelog_file, indent=2, sort_keys=True)
+    LOGGER.info("Changes of the mapping written to " + changelog)
+    return log
+
 #  Class(es)  ------------------------------
 
 
@@ -34,10 +351,13 @@ class GalaxyInfo(object):
     located in the `data/` folder corresponding to https://usegalaxy.org.
     """
 
-    def __init__(self, galaxy_url):
+    def __init__(self, galaxy_url, use_cache=True):
         """
         :param galaxy_url: URL of the Galaxy instance.
         :type galaxy_url: STRING
+        :param use_cache: reuse the answers of the Galaxy API cached for the same version
+            (see :func:`tooldog.annotate.edam_to_galaxy.fetch_galaxy_api`).
+        :type use_cache: BOOLEAN
 
         :class:`tooldog.edam_to_galaxy.GalaxyInfo` object is initialized with several
         information from the given Galaxy instance. It contains:
@@ -69,12 +389,14 @@ class GalaxyInfo(object):
         else:
             self.galaxy_url = galaxy_url
             LOGGER.info("Loading galaxy info from " + galaxy_url + "/api")
-            api_edam_formats = requests.get(galaxy_url + "/api/datatypes/edam_formats").json()
-            api_edam_data = requests.get(galaxy_url + "/api/datatypes/edam_data").json()
-            mapping = requests.get(galaxy_url + "/api/datatypes/mapping").json()
-            version = requests.get(galaxy_url + "/api/version").json()
+            answers = fetch_galaxy_api(galaxy_url, use_cache=use_cache)
+            api_edam_formats = answers['edam_formats']
+            api_edam_data = answers['edam_data']
+            mapping = answers['mapping']
+            version = answers['version']
         # Get version of Galaxy instance
         self.version = version['version_major']
+        self.release = galaxy_release(version)
 
         def rev_dict(dictionnary):
             """
@@ -145,27 +467,65 @@ class EdamInfo(object):
 
     It is also possible to generate several dictionnaries to help interrogating the ontology
     for a faster access.
+
+    If a snapshot of the same EDAM version was built before (see
+    :mod:`tooldog.annotate.edam_snapshot`), the dictionnaries are loaded from it and the
+    ontology is not parsed. Otherwise they are filled by the streaming parser of
+    :mod:`tooldog.annotate.edam_owl`, or from a rdflib graph of the whole ontology.
     """
 
-    def __init__(self, edam_url):
+    def __init__(self, edam_url, use_snapshot=True, streaming=True):
         """
-        :param edam_url: path to EDAM.owl file
+        :param edam_url: path to EDAM.owl file (URL or local path)
         :type edam_url: STRING
+        :param use_snapshot: load and save snapshots of the ontology.
+        :type use_snapshot: BOOLEAN
+        :param streaming: use the streaming parser instead of a rdflib graph.
+        :type streaming: BOOLEAN
 
-        All the EDAM ontology will be contained in a dictionnary (self.edam_ontology).
-        """
-        if edam_url is None:
-            LOGGER.info("Loading EDAM info from http://edamontology.org/EDAM.owl")
-            self.edam_ontology = rdflib.Graph()
-            self.edam_ontology.parse("http://edamontology.org/EDAM.owl")
-            # Get version of EDAM ontology
-            version_query = """SELECT ?version WHERE {
-                                     <http://edamontology.org> doap:Version ?version}"""
-            for row in self.edam_ontology.query(version_query):
-                self.version = row[0]
-                break
-        else:
-            pass
+        With streaming=False, all the EDAM ontology will be contained in a rdflib graph
+        (self.edam_ontology).
+        """
+        self.edam_ontology = None
+        self.use_snapshot = use_snapshot
+        self.version = None
+        source = edam_url or edam_snapshot.EDAM_URL
+        if use_snapshot:
+            self.version = edam_snapshot.detect_version(source)
+            snapshot = None
+            if self.version is not None:
+                snapshot = edam_snapshot.load_snapshot(self.version)
+            if snapshot is not None:
+                self.edam_format_hierarchy = snapshot['format_hierarchy']
+                self.edam_data_hierarchy = snapshot['data_hierarchy']
+                self.edam_labels = snapshot['labels']
+                return
+        if streaming:
+            edam = edam_owl.parse_edam(source)
+            self.version = edam['version'] or self.version
+            self.edam_format_hierarchy = edam['format_hierarchy']
+            self.edam_data_hierarchy = edam['data_hierarchy']
+            self.edam_labels = edam['labels']
+            self.save_snapshot()
+            return
+        LOGGER.info("Loading EDAM info from " + source)
+        import rdflib
+        self.edam_ontology = rdflib.Graph()
+        self.edam_ontology.parse(source, format='xml')
+        # Get version of EDAM ontology
+        version_query = """SELECT ?version WHERE {
+                                 <http://edamontology.org> doap:Version ?version}"""
+        for row in self.edam_ontology.query(version_query):
+            self.version = str(row[0])
+            break
+
+    def save_snapshot(self):
+        """
+        Save the hierarchies and labels as the snapshot of this version of EDAM.
+        """
+        if self.use_snapshot and self.version is not None:
+            edam_snapshot.save_snapshot(self.version, self.edam_format_hierarchy,
+                                        self.edam_data_hierarchy, self.edam_labels)
 
     def generate_hierarchy(self):
         """
@@ -175,7 +535,13 @@ class EdamInfo(object):
         DICT[edam_uri] -> LIST of edam_uri from parents
 
         The dictionnary can be accessed via self.edam_format_hierarchy
+
+        Labels of the terms are stored in self.edam_labels and a snapshot of this version
+        of EDAM is saved.
         """
+        if self.edam_ontology is None:
+            # Already read from a snapshot or by the streaming parser
+            return
 
         def make_hierarchy(query):
             """
@@ -203,116 +569,234 @@ class EdamInfo(object):
                                  ?superdata oboInOwl:inSubset
                                 <http://purl.obolibrary.org/obo/edam#data>
                                  }"""
+        labels_query = """SELECT ?term ?label WHERE {
+                                   ?term rdfs:label ?label .
+                                   ?term oboInOwl:inSubset ?subset .
+                                   FILTER (?subset IN (
+                                       <http://purl.obolibrary.org/obo/edam#formats>,
+                                       <http://purl.obolibrary.org/obo/edam#data>))
+                                   }"""
         self.edam_format_hierarchy = make_hierarchy(formats_query)
         self.edam_data_hierarchy = make_hierarchy(data_query)
+        self.edam_labels = {}
+        for row in self.edam_ontology.query(labels_query):
+            self.edam_labels[row[0].split('/')[-1]] = str(row[1])
+        self.save_snapshot()
 
 
 class EdamToGalaxy(object):
     """
     Class to make the link between EDAM ontology terms (edam_format and edam_data) and Galaxy
     datatypes.
+
+    The mapping is never modified by the generation of tools, so copies of a tool keep a
+    reference to it instead of cloning it (see
+    :func:`tooldog.annotate.edam_to_galaxy.get_mapping` for the shared instances).
     """
 
-    def __init__(self, galaxy_url=None, edam_url=None, mapping_json=None):
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __init__(self, galaxy_url=None, edam_url=None, mapping_json=None, use_compact=True):
         """
         :param galaxy_url: URL of the galaxy instance.
         :type galaxy_url: STRING
         :param edam_url: path to EDAM.owl file (URL or local path).
         :type edam_url: STRING
-        :param mapping_json: path to personnalized EDAM mapping to Galaxy.
+        :param mapping_json: path to personnalized EDAM mapping to Galaxy (JSON or compact
+            mapping).
         :type mapping_json: STRING
+        :param use_compact: use the compact mapping next to the JSON mapping if it is up to
+            date (see :mod:`tooldog.annotate.compact_mapping`).
+        :type use_compact: BOOLEAN
+
+        With a galaxy_url or an edam_url and no mapping_json, the mapping is kept in the
+        cache directory for the versions of Galaxy and EDAM (see
+        :func:`tooldog.annotate.edam_to_galaxy.mapping_cache_path`), with its compact
+        mapping.
         """
+        self.galaxy = None
+        self.compact = None  # Compact mapping the datatypes are read from
+        cached = False
         if mapping_json is None:
             if galaxy_url or edam_url:
-                mapping_json = 'edam_to_galaxy.json'
+                mapping_json = self.cached_mapping_path(galaxy_url, edam_url)
+                cached = mapping_json is not None
             else:
                 mapping_json = LOCAL_DATA + "/edam_to_galaxy.json"
         # Generates or Loads ?
-        if os.path.isfile(mapping_json):
-            self.load_local_mapping(mapping_json)
+        if mapping_json is not None and os.path.isfile(mapping_json):
+            self.load_local_mapping(mapping_json, use_compact)
+            if cached and use_compact and self.compact is None:
+                self.export_compact(mapping_json)
         else:
             # No local file exists, needs to generate it (takes a little bit of time)
             self.edam = EdamInfo(edam_url)
             self.edam_version = self.edam.version
             self.edam.generate_hierarchy()
-            self.galaxy = GalaxyInfo(galaxy_url)
+            if self.galaxy is None:
+                self.galaxy = GalaxyInfo(galaxy_url)
             self.galaxy_url = self.galaxy.galaxy_url
             self.galaxy_version = self.galaxy.version
             self.generate_mapping()
-            self.export_info(mapping_json)
+            if mapping_json is not None:
+                self.export_info(mapping_json, compact=cached)
+
+    def cached_mapping_path(self, galaxy_url, edam_url):
+        """
+        Find the path of the mapping in the cache from the versions of Galaxy (one small
+        request, see :class:`tooldog.annotate.edam_to_galaxy.GalaxyInfo`) and of EDAM
+        (read from the header of the OWL file).
+
+        :return: path to the mapping, None if the version of EDAM is unknown.
+        :rtype: STRING
+        """
+        self.galaxy = GalaxyInfo(galaxy_url)
+        edam_version = edam_snapshot.detect_version(edam_url or edam_snapshot.EDAM_URL)
+        if edam_version is None:
+            LOGGER.warning("Version of EDAM unknown, the mapping will not be cached.")
+            return None
+        return mapping_cache_path(self.galaxy.galaxy_url, self.galaxy.release, edam_version)
 
     def generate_mapping(self):
         """
         Generates mapping between edam_format and edam_data to Galaxy datatypes
         based on the information of the Galaxy instance and the EDAM ontology.
 
-        Every edam_format and edam_data will be given a datatype.
+        Every edam_format and edam_data will be given a datatype (see
+        :func:`tooldog.annotate.edam_to_galaxy.map_hierarchy`). Cycles and terms without
+        datatype are reported in self.mapping_report.
         """
         LOGGER.info("Generating new EDAM mapping to Galaxy datatypes file...")
+        # Choice between several datatypes of a term, reused for identical lists
+        roots = {}
 
-        def find_datatype(edam, edam_hierarchy, galaxy_mapping):
-            """
-            Find the best datatype for a given EDAM term.
-            :param edam: EDAM term.
-            :type edam: STRING
-            :param edam_hierarchy: edam_hierarchy from :class:`tooldog.edam_to_galaxy.EdamInfo`
-            :type edam_hierarchy: DICT
-            :param galaxy_mapping: mapping from :class:`tooldog.edam_to_galaxy.GalaxyInfo`
-            :type galaxy_mapping: DICT
-
-            The function then create two dictionnaries: self.format_to_datatype and
-            self.data_to_datatype that represents a unique datatype for each EDAM term.
-            """
-            if edam not in galaxy_mapping:
-                LOGGER.debug("No datatype found for " + edam + ". Looking at parental terms.")
-                if len(edam_hierarchy[edam]) > 1:
-                    LOGGER.debug(edam + " inherits from more than one EDAM. " +
-                                 "Only first EDAM parent of the list is treated: " +
-                                 edam_hierarchy[edam][0])
-                elif len(edam_hierarchy[edam]) == 0:
-                    LOGGER.debug("No parental EDAM found. " + edam + " is skipped.")
-                    return "NO mapping"
-                datatype = find_datatype(edam_hierarchy[edam][0], edam_hierarchy,
-                                         galaxy_mapping)
-            elif len(galaxy_mapping[edam]) == 1:
-                LOGGER.debug("Exactly one datatype found for " + edam + ": " +
-                             galaxy_mapping[edam][0])
-                datatype = galaxy_mapping[edam][0]
-            elif len(galaxy_mapping[edam]) > 1:
-                LOGGER.debug("More than one datatypes found for " + edam)
-                datatype = self.galaxy.select_root(galaxy_mapping[edam])
-            return datatype
-
-        def maps_datatype(edam_hierarchy, galaxy_mapping):
-            """
-            Maps all edam terms to a Galaxy datatype.
-            :param edam_hierarchy: edam_hierarchy from :class:`tooldog.edam_to_galaxy.EdamInfo`
-            :type edam_hierarchy: DICT
-            :param galaxy_mapping: mapping from :class:`tooldog.edam_to_galaxy.GalaxyInfo`
-            :type galaxy_mapping: DICT
-            :return: mapping EDAM term to Galaxy datatype (unique mapping).
-            :rtype: DICT
-            """
-            map_to_datatype = {}
-            for edam in edam_hierarchy.keys():
-                map_to_datatype[edam] = find_datatype(edam, edam_hierarchy, galaxy_mapping)
-            return map_to_datatype
+        def select_root(datatypes):
+            key = tuple(datatypes)
+            if key not in roots:
+                roots[key] = self.galaxy.select_root(datatypes)
+            return roots[key]
 
+        self.mapping_report = {}
         # EDAM formats
-        self.format_to_datatype = maps_datatype(self.edam.edam_format_hierarchy,
-                                                self.galaxy.edam_formats)
+        self.format_to_datatype, self.mapping_report['format'] = \
+            map_hierarchy(self.edam.edam_format_hierarchy, self.galaxy.edam_formats,
+                          select_root)
         # EDAM data
-        self.data_to_datatype = maps_datatype(self.edam.edam_data_hierarchy,
-                                              self.galaxy.edam_data)
+        self.data_to_datatype, self.mapping_report['data'] = \
+            map_hierarchy(self.edam.edam_data_hierarchy, self.galaxy.edam_data,
+                          select_root)
+
+    def update_mapping(self, edam, galaxy):
+        """
+        Update the mapping to new EDAM and Galaxy information. Only terms whose parents or
+        datatypes changed, and their descendants, are computed again. If the inputs of the
+        previous mapping are unknown (mapping not exported by this version of ToolDog),
+        the whole mapping is generated again.
+
+        :param edam: new EDAM information (with the hierarchies generated).
+        :type edam: :class:`tooldog.edam_to_galaxy.EdamInfo`
+        :param galaxy: new Galaxy information.
+        :type galaxy: :class:`tooldog.edam_to_galaxy.GalaxyInfo`
+        :return: change log (previous and new versions, changed datatypes per term).
+        :rtype: DICT
+        """
+        old_inputs = self.mapping_inputs()
+        old_mappings = {'format': self.format_to_datatype, 'data': self.data_to_datatype}
+        log = {'from': {'edam_version': self.edam_version, 'galaxy_url': self.galaxy_url,
+                        'galaxy_version': self.galaxy_version},
+               'to': {'edam_version': edam.version, 'galaxy_url': galaxy.galaxy_url,
+                      'galaxy_version': galaxy.version}}
+        self.edam = edam
+        self.galaxy = galaxy
+        self.edam_version = edam.version
+        self.galaxy_url = galaxy.galaxy_url
+        self.galaxy_version = galaxy.version
+        if old_inputs is None:
+            LOGGER.info("Previous inputs of the mapping unknown, generating all of it")
+            self.generate_mapping()
+        else:
+            LOGGER.info("Updating EDAM mapping to Galaxy datatypes...")
+            roots = {}
+
+            def select_root(datatypes):
+                key = tuple(datatypes)
+                if key not in roots:
+                    roots[key] = self.galaxy.select_root(datatypes)
+                return roots[key]
+
+            self.mapping_report = {}
+            new_inputs = self.mapping_inputs()
+            for kind in ['format', 'data']:
+                hierarchy = new_inputs[kind + '_hierarchy']
+                galaxy_mapping = new_inputs['galaxy_' + kind]
+                affected = affected_terms(old_inputs[kind + '_hierarchy'], hierarchy,
+                                          old_inputs['galaxy_' + kind], galaxy_mapping)
+                # The choice between several datatypes depends on the Galaxy hierarchy
+                for term, datatypes in galaxy_mapping.items():
+                    if len(datatypes) > 1 and term not in affected and \
+                       select_root(datatypes) != old_mappings[kind].get(term):
+                        affected |= affected_terms({}, hierarchy, {}, {term: datatypes})
+                known = {}
+                for term, datatype in old_mappings[kind].items():
+                    if term in hierarchy and term not in affected:
+                        known[term] = datatype
+                LOGGER.info(str(len(hierarchy) - len(known)) + " EDAM " + kind +
+                            " terms to map again")
+                mapping, self.mapping_report[kind] = map_hierarchy(
+                    hierarchy, galaxy_mapping, select_root, known=known)
+                setattr(self, kind + '_to_datatype', mapping)
+        log['format'] = diff_mapping(old_mappings['format'], self.format_to_datatype)
+        log['data'] = diff_mapping(old_mappings['data'], self.data_to_datatype)
+        LOGGER.info(str(len(log['format']) + len(log['data'])) + " EDAM terms changed of " +
+                    "datatype")
+        return log
+
+    def mapping_inputs(self):
+        """
+        Inputs the mapping was generated from (EDAM hierarchies and datatypes of EDAM terms
+        in Galaxy), kept in the exported file for updates.
 
-    def load_local_mapping(self, local_file):
+        :return: inputs or None if they are unknown.
+        :rtype: DICT
+        """
+        if getattr(self, 'edam', None) is not None and getattr(self, 'galaxy', None) is not None:
+            return {'format_hierarchy': self.edam.edam_format_hierarchy,
+                    'data_hierarchy': self.edam.edam_data_hierarchy,
+                    'galaxy_format': self.galaxy.edam_formats,
+                    'galaxy_data': self.galaxy.edam_data}
+        return getattr(self, 'loaded_inputs', None)
+
+    def load_local_mapping(self, local_file, use_compact=True):
         """
         Method to load (from JSON file) mapping previously generated and exported in the
-        `local_file`.
+        `local_file`. Compact mappings are opened without parsing them, as is the compact
+        mapping next to a JSON mapping if it was built from it.
 
         :param local_file: path to the mapping local file.
         :type local_file: STRING
+        :param use_compact: use the compact mapping next to the JSON mapping.
+        :type use_compact: BOOLEAN
         """
+        self.compact = None
+        if compact_mapping.is_compact(local_file):
+            self.compact = compact_mapping.CompactMapping(local_file)
+        elif use_compact:
+            self.compact = compact_mapping.load_compact(
+                compact_mapping.compact_path(local_file), source=local_file)
+        if self.compact is not None:
+            LOGGER.info("Loading compact EDAM mapping to Galaxy datatypes from " +
+                        self.compact.path)
+            self.format_to_datatype = self.compact.format_to_datatype
+            self.data_to_datatype = self.compact.data_to_datatype
+            self.galaxy_url = self.compact.info['galaxy_url']
+            self.galaxy_version = self.compact.info['galaxy_version']
+            self.edam_version = self.compact.info['edam_version']
+            self.loaded_inputs = None
+            return
         LOGGER.info("Loading EDAM mapping to Galaxy datatypes from " +
                     local_file)
         with open(local_file, 'r') as file_path:
@@ -322,22 +806,47 @@ class EdamToGalaxy(object):
         self.galaxy_url = json_file['galaxy_url']
         self.galaxy_version = json_file['galaxy_version']
         self.edam_version = json_file['edam_version']
+        self.loaded_inputs = json_file.get('inputs')
 
-    def export_info(self, export_file):
+    def export_info(self, export_file, compact=False):
         """
         Method to export mapping of this object to a JSON file.
 
         :param export_file: path to the file.
         :type export_file: STRING
+        :param compact: also write the compact mapping next to it.
+        :type compact: BOOLEAN
         """
-        LOGGER.info("Exporting new EDAM mapping to Galaxy datatypes file to ./" +
+        LOGGER.info("Exporting new EDAM mapping to Galaxy datatypes file to " +
                     export_file)
-        with open(export_file, 'w') as file_path:
-            json.dump({'format': self.format_to_datatype,
-                       'data': self.data_to_datatype,
-                       'edam_version': self.edam_version,
-                       'galaxy_url': self.galaxy_url,
-                       'galaxy_version': self.galaxy_version}, file_path)
+        content = {'format': dict(self.format_to_datatype),
+                   'data': dict(self.data_to_datatype),
+                   'edam_version': self.edam_version,
+                   'galaxy_url': self.galaxy_url,
+                   'galaxy_version': self.galaxy_version}
+        inputs = self.mapping_inputs()
+        if inputs is not None:
+            content['inputs'] = inputs
+        write_json(export_file, content)
+        if compact:
+            self.export_compact(export_file)
+
+    def export_compact(self, mapping_json):
+        """
+        Write the compact mapping next to the JSON mapping it is built from.
+
+        :param mapping_json: path to the JSON mapping of this object.
+        :type mapping_json: STRING
+        """
+        try:
+            compact_mapping.write_compact(compact_mapping.compact_path(mapping_json),
+                                          self.format_to_datatype, self.data_to_datatype,
+                                          {'edam_version': self.edam_version,
+                                           'galaxy_url': self.galaxy_url,
+                                           'galaxy_version': self.galaxy_version},
+                                          source=mapping_json)
+        except ValueError as exc:
+            LOGGER.warning("No compact mapping for " + mapping_json + ": " + str(exc))
 
     def get_datatype(self, edam_data=None, edam_format=None):
         """
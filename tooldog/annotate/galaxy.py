@@ -9,6 +9,7 @@ galaxyxml library.
 
 # General libraries
 import os
+import sys
 import copy
 import logging
 
@@ -16,10 +17,11 @@ import logging
 from lxml import etree
 import galaxyxml.tool as gxt
 import galaxyxml.tool.parameters as gxtp
+from galaxyxml import GalaxyXML
 from galaxyxml.tool.import_xml import GalaxyXmlParser
 
 # Class and Objects
-from .edam_to_galaxy import EdamToGalaxy
+from .edam_to_galaxy import get_mapping
 from tooldog import __version__
 
 #  Constant(s)  ------------------------------
@@ -29,16 +31,71 @@ PARAM_COMMENT = "This parameter has been automatically generated from" \
                 " https://bio.tools/tool/%s by ToolDog v" + str(__version__) + "."
 FIXME = "FIXME: Please map this parameter to its command line argument."
 
+#  Function(s)  ------------------------------
+
+
+def export_tree(tool, keep_old_command=False):
+    """
+    Build the XML tree galaxyxml exports for a tool, without serializing it.
+
+    :param tool: galaxyxml tool.
+    :type tool: :class:`galaxyxml.tool.Tool`
+    :param keep_old_command: keep the command of an existing tool.
+    :type keep_old_command: BOOLEAN
+    :return: root element of the tool.
+    :rtype: :class:`lxml.etree._Element`
+    """
+    # Tool.export() works on its own copy of the tool and serializes it last
+    export_tool = copy.copy(tool)
+    export_tool.__class__ = _TreeTool
+    return export_tool.export(keep_old_command)
+
+
+def stream_xml(tool, handle, keep_old_command=False):
+    """
+    Serialize the XML of a tool to a binary file object, element by element.
+
+    :param tool: galaxyxml tool.
+    :type tool: :class:`galaxyxml.tool.Tool`
+    :param handle: binary file object.
+    :type handle: file object
+    :param keep_old_command: keep the command of an existing tool.
+    :type keep_old_command: BOOLEAN
+    """
+    root = export_tree(tool, keep_old_command)
+    with etree.xmlfile(handle, encoding='ASCII') as xml_file:
+        xml_file.write(root, pretty_print=True)
+
 #  Class(es)  ------------------------------
 
 
+class _TreeExport(GalaxyXML):
+    """
+    Last step of :meth:`galaxyxml.tool.Tool.export` giving the tree instead of bytes.
+    """
+
+    def export(self):
+        return self.root
+
+
+class _TreeTool(gxt.Tool, _TreeExport):
+    """
+    Tool exported as a tree (see :func:`tooldog.annotate.galaxy.export_tree`).
+    """
+    pass
+
+
+# galaxyxml prints some errors of export() with the name of the class
+_TreeTool.__name__ = gxt.Tool.__name__
+
+
 class GalaxyToolGen(object):
     """
     Class to support generation of XML from :class:`tooldog.biotool_model.Biotool` object.
     """
 
     def __init__(self, biotool, galaxy_url=None, edam_url=None, mapping_json=None,
-                 existing_tool=None):
+                 existing_tool=None, etog=None):
         """
         Initialize a [Tool] object from galaxyxml with the minimal information
         (a name, an id, a version, a description, the command, the command version
@@ -46,10 +103,15 @@ class GalaxyToolGen(object):
 
         :param biotool: Biotool object of an entry from https://bio.tools.
         :type biotool: :class:`tooldog.biotool_model.Biotool`
+        :param etog: already loaded mapping (galaxy_url, edam_url and mapping_json are
+            ignored if given). By default, the mapping shared by the process is used.
+        :type etog: :class:`tooldog.annotate.edam_to_galaxy.EdamToGalaxy`
         """
         # Initialize GalaxyInfo
-        self.etog = EdamToGalaxy(galaxy_url=galaxy_url, edam_url=edam_url,
-                                 mapping_json=mapping_json)
+        if etog is None:
+            etog = get_mapping(galaxy_url=galaxy_url, edam_url=edam_url,
+                               mapping_json=mapping_json)
+        self.etog = etog
         # Initialize counters for inputs and outputs from bio.tools
         self.input_ct = 0
         self.output_ct = 0
@@ -117,6 +179,25 @@ class GalaxyToolGen(object):
         if not self.tool.edam_operations.has_operation(operation.get_edam_id()):
             self.tool.edam_operations.append(gxtp.EdamOperation(operation.get_edam_id()))
 
+    def set_function(self, function):
+        """
+        Replace the inputs and outputs of the tool by the ones of a function. The tools of
+        all the functions of an entry are written from the same object, the rest of the
+        description being shared.
+
+        :param function: Function object.
+        :type function: :class:`tooldog.biotool_model.Function`
+        """
+        for attribute in ['inputs', 'outputs']:
+            if hasattr(self.tool, attribute):
+                delattr(self.tool, attribute)
+        self.input_ct = 0
+        self.output_ct = 0
+        for inpt in function.inputs:
+            self.add_input_file(inpt)
+        for output in function.outputs:
+            self.add_output_file(output)
+
     def add_input_file(self, input_obj):
         """
         Add an input to the tool (XML: <inputs>).
@@ -211,21 +292,32 @@ class GalaxyToolGen(object):
 
     def write_xml(self, out_file=None, index=None, keep_old_command=False):
         """
-        Write CWL to STDOUT or out_file(s).
+        Write XML to STDOUT or out_file(s).
 
         :param out_file: path to output file.
         :type out_file: STRING
         :param index: Index in case more than one function is described.
         :type index: INT
+
+        :return: path to the written file (None if written on STDOUT).
+        :rtype: STRING
         """
-        # Copy informations to avoid expension of xml in case we write several XMLs
-        export_tool = copy.deepcopy(self.tool)
         # Give XML on STDout
         if out_file is None:
             if index is not None:
                 print('########## XML number ' + str(index) + ' ##########')
             LOGGER.info("Writing XML file to STDOUT")
-            print(export_tool.export(keep_old_command).decode('utf-8'))
+            sys.stdout.flush()
+            stdout = getattr(sys.stdout, 'buffer', None)
+            if stdout is None:
+                # Text only STDOUT (e.g. redirected to a StringIO)
+                print(etree.tostring(export_tree(self.tool, keep_old_command),
+                                     pretty_print=True).decode('utf-8'))
+            else:
+                self.export_xml(stdout, keep_old_command)
+                stdout.write(b'\n')
+                stdout.flush()
+            return None
         else:
             # Format name for output file(s)
             if index is not None:
@@ -233,5 +325,19 @@ class GalaxyToolGen(object):
             else:
                 out_file = os.path.splitext(out_file)[0] + '.xml'
             LOGGER.info("Writing XML file to " + out_file)
-            with open(out_file, 'w') as file_w:
-                file_w.write(export_tool.export(keep_old_command).decode('utf-8'))
+            with open(out_file, 'wb') as file_w:
+                self.export_xml(file_w, keep_old_command)
+            return out_file
+
+    def export_xml(self, handle, keep_old_command=False):
+        """
+        Stream the XML of the tool to a binary file object (same bytes as
+        :meth:`galaxyxml.tool.Tool.export`). The tool is left unchanged, so it can be
+        exported again for other functions.
+
+        :param handle: binary file object.
+        :type handle: file object
+        :param keep_old_command: keep the command of an existing tool.
+        :type keep_old_command: BOOLEAN
+        """
+        stream_xml(self.tool, handle, keep_old_command)
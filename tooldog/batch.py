@@ -0,0 +1,605 @@
+#!/usr/bin/env python3
+
+"""
+Batch mode of ToolDog: convert many https://bio.tools entries in one invocation.
+
+The mapping between EDAM and Galaxy datatypes and the HTTP session are loaded once and
+reused for every entry. A failing entry is recorded in the report and does not stop the
+run. Entries can also be converted by a pool of processes forked from the main process,
+so the mapping and the heavy libraries loaded there are shared by the workers.
+"""
+
+#  Import  ------------------------------
+
+# General libraries
+import os
+import json
+import time
+import logging
+import collections
+import multiprocessing
+
+# Class and Objects
+from tooldog import main, readers, http_client, doi, render_cache
+from tooldog.manifest import Manifest, fingerprint, content_hash, write_if_changed
+
+#  Constant(s)  ------------------------------
+
+LOGGER = logging.getLogger(__name__)
+
+# Number of loaded entries whose publications are resolved together
+DOI_WINDOW = 50
+
+# BatchRunner used by the workers of the process pool. It is set by the main process
+# before forking so the workers inherit it (copy-on-write) instead of loading it again.
+_WORKER_RUNNER = None
+
+#  Function(s)  ------------------------------
+
+
+def expand_entries(entries):
+    """
+    Expand the list of entries given on the command line. Directories are replaced by the
+    JSON files they contain (sorted by name), other entries are kept as is.
+
+    :param entries: list of entries (ID[/VERSION], JSON file, directory or multi-entry
+        source read by :mod:`tooldog.readers`).
+    :type entries: LIST of STRING
+
+    :return: generator of entries.
+    :rtype: GENERATOR of STRING
+    """
+    for entry in entries:
+        entry = entry.strip()
+        if not entry or entry.startswith('#'):
+            # Blank lines and comments of @LISTFILE
+            continue
+        if os.path.isdir(entry):
+            for filename in sorted(os.listdir(entry)):
+                if filename.endswith('.json'):
+                    yield os.path.join(entry, filename)
+        else:
+            yield entry
+
+
+def entry_name(entry):
+    """
+    Build the name used for the output file(s) of an entry.
+
+    :param entry: entry (ID[/VERSION], JSON file or SOURCE#ID for entries read from a
+        multi-entry source).
+    :type entry: STRING
+    :return: name of the entry without path nor extension. Dots are kept (e.g. in
+        versions), the name is never given to :func:`os.path.splitext`.
+    :rtype: STRING
+    """
+    if '#' in entry:
+        return entry.split('#')[-1].replace('/', '_')
+    if main.is_file_entry(entry):
+        name = os.path.basename(entry)
+        for extension in ['.gz', '.json']:
+            if name.endswith(extension):
+                name = name[:-len(extension)]
+        return name
+    return entry.strip('/').replace('/', '_')
+
+
+def _init_worker(args, claims):
+    """
+    Initialize a worker of the process pool. Forked workers already have the runner of the
+    main process, other start methods have to build their own. In both cases the worker
+    uses its own HTTP client as connections cannot be shared between processes.
+
+    :param args: Parsed arguments.
+    :type args: :class:`argparse.ArgumentParser`
+    :param claims: output files reserved by the entries, shared by the workers (see
+        :meth:`tooldog.batch.BatchRunner.claim`).
+    :type claims: :class:`multiprocessing.managers.DictProxy`
+    """
+    global _WORKER_RUNNER
+    if _WORKER_RUNNER is None:
+        _WORKER_RUNNER = BatchRunner(args)
+    _WORKER_RUNNER.session = http_client.get_client()
+    _WORKER_RUNNER.claims = claims
+
+
+def _convert_in_worker(item):
+    """
+    Convert one entry within a worker of the process pool.
+
+    :param item: entry (ID[/VERSION] or JSON file), its JSON if already loaded, the name
+        of its output files and its fingerprint.
+    :type item: TUPLE
+    :rtype: DICT
+    """
+    return _WORKER_RUNNER.convert(*item)
+
+#  Class(es)  ------------------------------
+
+
+class BatchRunner(object):
+    """
+    Run ToolDog on several entries, keeping the mapping and the HTTP session warm.
+    """
+
+    def __init__(self, args):
+        """
+        :param args: Parsed arguments.
+        :type args: :class:`argparse.ArgumentParser`
+        """
+        self.args = args
+        self.session = http_client.get_client()
+        self.etog = None
+        if args.GALAXY:
+            # Only import annotate when needed
+            from tooldog.annotate.edam_to_galaxy import get_mapping
+            self.etog = get_mapping(galaxy_url=args.GAL_URL, edam_url=args.EDAM_URL,
+                                    mapping_json=args.MAP_FILE)
+        if args.OUTDIR is not None and not os.path.isdir(args.OUTDIR):
+            os.makedirs(args.OUTDIR)
+        annotation = args.OUTDIR is not None and not args.ANALYSE and not args.ORI_DESC
+        self.manifest = None
+        if getattr(args, 'MANIFEST', None) is not None:
+            if not annotation:
+                LOGGER.warning("--manifest needs -o/--output_dir and only applies to the " +
+                               "annotation of entries. All entries are generated.")
+            else:
+                self.manifest = Manifest(args.MANIFEST)
+        # Tools are rendered in memory (see :meth:`generate`) to use the manifest or the
+        # render cache
+        self.render = annotation and (self.manifest is not None or
+                                      render_cache.get_default_cache() is not None)
+        # Entry which reserved each output file of the run (see :meth:`claim`)
+        self.claims = {} if args.OUTDIR is not None else None
+
+    def extension(self):
+        """
+        Extension of the files written.
+
+        :rtype: STRING
+        """
+        return '.xml' if self.args.GALAXY else '.cwl'
+
+    def outfile(self, name, index=None):
+        """
+        Path to the output file of an entry (None for STDOUT). The path has its extension,
+        so the writers only remove this extension and not a part of the name.
+
+        :param name: name of the entry (see :meth:`unique_names`).
+        :type name: STRING
+        :param index: index of the function for entries with several functions.
+        :type index: INT
+        :rtype: STRING
+        """
+        if self.args.OUTDIR is None:
+            return None
+        suffix = str(index) if index is not None else ''
+        return os.path.join(self.args.OUTDIR, name + suffix + self.extension())
+
+    def expected_outputs(self, biotool, name):
+        """
+        Paths of the files written for an entry, known before they are written.
+
+        :param biotool: Biotool object of the entry.
+        :type biotool: :class:`tooldog.biotool_model.Biotool`
+        :param name: name of the output files of the entry.
+        :type name: STRING
+        :rtype: LIST of STRING
+        """
+        if self.args.OUTDIR is None or (self.args.ANALYSE and not self.args.ANNOTATE and
+                                        not self.args.ORI_DESC):
+            return []
+        if self.args.ORI_DESC or self.args.ANALYSE:
+            # Annotation of one existing description
+            return [self.outfile(name)]
+        if len(biotool.functions) > 1:
+            return [self.outfile(name, index + 1) for index in range(len(biotool.functions))]
+        return [self.outfile(name)] if biotool.functions else []
+
+    def claim(self, entry, paths):
+        """
+        Reserve the output files of an entry before they are written, so an entry never
+        overwrites the files of another entry of the run (e.g. a tool named like a function
+        of another one). Either all files are reserved or none.
+
+        :param entry: entry (ID[/VERSION] or JSON file).
+        :type entry: STRING
+        :param paths: paths of the files written for the entry.
+        :type paths: LIST of STRING
+        :raises: ValueError if a file is already reserved by another entry.
+        """
+        if self.claims is None:
+            return
+        claimed = []
+        for path in paths:
+            # Atomic, also when the claims are shared by the workers of a pool
+            owner = self.claims.setdefault(path, entry)
+            if owner != entry:
+                for own_path in claimed:
+                    self.claims.pop(own_path, None)
+                raise ValueError("Output " + path + " is already written by entry " +
+                                 owner + ".")
+            claimed.append(path)
+
+    def unique_names(self, items):
+        """
+        Give each entry the name of its output files. An entry whose name is already used by
+        another entry of the run (e.g. several versions of a tool in a dump) is named after
+        its version too, and fails if the name is still used, instead of overwriting the
+        files of the other entry.
+
+        :param items: entries with their JSON if loaded.
+        :type items: ITERABLE of TUPLE
+        :return: generator of (entry, JSON or exception, name).
+        :rtype: GENERATOR of TUPLE
+        """
+        used = {}
+        for entry, json_tool in items:
+            name = entry_name(entry)
+            if self.args.OUTDIR is not None:
+                if name in used and isinstance(json_tool, dict) and json_tool.get('version'):
+                    name = name + '_' + str(json_tool['version']).replace('/', '_')
+                if name in used:
+                    json_tool = ValueError("Output name " + name + " is already used by " +
+                                           "entry " + used[name] + ".")
+                else:
+                    used[name] = entry
+            yield entry, json_tool, name
+
+    def convert(self, entry, json_tool=None, name=None, key=None):
+        """
+        Convert one entry and build its result record.
+
+        :param entry: entry (ID[/VERSION] or JSON file).
+        :type entry: STRING
+        :param json_tool: JSON of the entry if already loaded, or the exception raised
+            while loading it.
+        :type json_tool: DICT or :class:`Exception`
+        :param name: name of the output files of the entry (see :meth:`unique_names`).
+        :type name: STRING
+        :param key: fingerprint of the entry as loaded (see :meth:`with_fingerprints`).
+        :type key: DICT
+
+        :return: result record with the entry, its status ('ok' or 'failed'), written
+            outputs, error message, if it was skipped as unchanged since the previous run
+            and elapsed time in seconds.
+        :rtype: DICT
+        """
+        result = {'entry': entry, 'status': 'ok', 'outputs': [], 'error': None,
+                  'skipped': False}
+        start = time.time()
+        if name is None:
+            name = entry_name(entry)
+        try:
+            if isinstance(json_tool, Exception):
+                raise json_tool
+            if json_tool is None:
+                json_tool = main.json_from_entry(entry, session=self.session)
+            if self.render:
+                result.update(self.generate(entry, json_tool, name, key))
+            else:
+                biotool = main.json_to_biotool(json_tool)
+                self.claim(entry, self.expected_outputs(biotool, name))
+                result['outputs'] = main.process_biotool(biotool, self.args,
+                                                         outfile=self.outfile(name),
+                                                         etog=self.etog)
+        except Exception as exc:
+            LOGGER.error("Entry " + entry + " failed: " + repr(exc))
+            result['status'] = 'failed'
+            result['error'] = repr(exc)
+        result['elapsed'] = round(time.time() - start, 3)
+        return result
+
+    def fingerprint(self, json_tool):
+        """
+        Fingerprint of the generation of the tools of an entry (see
+        :func:`tooldog.manifest.fingerprint`).
+
+        :param json_tool: JSON of the entry.
+        :type json_tool: DICT
+        :rtype: DICT
+        """
+        mapping = None
+        if self.etog is not None:
+            # Digest of the content of the mapping: an edited or updated mapping with the
+            # same versions changes it too
+            mapping = render_cache.mapping_digest(self.etog)
+        options = {'format': 'galaxy' if self.args.GALAXY else 'cwl'}
+        return fingerprint(json_tool, mapping, options)
+
+    def generate(self, entry, json_tool, name, key=None):
+        """
+        Write the tools of an entry unless its fingerprint is unchanged since the previous
+        run (with a manifest). Tools are rendered through the render cache and files are
+        only rewritten if their content changes.
+
+        :param entry: entry (ID[/VERSION] or JSON file).
+        :type entry: STRING
+        :param json_tool: JSON of the entry.
+        :type json_tool: DICT
+        :param name: name of the output files of the entry.
+        :type name: STRING
+        :param key: fingerprint of the entry as loaded, before its DOIs were resolved
+            (computed from `json_tool` if not given).
+        :type key: DICT
+        :return: outputs of the entry, if it was skipped, and the record of the manifest
+            if any (kept by the main process, the entry may be converted by a worker).
+        :rtype: DICT
+        """
+        if key is None and self.manifest is not None:
+            key = self.fingerprint(json_tool)
+        if key is not None and self.manifest.is_current(name, key):
+            self.claim(entry, self.manifest.outputs(name))
+            LOGGER.info("Entry " + entry + " unchanged, skipped.")
+            return {'outputs': self.manifest.outputs(name), 'skipped': True}
+        biotool = main.json_to_biotool(json_tool)
+        # DOIs of publications are resolved while the description is generated
+        biotool.enrich_dois()
+        if self.args.GALAXY:
+            rendered = main.render_xml(biotool, etog=self.etog)
+        else:
+            rendered = main.render_cwl(biotool)
+        paths = [self.outfile(name, position + 1 if len(rendered) > 1 else None)
+                 for position in range(len(rendered))]
+        self.claim(entry, paths)
+        outputs = collections.OrderedDict()
+        for path, (_, content) in zip(paths, rendered):
+            if write_if_changed(path, content):
+                LOGGER.info("Wrote " + path)
+            else:
+                LOGGER.info(path + " unchanged, not rewritten.")
+            outputs[path] = content_hash(content)
+        if key is None:
+            return {'outputs': list(outputs)}
+        return {'outputs': list(outputs), 'manifest': (name, key, outputs)}
+
+    def jobs(self):
+        """
+        Number of processes used to convert the entries.
+
+        :rtype: INT
+        """
+        jobs = getattr(self.args, 'JOBS', 1) or 1
+        if jobs > 1 and self.args.OUTDIR is None:
+            LOGGER.warning("--jobs needs --output_dir, outputs would be mixed on STDOUT. " +
+                           "Entries are converted one at a time.")
+            return 1
+        return jobs
+
+    @staticmethod
+    def read_source(source):
+        """
+        Read entries of a multi-entry source one at a time. Each entry is named
+        SOURCE#ID. If the source cannot be read until the end, the error is given as the
+        JSON of the source itself.
+
+        :param source: path to the source or `-` for STDIN.
+        :type source: STRING
+        :rtype: GENERATOR of TUPLE
+        """
+        index = 0
+        try:
+            for json_tool in readers.iter_entries(source):
+                index += 1
+                yield source + '#' + str(json_tool.get('id', index)), json_tool
+        except Exception as exc:
+            LOGGER.error("Could not read all entries of " + source + ": " + repr(exc))
+            yield source, exc
+
+    def load(self, entries):
+        """
+        Give entries with their JSON, in the order of the entries. Multi-entry sources are
+        streamed entry by entry. If a concurrent fetch was asked, entries from
+        https://bio.tools are downloaded together (see :meth:`fetch_in_order`). Otherwise
+        the JSON is left to be loaded during conversion.
+
+        :param entries: entries (ID[/VERSION], JSON file or multi-entry source).
+        :type entries: ITERABLE of STRING
+        :rtype: GENERATOR of TUPLE
+        """
+        concurrency = getattr(self.args, 'FETCH_CONC', 1) or 1
+        if concurrency > 1:
+            # Listed first to download all remote entries together
+            entries = [(entry, readers.is_multi_entry_source(entry)) for entry in entries]
+            remote_entries = [entry for entry, is_source in entries
+                              if not is_source and not main.is_file_entry(entry)]
+        else:
+            entries = ((entry, readers.is_multi_entry_source(entry)) for entry in entries)
+            remote_entries = []
+        fetched = self.fetch_in_order(remote_entries, concurrency)
+        try:
+            for entry, is_source in entries:
+                if is_source:
+                    for item in self.read_source(entry):
+                        yield item
+                elif remote_entries and not main.is_file_entry(entry):
+                    yield next(fetched)
+                else:
+                    yield entry, None
+        finally:
+            fetched.close()
+
+    @staticmethod
+    def fetch_in_order(entries, concurrency):
+        """
+        Download entries from https://bio.tools concurrently and give them back in the
+        order of the entries, whatever their order of arrival, so results and reports do
+        not change from one run to another. Entries arrived early are kept until the
+        previous ones are given.
+
+        :param entries: entries (ID[/VERSION]).
+        :type entries: LIST of STRING
+        :param concurrency: maximum number of simultaneous downloads.
+        :type concurrency: INT
+        :return: generator of (entry, JSON or exception).
+        :rtype: GENERATOR of TUPLE
+        """
+        if not entries:
+            return
+        from tooldog.fetch import BiotoolsFetcher
+        fetched = BiotoolsFetcher(concurrency=concurrency).iter_fetched(entries)
+        # Items arrived before their turn, by entry (an entry may be given twice)
+        arrived = collections.defaultdict(collections.deque)
+        try:
+            for entry in entries:
+                while not arrived[entry]:
+                    item = next(fetched)
+                    arrived[item[0]].append(item)
+                yield arrived[entry].popleft()
+        finally:
+            fetched.close()
+
+    def with_fingerprints(self, items):
+        """
+        Add the fingerprint of each loaded entry if a manifest is used. It is computed from
+        the JSON as loaded, so resolving DOIs (or failing to) does not change it.
+
+        :param items: entries with their JSON if loaded and their name.
+        :type items: ITERABLE of TUPLE
+        :return: generator of (entry, JSON or exception, name, fingerprint or None).
+        :rtype: GENERATOR of TUPLE
+        """
+        for entry, json_tool, name in items:
+            key = None
+            if self.render and self.manifest is not None and isinstance(json_tool, dict):
+                key = self.fingerprint(json_tool)
+            yield entry, json_tool, name, key
+
+    def with_dois(self, items):
+        """
+        Resolve the missing DOIs of loaded entries by windows of
+        :data:`tooldog.batch.DOI_WINDOW` entries, in a few bulk requests. The JSON is
+        completed before being given to the workers, entries that are not loaded yet are
+        resolved entry by entry during conversion. Entries unchanged since the previous
+        run (see :meth:`with_fingerprints`) are skipped, their DOIs are not needed.
+
+        :param items: entries with their JSON if loaded.
+        :type items: ITERABLE of TUPLE
+        :rtype: GENERATOR of TUPLE
+        """
+        window = []
+        for item in items:
+            window.append(item)
+            if len(window) >= DOI_WINDOW:
+                for resolved in self._resolve_window(window):
+                    yield resolved
+                window = []
+        for resolved in self._resolve_window(window):
+            yield resolved
+
+    def _resolve_window(self, window):
+        """
+        Fill in the DOIs of a window of items. If it fails, the DOIs are resolved again
+        during the conversion of each entry.
+        """
+        json_tools = [json_tool for _, json_tool, name, key in window
+                      if isinstance(json_tool, dict) and
+                      (key is None or not self.manifest.is_current(name, key))]
+        try:
+            doi.fill_entry_dois(json_tools, session=self.session)
+        except Exception as exc:
+            LOGGER.warning("Could not resolve DOIs of publications: " + repr(exc))
+        return window
+
+    def imap(self, items):
+        """
+        Convert entries, in a pool of processes if more than one job is asked.
+        Results are yielded in the order of the items. Only a few items are given to the
+        pool ahead of the result being yielded, so items are read lazily.
+
+        :param items: entries (ID[/VERSION] or JSON file) with their JSON if loaded.
+        :type items: ITERABLE of TUPLE
+        :rtype: GENERATOR of DICT
+        """
+        jobs = self.jobs()
+        if jobs == 1:
+            for item in items:
+                yield self.convert(*item)
+            return
+        global _WORKER_RUNNER
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+            _WORKER_RUNNER = self
+        else:
+            context = multiprocessing.get_context()
+        LOGGER.info("Converting entries with " + str(jobs) + " processes...")
+        # Output files are reserved by the workers in a dictionary they share
+        manager = context.Manager()
+        self.claims = manager.dict(self.claims)
+        pool = context.Pool(jobs, initializer=_init_worker, initargs=(self.args, self.claims))
+        try:
+            pending = collections.deque()
+            for item in items:
+                pending.append(pool.apply_async(_convert_in_worker, (item,)))
+                if len(pending) >= 2 * jobs:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+        finally:
+            pool.terminate()
+            pool.join()
+            self.claims = dict(self.claims)
+            manager.shutdown()
+            _WORKER_RUNNER = None
+
+    def update_manifest(self, result):
+        """
+        Record the fingerprint of a converted entry in the manifest. A failed entry is
+        removed from it so it is generated again by the next run.
+
+        :param result: result record of an entry (its manifest record is taken out).
+        :type result: DICT
+        """
+        record = result.pop('manifest', None)
+        if self.manifest is None:
+            return
+        if result['status'] == 'failed':
+            if record is not None:
+                self.manifest.forget(record[0])
+            else:
+                self.manifest.forget(entry_name(result['entry']))
+        elif record is not None:
+            self.manifest.record(*record)
+
+    def run(self, entries):
+        """
+        Convert all entries. If a report was asked, one record per entry is written
+        (JSON lines) as soon as the entry is processed.
+
+        :param entries: list of entries (ID[/VERSION], JSON file, directory or
+            multi-entry source).
+        :type entries: LIST of STRING
+
+        :return: result records of all entries.
+        :rtype: LIST of DICT
+        """
+        results = []
+        if self.claims is not None:
+            self.claims = {}
+        report = None
+        if self.args.REPORT is not None:
+            report = open(self.args.REPORT, 'w')
+        try:
+            items = self.with_dois(self.with_fingerprints(
+                self.unique_names(self.load(expand_entries(entries)))))
+            for result in self.imap(items):
+                self.update_manifest(result)
+                results.append(result)
+                if report is not None:
+                    report.write(json.dumps(result) + '\n')
+                    report.flush()
+        finally:
+            if report is not None:
+                report.close()
+            if self.manifest is not None:
+                self.manifest.save()
+        failed = [result for result in results if result['status'] != 'ok']
+        skipped = [result for result in results if result['skipped']]
+        LOGGER.info(str(len(results) - len(failed) - len(skipped)) + " entries converted, " +
+                    str(len(skipped)) + " unchanged, " + str(len(failed)) + " failed.")
+        LOGGER.debug("HTTP connections: " + str(self.session.stats()))
+        if doi.get_default_cache() is not None:
+            LOGGER.info("DOI cache: " + str(doi.get_default_cache().stats))
+        if render_cache.get_default_cache() is not None:
+            LOGGER.info("Render cache: " + str(render_cache.get_default_cache().stats))
+        return results
@@ -7,10 +7,9 @@ The content of a description on https://bio.tools is contained in a JSON file an
 model aims to store the different information.
 """
 
-import requests
 import logging
-from lxml import etree
-from ruamel.yaml.scalarstring import PreservedScalarString
+
+from tooldog import doi
 
 LOGGER = logging.getLogger(__name__)
 
@@ -43,6 +42,9 @@ class Biotool(object):
 
         More information (:class:`tooldog.biotool_model.Informations` object) can be specified
         using :meth:`tooldog.biotool_model.Biotool.set_informations`.
+
+        Building the object does no network access, missing DOIs of publications are
+        resolved when they are used (see :meth:`tooldog.biotool_model.Biotool.enrich_dois`).
         '''
         self.name = name
         self.tool_id = tool_id
@@ -52,6 +54,7 @@ class Biotool(object):
         self.functions = []  # List of Function objects
         self.topics = []    # List of Topic objects
         self.informations = Informations()  # Informations object
+        self.pending_dois = None  # PendingDois of the publications without DOI
         if self.homepage.startswith('https://github.com'):
             link = Link({'url': self.homepage, 'type': 'Repository', 'comment': ''})
             self.informations.links.append(link)
@@ -105,6 +108,11 @@ class Biotool(object):
             self.informations.contacts.append(Contact(cont))
         for pub in publications:
             self.informations.publications.append(Publication(pub))
+        # Missing DOIs of all publications are resolved together, when first needed
+        missing = [pub for pub in self.informations.publications
+                   if pub.stored_doi is None and doi.publication_id(pub) is not None]
+        if missing:
+            self.pending_dois = doi.PendingDois(missing)
         for doc in docs:
             self.informations.documentations.append(Documentation(doc))
         self.informations.language = language
@@ -113,6 +121,14 @@ class Biotool(object):
         for link in download:
             self.informations.links.append(Link(link))
 
+    def enrich_dois(self):
+        '''
+        Start resolving the missing DOIs of publications in the background, so it overlaps
+        with the generation of the tool description.
+        '''
+        if self.pending_dois is not None:
+            self.pending_dois.start()
+
     def add_functions(self, functions):
         '''
         Add :class:`tooldog.biotool_model.Function` objects to the list of functions of the
@@ -211,29 +227,36 @@ class Publication(object):
         :param publication: publication part of the JSON from http://bio.tools.
         :type publication: DICT
         '''
-        self.doi = publication['doi']  # [STRING]
+        self.stored_doi = publication['doi']  # [STRING]
         self.pmid = publication['pmid']  # [STRING]
         self.pmcid = publication['pmcid']  # [STRING]
         self.type = publication['type']  # [STRING]
-        if self.doi is None:
-            self._fetch_doi()
+        self.pending_dois = None  # PendingDois resolving the missing DOI
+
+    @property
+    def doi(self):
+        '''
+        DOI of the publication, resolved from pmid or pmcid on first access if missing.
+        '''
+        pending = self.pending_dois
+        if self.stored_doi is None and pending is not None:
+            pending.wait()
+        return self.stored_doi
+
+    @doi.setter
+    def doi(self, value):
+        self.stored_doi = value
+        self.pending_dois = None
 
     def _fetch_doi(self):
         """
         fetch doi using pmid or pmcid using:
         https://www.ncbi.nlm.nih.gov/pmc/utils/idconv/v1.0
+
+        Publications of a :class:`tooldog.biotool_model.Biotool` are resolved together by
+        :meth:`tooldog.biotool_model.Biotool.set_informations`.
         """
-        if self.pmid is not None:
-            id_query = self.pmid
-        elif self.pmcid is not None:
-            id_query = self.pmcid
-        req = "https://www.ncbi.nlm.nih.gov/pmc/utils/idconv/v1.0/?ids=" + id_query
-        xml_req = etree.fromstring(requests.get(req).text)
-        if xml_req.find('record') is not None:
-            try:
-                self.doi = xml_req.find('record').attrib['doi']
-            except:
-                LOGGER.warning("Could not find doi corresponding to " + id_query)
+        doi.fill_dois([self])
 
 
 class Documentation(object):
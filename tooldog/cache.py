@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+"""
+Location of the local cache of ToolDog.
+
+By default the cache is stored in `$XDG_CACHE_HOME/tooldog` (`~/.cache/tooldog`). It can be
+moved with the `TOOLDOG_CACHE_DIR` environment variable.
+"""
+
+#  Import  ------------------------------
+
+# General libraries
+import os
+import json
+import stat
+import tempfile
+
+#  Constant(s)  ------------------------------
+
+CACHE_ENV = 'TOOLDOG_CACHE_DIR'
+
+# Read once: os.umask can only be read by changing it, which is not safe with threads
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+#  Function(s)  ------------------------------
+
+
+def cache_dir(*subdirs):
+    """
+    Get a directory of the cache, created if missing.
+
+    :param subdirs: names of the subdirectories within the cache.
+    :type subdirs: STRING
+    :return: path to the directory.
+    :rtype: STRING
+    """
+    root = os.environ.get(CACHE_ENV)
+    if not root:
+        xdg_cache = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'),
+                                                                     '.cache')
+        root = os.path.join(xdg_cache, 'tooldog')
+    path = os.path.join(root, *subdirs)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _file_mode(path):
+    """
+    Permissions for a new version of a file: the ones of the current file, or the default
+    ones of new files (0666 without the umask).
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        return 0o666 & ~_UMASK
+
+
+def _write_atomic(path, mode, write):
+    """
+    Write a file through a temporary file which then replaces it. The temporary file is
+    only readable by its owner, it is given the permissions of the file it replaces.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode) as tmp_file:
+            write(tmp_file)
+        os.chmod(tmp_path, _file_mode(path))
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+def write_json(path, content, **kwargs):
+    """
+    Write a JSON file atomically: the content is written to a temporary file which then
+    replaces the file, so concurrent readers never see a partial file.
+
+    :param path: path to the file.
+    :type path: STRING
+    :param content: content of the file.
+    :type content: DICT
+    :param kwargs: options of :func:`json.dump`.
+    """
+    _write_atomic(path, 'w', lambda json_file: json.dump(content, json_file, **kwargs))
+
+
+def write_bytes(path, content):
+    """
+    Write a binary file atomically (see :func:`tooldog.cache.write_json`). The previous
+    file is replaced, not overwritten, so processes which memory-mapped it keep a
+    consistent copy.
+
+    :param path: path to the file.
+    :type path: STRING
+    :param content: content of the file.
+    :type content: BYTES
+    """
+    _write_atomic(path, 'wb', lambda binary_file: binary_file.write(content))
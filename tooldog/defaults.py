@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+
+"""
+Default settings of the network and cache options. They are kept apart from the modules
+using them so the command line is built without importing HTTP libraries.
+"""
+
+#  Constant(s)  ------------------------------
+
+# HTTP client (see :mod:`tooldog.http_client`)
+DEFAULT_TIMEOUT = (10, 60)  # (connect, read) in seconds
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_POOL_SIZE = 10
+
+# HTTP cache (see :mod:`tooldog.http_cache`)
+DEFAULT_CACHE_TTL = 0  # Always revalidate
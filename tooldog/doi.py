@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+
+"""
+Resolution of the DOI of publications only described by a PubMed (PMID) or PubMed Central
+(PMCID) ID, using the NCBI ID converter:
+https://www.ncbi.nlm.nih.gov/pmc/tools/id-converter-api/
+
+The service accepts many IDs per request, so all IDs of an entry (or of a window of
+entries in batch mode) are resolved together in a few requests. Resolved IDs can be kept
+in a persistent cache (SQLite, shared by processes) so they are only asked once: DOIs are
+kept forever, IDs without DOI are asked again after some time.
+
+Publications of a :class:`tooldog.biotool_model.Biotool` are not resolved when the model
+is built: they share a :class:`tooldog.doi.PendingDois` which resolves all of them on the
+first access to a missing DOI, or in the background once started.
+"""
+
+#  Import  ------------------------------
+
+# General libraries
+import os
+import time
+import sqlite3
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Class and Objects
+from tooldog.cache import cache_dir
+
+#  Constant(s)  ------------------------------
+
+LOGGER = logging.getLogger(__name__)
+
+IDCONV_URL = 'https://www.ncbi.nlm.nih.gov/pmc/utils/idconv/v1.0/'
+MAX_IDS = 200  # Maximum number of IDs per request accepted by the service
+NEGATIVE_TTL = 7 * 24 * 3600  # IDs without DOI are asked again after a week
+MAX_WORKERS = 4  # Number of threads resolving DOIs in the background
+
+# Cache used by :func:`tooldog.doi.resolve_dois` when none is given
+_DEFAULT_CACHE = None
+# Threads resolving DOIs in the background and the process they belong to
+_EXECUTOR = None
+_EXECUTOR_PID = None
+
+#  Function(s)  ------------------------------
+
+
+def configure(path=None, negative_ttl=NEGATIVE_TTL):
+    """
+    Enable the default DOI cache of the process.
+
+    :param path: path to the cache database (default: `doi/dois.sqlite` in the ToolDog
+        cache directory).
+    :type path: STRING
+    :param negative_ttl: number of seconds an ID without DOI is not asked again.
+    :type negative_ttl: INT
+    :return: the default cache.
+    :rtype: :class:`tooldog.doi.DoiCache`
+    """
+    global _DEFAULT_CACHE
+    _DEFAULT_CACHE = DoiCache(path, negative_ttl=negative_ttl)
+    return _DEFAULT_CACHE
+
+
+def disable():
+    """
+    Disable the default DOI cache of the process.
+    """
+    global _DEFAULT_CACHE
+    _DEFAULT_CACHE = None
+
+
+def get_default_cache():
+    """
+    :return: the default DOI cache of the process, None if it is not enabled.
+    :rtype: :class:`tooldog.doi.DoiCache`
+    """
+    return _DEFAULT_CACHE
+
+
+def get_executor():
+    """
+    Get the pool of threads resolving DOIs in the background, shared within the process so
+    the threads, and their connections to the cache, are reused. A forked process gets its
+    own pool as the threads of its parent are not copied.
+
+    :rtype: :class:`concurrent.futures.ThreadPoolExecutor`
+    """
+    global _EXECUTOR, _EXECUTOR_PID
+    if _EXECUTOR is None or _EXECUTOR_PID != os.getpid():
+        _EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        _EXECUTOR_PID = os.getpid()
+    return _EXECUTOR
+
+
+def publication_id(publication):
+    """
+    Get the ID used to find the DOI of a publication.
+
+    :param publication: publication part of the JSON from https://bio.tools or
+        :class:`tooldog.biotool_model.Publication` object.
+    :type publication: DICT or :class:`tooldog.biotool_model.Publication`
+    :return: PMID, PMCID or None if there is none.
+    :rtype: STRING
+    """
+    if isinstance(publication, dict):
+        pmid, pmcid = publication.get('pmid'), publication.get('pmcid')
+    else:
+        pmid, pmcid = publication.pmid, publication.pmcid
+    if pmid:
+        return str(pmid)
+    if pmcid:
+        return str(pmcid)
+    return None
+
+
+def resolve_dois(ids, session=None, cache=None):
+    """
+    Resolve PMIDs and PMCIDs to DOIs with as few requests as possible. IDs found in the
+    cache (given or default one) are not requested.
+
+    :param ids: PMIDs and PMCIDs to resolve.
+    :type ids: ITERABLE of STRING
+    :param session: HTTP session used for the requests (default: shared client of
+        :mod:`tooldog.http_client`).
+    :type session: :class:`requests.Session`
+    :param cache: cache to use instead of the default one.
+    :type cache: :class:`tooldog.doi.DoiCache`
+    :return: DOI of each ID, None if the service does not know it.
+    :rtype: DICT
+    :raises: :class:`requests.HTTPError` if the service answers with an error status.
+    """
+    cache = cache or _DEFAULT_CACHE
+    ids = sorted(set(ids))
+    cached = {}
+    if cache is not None:
+        cached = cache.lookup(ids)
+        ids = [id_query for id_query in ids if id_query not in cached]
+    if not ids:
+        return cached
+    # Only import the HTTP and XML libraries when a request is made
+    from lxml import etree
+    from tooldog.http_client import get_client
+    session = session or get_client()
+    dois = {}
+    for start in range(0, len(ids), MAX_IDS):
+        chunk = ids[start:start + MAX_IDS]
+        LOGGER.debug("Resolving DOI of " + str(len(chunk)) + " publications")
+        response = session.get(IDCONV_URL, params={'ids': ','.join(chunk),
+                                                   'tool': 'tooldog'})
+        # An error page (e.g. rate limit) does not mean the IDs have no DOI
+        response.raise_for_status()
+        xml_req = etree.fromstring(response.content)
+        answered = {}
+        for record in xml_req.iter('record'):
+            requested = record.get('requested-id')
+            if requested is not None:
+                answered[requested] = record.get('doi')
+        # Only IDs answered by the service are cached, the others are asked again later.
+        # Stored chunk by chunk so they are kept if a later chunk fails.
+        if cache is not None:
+            cache.store(answered)
+        dois.update(answered)
+    for id_query in ids:
+        if dois.get(id_query) is None:
+            LOGGER.warning("Could not find doi corresponding to " + id_query)
+            dois[id_query] = None
+    dois.update(cached)
+    return dois
+
+
+def fill_dois(publications, session=None):
+    """
+    Fill in the DOI of publications that have none, with one bulk resolution for all of
+    them.
+
+    :param publications: publications of https://bio.tools JSON or
+        :class:`tooldog.biotool_model.Publication` objects.
+    :type publications: LIST of DICT or LIST of :class:`tooldog.biotool_model.Publication`
+    :param session: HTTP session used for the requests.
+    :type session: :class:`requests.Session`
+    """
+    # Stored value of Publication objects, their doi property would resolve it
+    missing = [(pub, publication_id(pub)) for pub in publications
+               if (pub.get('doi') if isinstance(pub, dict) else pub.stored_doi) is None]
+    missing = [(pub, id_query) for pub, id_query in missing if id_query is not None]
+    if not missing:
+        return
+    dois = resolve_dois([id_query for _, id_query in missing], session=session)
+    for pub, id_query in missing:
+        doi = dois.get(id_query)
+        if doi is None:
+            continue
+        if isinstance(pub, dict):
+            pub['doi'] = doi
+        else:
+            pub.doi = doi
+
+
+def fill_entry_dois(json_tools, session=None):
+    """
+    Fill in the DOI of the publications of several https://bio.tools entries at once.
+
+    :param json_tools: JSON of the entries (modified in place).
+    :type json_tools: LIST of DICT
+    :param session: HTTP session used for the requests.
+    :type session: :class:`requests.Session`
+    """
+    publications = []
+    for json_tool in json_tools:
+        publications.extend(json_tool.get('publication') or [])
+    fill_dois(publications, session=session)
+
+#  Class(es)  ------------------------------
+
+
+class DoiCache(object):
+    """
+    Persistent cache of the DOIs of PMIDs and PMCIDs stored in SQLite.
+    """
+
+    def __init__(self, path=None, negative_ttl=NEGATIVE_TTL):
+        """
+        :param path: path to the cache database.
+        :type path: STRING
+        :param negative_ttl: number of seconds an ID without DOI is not asked again.
+        :type negative_ttl: INT
+        """
+        if path is None:
+            path = os.path.join(cache_dir('doi'), 'dois.sqlite')
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self.stats = {'hits': 0, 'misses': 0}
+        self._local = threading.local()
+        self._connect()
+
+    def _connect(self):
+        """
+        Connection to the database, one per process and thread.
+        """
+        if getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=60)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS dois (id TEXT PRIMARY KEY, ' +
+                         'doi TEXT, stored_at REAL)')
+            conn.commit()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    def lookup(self, ids):
+        """
+        Get the cached DOIs of IDs. IDs without DOI are only given while they are younger
+        than negative_ttl.
+
+        :param ids: PMIDs and PMCIDs.
+        :type ids: LIST of STRING
+        :return: DOI (or None) of the IDs found in the cache.
+        :rtype: DICT
+        """
+        found = {}
+        expiry = time.time() - self.negative_ttl
+        conn = self._connect()
+        # Stay below the maximum number of SQL variables
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = conn.execute('SELECT id, doi, stored_at FROM dois WHERE id IN (' +
+                                ', '.join('?' * len(chunk)) + ')', chunk)
+            for id_query, doi, stored_at in rows:
+                if doi is not None or stored_at > expiry:
+                    found[id_query] = doi
+        self.stats['hits'] += len(found)
+        self.stats['misses'] += len(ids) - len(found)
+        return found
+
+    def store(self, dois):
+        """
+        Store resolved IDs, with None for IDs without DOI.
+
+        :param dois: DOI (or None) of each ID.
+        :type dois: DICT
+        """
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.executemany('INSERT OR REPLACE INTO dois VALUES (?, ?, ?)',
+                             [(id_query, doi, now) for id_query, doi in dois.items()])
+
+
+class PendingDois(object):
+    """
+    Missing DOIs of a group of publications, resolved together when first needed.
+    """
+
+    def __init__(self, publications):
+        """
+        :param publications: publications without DOI.
+        :type publications: LIST of :class:`tooldog.biotool_model.Publication`
+        """
+        self.publications = publications
+        self._future = None
+        self._lock = threading.Lock()
+        for publication in publications:
+            publication.pending_dois = self
+
+    def _resolve(self, future):
+        """
+        Resolve the DOIs and release the publications. A failure is only logged, DOIs
+        are an optional enrichment.
+        """
+        try:
+            fill_dois(self.publications)
+        except Exception as exc:
+            LOGGER.warning("Could not resolve DOIs of publications: " + repr(exc))
+        for publication in self.publications:
+            publication.pending_dois = None
+        future.set_result(None)
+
+    def start(self):
+        """
+        Start the resolution in the background (if it is not already started), in the
+        threads of :func:`tooldog.doi.get_executor`.
+        """
+        with self._lock:
+            if self._future is not None:
+                return
+            self._future = Future()
+        get_executor().submit(self._resolve, self._future)
+
+    def wait(self):
+        """
+        Wait for the resolution, run it now if it was not started.
+        """
+        with self._lock:
+            run_now = self._future is None
+            if run_now:
+                self._future = Future()
+        if run_now:
+            self._resolve(self._future)
+        self._future.result()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+"""
+Dump of the whole https://bio.tools registry to a JSON lines file (one entry per line).
+
+Pages of the bio.tools list endpoint are requested a few at a time ahead of the one being
+written, and every entry is written as soon as its page arrives. The last page written is
+kept in a state file next to the output so an interrupted dump resumes from there.
+"""
+
+#  Import  ------------------------------
+
+# General libraries
+import os
+import sys
+import json
+import argparse
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+# Class and Objects
+from tooldog import main
+from tooldog.http_client import HttpClient
+
+#  Constant(s)  ------------------------------
+
+LOGGER = logging.getLogger(__name__)
+
+#  Function(s)  ------------------------------
+
+
+def parse_arguments(argv):
+    """
+    Defines parser for `tooldog dump`.
+
+    :param argv: arguments given after `dump`.
+    :type argv: LIST of STRING
+    """
+    parser = argparse.ArgumentParser(prog='tooldog dump',
+                                     description='Dump all entries of https://bio.tools ' +
+                                     'to a JSON lines file.')
+    parser.add_argument('OUTFILE', help='output JSON lines file.')
+    parser.add_argument('--prefetch', dest='PREFETCH', type=int, default=4,
+                        help='number of pages requested ahead of the one being written.')
+    parser.add_argument('--restart', action='store_true', dest='RESTART',
+                        help='start from the first page even if a previous dump was ' +
+                        'interrupted.')
+    parser.add_argument('--api_url', dest='API_URL', default=main.BIOTOOLS_API,
+                        help='URL of the bio.tools API (default: ' + main.BIOTOOLS_API + ').')
+    parser.add_argument('-v', '--verbose', action='store_true', dest='VERBOSE',
+                        help='display info on STDERR.')
+    try:
+        return parser.parse_args(argv)
+    except SystemExit:
+        sys.exit(1)
+
+
+def run_dump(argv):
+    """
+    Running function called by `tooldog dump` command line.
+
+    :param argv: arguments given after `dump`.
+    :type argv: LIST of STRING
+    """
+    args = parse_arguments(argv)
+    import logging.config
+    logging.config.dictConfig(main.config_logger(False, 'WARN', None, args.VERBOSE))
+    dumper = RegistryDumper(args.OUTFILE, api_url=args.API_URL, prefetch=args.PREFETCH)
+    dumper.dump(resume=not args.RESTART)
+
+#  Class(es)  ------------------------------
+
+
+class RegistryDumper(object):
+    """
+    Write all entries of https://bio.tools to a JSON lines file.
+    """
+
+    def __init__(self, outfile, api_url=main.BIOTOOLS_API, session=None, prefetch=4):
+        """
+        :param outfile: path to the output JSON lines file.
+        :type outfile: STRING
+        :param api_url: URL of the bio.tools API.
+        :type api_url: STRING
+        :param session: HTTP session used for the requests.
+        :type session: :class:`requests.Session`
+        :param prefetch: number of pages requested ahead of the one being written.
+        :type prefetch: INT
+        """
+        self.outfile = outfile
+        self.state_file = outfile + '.state'
+        self.api_url = api_url
+        self.prefetch = max(1, prefetch)
+        self.session = session or HttpClient(pool_size=self.prefetch)
+
+    def page_url(self, page):
+        """
+        :param page: number of the page (starting at 1).
+        :type page: INT
+        :return: URL of one page of the bio.tools list endpoint.
+        :rtype: STRING
+        """
+        return self.api_url + '/tool/?format=json&page=' + str(page)
+
+    def fetch_page(self, page):
+        """
+        Get the content of one page.
+
+        :param page: number of the page (starting at 1).
+        :type page: INT
+        :return: JSON of the page, None if the page does not exist.
+        :rtype: DICT
+        """
+        response = self.session.get(self.page_url(page))
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    def iter_pages(self, first_page):
+        """
+        Request pages in order, keeping `prefetch` requests in flight ahead of the page
+        given back.
+
+        :param first_page: number of the first page.
+        :type first_page: INT
+        :return: generator of (page number, JSON of the page).
+        :rtype: GENERATOR of TUPLE
+        """
+        executor = ThreadPoolExecutor(max_workers=self.prefetch)
+        pending = []
+        next_page = first_page
+        try:
+            while True:
+                while len(pending) < self.prefetch:
+                    pending.append((next_page, executor.submit(self.fetch_page, next_page)))
+                    next_page += 1
+                page, future = pending.pop(0)
+                content = future.result()
+                if content is None:
+                    break
+                yield page, content
+                if not content.get('next'):
+                    break
+        finally:
+            for page, future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def read_state(self):
+        """
+        :return: state of an interrupted dump (last page written and size of the output
+            at that time), None if there is none.
+        :rtype: DICT
+        """
+        if not os.path.isfile(self.state_file) or not os.path.isfile(self.outfile):
+            return None
+        with open(self.state_file) as state_file:
+            return json.load(state_file)
+
+    def write_state(self, page, offset):
+        """
+        Save the last page fully written and the size of the output file.
+
+        :param page: number of the last page written.
+        :type page: INT
+        :param offset: size of the output file after this page.
+        :type offset: INT
+        """
+        tmp_file = self.state_file + '.tmp'
+        with open(tmp_file, 'w') as state_file:
+            json.dump({'page': page, 'offset': offset}, state_file)
+        os.replace(tmp_file, self.state_file)
+
+    def dump(self, resume=True):
+        """
+        Dump the registry.
+
+        :param resume: resume an interrupted dump if any.
+        :type resume: BOOLEAN
+        :return: number of entries written during this call.
+        :rtype: INT
+        """
+        state = self.read_state() if resume else None
+        if state is None:
+            first_page = 1
+            out = open(self.outfile, 'wb')
+        else:
+            first_page = state['page'] + 1
+            LOGGER.info("Resuming dump of https://bio.tools from page " + str(first_page))
+            out = open(self.outfile, 'r+b')
+            # Drop entries written after the last complete page
+            out.truncate(state['offset'])
+            out.seek(state['offset'])
+        count = 0
+        try:
+            for page, content in self.iter_pages(first_page):
+                for entry in content['list']:
+                    out.write(json.dumps(entry, sort_keys=True).encode('utf-8') + b'\n')
+                    count += 1
+                out.flush()
+                os.fsync(out.fileno())
+                self.write_state(page, out.tell())
+                LOGGER.info("Page " + str(page) + " of https://bio.tools written (" +
+                            str(content.get('count', '?')) + " entries in total)")
+        finally:
+            out.close()
+        # Dump is complete
+        if os.path.isfile(self.state_file):
+            os.remove(self.state_file)
+        return count
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+"""
+Concurrent import of many entries from https://bio.tools.
+
+Downloads are run by asyncio on a pool of threads sharing one HTTP client. The number of
+simultaneous downloads is limited and each entry is given back as soon as it arrives, so
+conversion of the first entries starts while the others are still downloading.
+"""
+
+#  Import  ------------------------------
+
+# General libraries
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+# Class and Objects
+from tooldog import main
+from tooldog.http_client import HttpClient
+
+#  Constant(s)  ------------------------------
+
+LOGGER = logging.getLogger(__name__)
+
+#  Class(es)  ------------------------------
+
+
+class BiotoolsFetcher(object):
+    """
+    Fetch JSON of many entries concurrently.
+    """
+
+    def __init__(self, concurrency=10, session=None, api_url=main.BIOTOOLS_API):
+        """
+        :param concurrency: maximum number of simultaneous downloads.
+        :type concurrency: INT
+        :param session: HTTP session shared by the downloads (by default, a new
+            :class:`tooldog.http_client.HttpClient` keeping one connection per download).
+        :type session: :class:`requests.Session`
+        :param api_url: URL of the bio.tools API.
+        :type api_url: STRING
+        """
+        self.concurrency = max(1, concurrency)
+        self.api_url = api_url
+        if session is None:
+            session = HttpClient(pool_size=self.concurrency)
+        self.session = session
+
+    def load(self, entry):
+        """
+        Load JSON of one entry (blocking).
+
+        :param entry: entry (ID[/VERSION] or JSON file).
+        :type entry: STRING
+        :return: dictionnary corresponding to the JSON.
+        :rtype: DICT
+        """
+        return main.json_from_entry(entry, session=self.session, api_url=self.api_url)
+
+    async def fetch(self, entries, loop=None):
+        """
+        Load JSON of all entries concurrently.
+
+        :param entries: entries (ID[/VERSION] or JSON file).
+        :type entries: ITERABLE of STRING
+
+        :return: asynchronous generator of (entry, JSON) in order of arrival. The JSON is
+            replaced by the exception raised if the entry could not be loaded.
+        :rtype: ASYNC GENERATOR of TUPLE
+        """
+        if loop is None:
+            loop = asyncio.get_event_loop()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+
+        async def load_one(entry):
+            try:
+                json_tool = await loop.run_in_executor(executor, self.load, entry)
+            except Exception as exc:
+                LOGGER.error("Could not load entry " + entry + ": " + repr(exc))
+                json_tool = exc
+            return entry, json_tool
+
+        try:
+            tasks = [load_one(entry) for entry in entries]
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            executor.shutdown(wait=False)
+
+    def iter_fetched(self, entries):
+        """
+        Synchronous version of :meth:`tooldog.fetch.BiotoolsFetcher.fetch` running its own
+        event loop.
+
+        :param entries: entries (ID[/VERSION] or JSON file).
+        :type entries: ITERABLE of STRING
+        :rtype: GENERATOR of TUPLE
+        """
+        loop = asyncio.new_event_loop()
+        fetched = self.fetch(entries, loop=loop)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(fetched.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(fetched.aclose())
+            loop.close()
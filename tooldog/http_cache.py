@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+
+"""
+Persistent cache of HTTP responses (bio.tools entries, Galaxy API).
+
+Responses are stored in a SQLite database keyed by URL, which can be shared by several
+processes. A response younger than the TTL is used without any request, an older one is
+revalidated with its ETag / Last-Modified headers so an unchanged resource only costs a
+304 answer. The least recently used responses are evicted above the maximum size.
+"""
+
+#  Import  ------------------------------
+
+# General libraries
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+# External libraries
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Class and Objects
+from tooldog.cache import cache_dir
+from tooldog.defaults import DEFAULT_CACHE_TTL
+from tooldog import http_client
+
+#  Constant(s)  ------------------------------
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_TTL = DEFAULT_CACHE_TTL
+DEFAULT_MAX_SIZE = 500 * 1024 * 1024
+
+# Cache used by :func:`tooldog.http_cache.cached_get` when none is given
+_DEFAULT_CACHE = None
+
+#  Function(s)  ------------------------------
+
+
+def configure(path=None, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE):
+    """
+    Enable the default cache of the process.
+
+    :param path: path to the cache database (default: `http/responses.sqlite` in the
+        ToolDog cache directory).
+    :type path: STRING
+    :param ttl: number of seconds a response is used without revalidation.
+    :type ttl: INT
+    :param max_size: maximum size in bytes of the stored responses.
+    :type max_size: INT
+    :return: the default cache.
+    :rtype: :class:`tooldog.http_cache.HttpCache`
+    """
+    global _DEFAULT_CACHE
+    _DEFAULT_CACHE = HttpCache(path, ttl=ttl, max_size=max_size)
+    return _DEFAULT_CACHE
+
+
+def disable():
+    """
+    Disable the default cache of the process.
+    """
+    global _DEFAULT_CACHE
+    _DEFAULT_CACHE = None
+
+
+def get_default_cache():
+    """
+    :return: the default cache of the process, None if it is not enabled.
+    :rtype: :class:`tooldog.http_cache.HttpCache`
+    """
+    return _DEFAULT_CACHE
+
+
+def cached_get(url, session=None, cache=None):
+    """
+    GET an URL through the cache (given or default one). Without cache, this is a plain
+    GET request.
+
+    :param url: URL to get.
+    :type url: STRING
+    :param session: HTTP session used for the request (default: shared client of
+        :mod:`tooldog.http_client`).
+    :type session: :class:`requests.Session`
+    :param cache: cache to use instead of the default one.
+    :type cache: :class:`tooldog.http_cache.HttpCache`
+    :rtype: :class:`requests.Response`
+    """
+    cache = cache or _DEFAULT_CACHE
+    getter = session or http_client.get_client()
+    if cache is None:
+        return getter.get(url)
+    return cache.get(url, getter)
+
+#  Class(es)  ------------------------------
+
+
+class HttpCache(object):
+    """
+    Cache of HTTP responses stored in SQLite.
+    """
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE):
+        """
+        :param path: path to the cache database.
+        :type path: STRING
+        :param ttl: number of seconds a response is used without revalidation.
+        :type ttl: INT
+        :param max_size: maximum size in bytes of the stored responses.
+        :type max_size: INT
+        """
+        if path is None:
+            path = os.path.join(cache_dir('http'), 'responses.sqlite')
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0}
+        self._local = threading.local()
+        self._connect()
+
+    def _connect(self):
+        """
+        Connection to the database, one per process and thread.
+        """
+        if getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=60)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS responses (url TEXT PRIMARY KEY, ' +
+                         'status INTEGER, headers TEXT, body BLOB, size INTEGER, ' +
+                         'stored_at REAL, accessed_at REAL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS accessed ON responses (accessed_at)')
+            conn.commit()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    def lookup(self, url):
+        """
+        :param url: URL of the response.
+        :type url: STRING
+        :return: stored response (status, headers, body, stored_at), None if missing.
+        :rtype: TUPLE
+        """
+        row = self._connect().execute('SELECT status, headers, body, stored_at FROM ' +
+                                      'responses WHERE url = ?', (url,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]), bytes(row[2]), row[3]
+
+    def store(self, url, response):
+        """
+        Store a response and evict old ones if the cache is too big.
+
+        :param url: URL of the response.
+        :type url: STRING
+        :param response: response to store.
+        :type response: :class:`requests.Response`
+        """
+        now = time.time()
+        body = response.content
+        conn = self._connect()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         (url, response.status_code, json.dumps(dict(response.headers)),
+                          sqlite3.Binary(body), len(body), now, now))
+        self.evict()
+
+    def touch(self, url, revalidated=False):
+        """
+        Mark a response as used (and as fresh if it was revalidated).
+        """
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            if revalidated:
+                conn.execute('UPDATE responses SET stored_at = ?, accessed_at = ? ' +
+                             'WHERE url = ?', (now, now, url))
+            else:
+                conn.execute('UPDATE responses SET accessed_at = ? WHERE url = ?',
+                             (now, url))
+
+    def evict(self):
+        """
+        Remove least recently used responses until the cache fits in max_size.
+        """
+        conn = self._connect()
+        with conn:
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+            if total <= self.max_size:
+                return
+            rows = conn.execute('SELECT url, size FROM responses ORDER BY accessed_at')
+            to_remove = []
+            for url, size in rows.fetchall():
+                if total <= self.max_size:
+                    break
+                to_remove.append((url,))
+                total -= size
+            conn.executemany('DELETE FROM responses WHERE url = ?', to_remove)
+        LOGGER.debug(str(len(to_remove)) + " responses evicted from the HTTP cache")
+
+    @staticmethod
+    def build_response(url, status, headers, body):
+        """
+        Build a :class:`requests.Response` from a stored response.
+        """
+        response = requests.models.Response()
+        response.url = url
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = body
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
+
+    def get(self, url, getter=None):
+        """
+        GET an URL, using the stored response if it is still fresh or not modified.
+
+        :param url: URL to get.
+        :type url: STRING
+        :param getter: session making the request (default: shared client of
+            :mod:`tooldog.http_client`).
+        :rtype: :class:`requests.Response`
+        """
+        if getter is None:
+            getter = http_client.get_client()
+        stored = self.lookup(url)
+        headers = {}
+        if stored is not None:
+            status, stored_headers, body, stored_at = stored
+            if time.time() - stored_at < self.ttl:
+                self.stats['hits'] += 1
+                self.touch(url)
+                return self.build_response(url, status, stored_headers, body)
+            stored_headers = CaseInsensitiveDict(stored_headers)
+            if 'ETag' in stored_headers:
+                headers['If-None-Match'] = stored_headers['ETag']
+            if 'Last-Modified' in stored_headers:
+                headers['If-Modified-Since'] = stored_headers['Last-Modified']
+        response = getter.get(url, headers=headers)
+        if response.status_code == 304 and stored is not None:
+            LOGGER.debug(url + " not modified, using cached response")
+            self.stats['revalidated'] += 1
+            self.touch(url, revalidated=True)
+            return self.build_response(url, status, dict(stored_headers), body)
+        self.stats['misses'] += 1
+        if response.status_code == 200 and \
+           'no-store' not in response.headers.get('Cache-Control', ''):
+            self.store(url, response)
+        return response
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+"""
+HTTP client shared by all network calls of ToolDog (https://bio.tools, Galaxy API and
+NCBI ID converter).
+
+A single session per process keeps connections alive in per-host pools, applies
+connect/read timeouts and retries failed requests with an exponential backoff. It also
+counts connections opened and reused to check that keep-alive works.
+"""
+
+#  Import  ------------------------------
+
+# General libraries
+import os
+import logging
+
+# External libraries
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Class and Objects
+from tooldog.defaults import DEFAULT_TIMEOUT, DEFAULT_RETRIES, DEFAULT_BACKOFF, \
+    DEFAULT_POOL_SIZE
+
+#  Constant(s)  ------------------------------
+
+LOGGER = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Settings of the shared client and the client itself (per process)
+_SETTINGS = {}
+_CLIENT = None
+
+#  Function(s)  ------------------------------
+
+
+def configure(**settings):
+    """
+    Change the settings of the shared client (see :class:`tooldog.http_client.HttpClient`
+    for the parameters). The client is created again on next use.
+    """
+    global _CLIENT
+    _SETTINGS.clear()
+    _SETTINGS.update(settings)
+    if _CLIENT is not None:
+        _CLIENT.close()
+    _CLIENT = None
+
+
+def get_client():
+    """
+    Get the HTTP client shared within the process. A forked process gets its own client as
+    connections cannot be shared between processes.
+
+    :rtype: :class:`tooldog.http_client.HttpClient`
+    """
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.pid != os.getpid():
+        _CLIENT = HttpClient(**_SETTINGS)
+    return _CLIENT
+
+
+def _make_retry(retries, backoff):
+    """
+    Build the retry policy (compatible with old and new versions of urllib3).
+    """
+    kwargs = {'total': retries, 'connect': retries, 'read': retries,
+              'backoff_factor': backoff, 'status_forcelist': RETRY_STATUSES,
+              'raise_on_status': False}
+    try:
+        return Retry(allowed_methods=frozenset(['GET', 'HEAD']), **kwargs)
+    except TypeError:
+        return Retry(method_whitelist=frozenset(['GET', 'HEAD']), **kwargs)
+
+#  Class(es)  ------------------------------
+
+
+class HttpClient(requests.Session):
+    """
+    :class:`requests.Session` with connection pools, timeouts and retries.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, pool_size=DEFAULT_POOL_SIZE):
+        """
+        :param timeout: connect and read timeouts in seconds.
+        :type timeout: TUPLE or FLOAT
+        :param retries: number of retries of a failed request.
+        :type retries: INT
+        :param backoff: backoff factor between retries (0.5 waits 0.5s, 1s, 2s...).
+        :type backoff: FLOAT
+        :param pool_size: number of connections kept alive per host.
+        :type pool_size: INT
+        """
+        requests.Session.__init__(self)
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self.adapter = HTTPAdapter(pool_connections=DEFAULT_POOL_SIZE,
+                                   pool_maxsize=pool_size,
+                                   max_retries=_make_retry(retries, backoff))
+        self.mount('http://', self.adapter)
+        self.mount('https://', self.adapter)
+
+    def request(self, method, url, **kwargs):
+        """
+        Same as :meth:`requests.Session.request` with the timeout of the client by default.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        return requests.Session.request(self, method, url, **kwargs)
+
+    def stats(self):
+        """
+        Count requests sent and connections opened by the client.
+
+        :return: number of requests, connections opened and connections reused.
+        :rtype: DICT
+        """
+        nb_requests = 0
+        opened = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            nb_requests += pool.num_requests
+            opened += pool.num_connections
+        return {'requests': nb_requests, 'connections_opened': opened,
+                'connections_reused': nb_requests - opened}
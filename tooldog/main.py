@@ -7,29 +7,33 @@ Main functions used by ToolDog.
 #  Import  ------------------------------
 
 # General libraries
+import io
 import argparse
 import os
 import sys
 import json
-import copy
 import logging
-import shutil
 
-# External libraries
-import requests
-
-from tooldog import __version__, Biotool, TMP_DIR
-from tooldog.annotate.galaxy import GalaxyToolGen
-from tooldog.annotate.cwl import CwlToolGen
-from tooldog.analyse.tool_analyzer import ToolAnalyzer
+# Backends (Galaxy, CWL, analysis) and HTTP libraries are imported when they are used
+from tooldog import __version__, Biotool, readers, doi, defaults, tmp
 
 
 # Constant(s)  ------------------------------
 
 LOG_FILE = os.path.dirname(__file__) + '/tooldog.log'
+BIOTOOLS_API = 'https://bio.tools/api'
 global LOGGER
 LOGGER = logging.getLogger(__name__)  # for tests
 
+#  Class(es)  ------------------------------
+
+
+class EntryNotFoundError(Exception):
+    """
+    Raised when an entry does not exist on https://bio.tools.
+    """
+    pass
+
 #  Function(s)  ------------------------------
 
 
@@ -37,13 +41,20 @@ def parse_arguments():
     """
     Defines parser for ToolDog.
     """
-    parser = argparse.ArgumentParser(description='Generates XML or CWL from bio.tools entry.')
+    parser = argparse.ArgumentParser(description='Generates XML or CWL from bio.tools entry.' +
+                                     ' Use `tooldog dump -h` to dump the whole registry' +
+                                     ' and `tooldog serve -h` to run an HTTP service.',
+                                     fromfile_prefix_chars='@')
     # Common arguments for analysis and annotations
-    parser.add_argument('biotool_entry', help='bio.tools entry from online resource' +
+    parser.add_argument('biotool_entry', nargs='+',
+                        help='bio.tools entry from online resource' +
                         ' (ID[/VERSION], e.g. integron_finder/1.5.1 or integron_finder,' +
                         ' the latest version will be fetched in the latter case)' +
                         ' or from local file (ENTRY.json,' +
-                        ' e.g. integron_finder.json)')
+                        ' e.g. integron_finder.json). Several entries, a directory of' +
+                        ' JSON files, @LISTFILE (one entry per line), a JSON array, JSON' +
+                        ' lines (.jsonl, - for STDIN) or a tar archive of entries run' +
+                        ' ToolDog in batch mode.')
     ana_or_desc = parser.add_mutually_exclusive_group(required=False)
     ana_or_desc.add_argument('--analyse', dest='ANALYSE', action='store_true',
                              help='run only analysis step of ToolDog.')
@@ -53,6 +64,19 @@ def parse_arguments():
                              help='Existing Tool descriptor that you want to annotate.')
     parser.add_argument('-f', '--file', dest='OUTFILE', help='write in the OUTFILE instead ' +
                         'of STDOUT.')
+    parser.add_argument('-o', '--output_dir', dest='OUTDIR', help='write one file per entry ' +
+                        'in OUTDIR (batch mode) instead of STDOUT.')
+    parser.add_argument('--report', dest='REPORT', help='write the result of each entry ' +
+                        '(batch mode) in REPORT (JSON lines).')
+    parser.add_argument('--manifest', dest='MANIFEST', help='record the fingerprint of ' +
+                        'each entry in MANIFEST (batch mode, requires -o/--output_dir) and ' +
+                        'skip the entries unchanged since the previous run.')
+    parser.add_argument('-j', '--jobs', dest='JOBS', type=int, default=1,
+                        help='number of processes converting entries in batch mode ' +
+                        '(requires -o/--output_dir).')
+    parser.add_argument('--fetch_concurrency', dest='FETCH_CONC', type=int, default=1,
+                        help='number of entries downloaded simultaneously from ' +
+                        'https://bio.tools in batch mode.')
     parser.add_argument('-v', '--verbose', action='store_true', dest='VERBOSE',
                         help='display info on STDERR.')
     parser.add_argument('--version', action='version', version=__version__,
@@ -86,6 +110,33 @@ def parse_arguments():
     galaxy_opt.add_argument('--mapping_file', dest='MAP_FILE',
                             help='Personalized EDAM to datatypes mapping json file ' +
                             'generated previously by ToolDog.')
+    # Group for network options
+    net_opt = parser.add_argument_group('Network options')
+    net_opt.add_argument('--http_timeout', dest='HTTP_TIMEOUT', type=float,
+                         help='timeout in seconds to connect and to wait for an answer ' +
+                         '(default: ' + str(defaults.DEFAULT_TIMEOUT[0]) + 's to ' +
+                         'connect, ' + str(defaults.DEFAULT_TIMEOUT[1]) + 's to read).')
+    net_opt.add_argument('--http_retries', dest='HTTP_RETRIES', type=int,
+                         default=defaults.DEFAULT_RETRIES,
+                         help='number of retries of a failed request (default: ' +
+                         str(defaults.DEFAULT_RETRIES) + ').')
+    # Group for cache options
+    cache_opt = parser.add_argument_group('Cache options')
+    cache_opt.add_argument('--http_cache', action='store_true', dest='HTTP_CACHE',
+                           help='keep responses of https://bio.tools and Galaxy in a local ' +
+                           'cache (in $TOOLDOG_CACHE_DIR, default: ~/.cache/tooldog).')
+    cache_opt.add_argument('--cache_ttl', dest='CACHE_TTL', type=int,
+                           default=defaults.DEFAULT_CACHE_TTL,
+                           help='number of seconds a cached response is used without ' +
+                           'asking the server if it changed (default: ' +
+                           str(defaults.DEFAULT_CACHE_TTL) + ').')
+    cache_opt.add_argument('--no_doi_cache', action='store_false', dest='DOI_CACHE',
+                           help='do not keep DOIs found from PMID and PMCID of ' +
+                           'publications in the local cache.')
+    cache_opt.add_argument('--render_cache', action='store_true', dest='RENDER_CACHE',
+                           help='keep the generated tools in a local cache, reused for ' +
+                           'entries rendering to the same tool (batch mode with ' +
+                           '-o/--output_dir).')
     # Group for logger options
     log_group = parser.add_argument_group('Logs options')
     log_group.add_argument('-l', '--logs', action='store_true',
@@ -144,7 +195,9 @@ def config_logger(write_logs, log_level, log_file, verbose):
     # Configure loggers for everymodule
     modules = ['annotate.galaxy', 'annotate.cwl', 'annotate.edam_to_galaxy',
                'analyse', 'analyse.tool_analazer', 'analyse.code_collector',
-               'analyse.language_analyzer', 'biotool_model', 'main', 'analyse']
+               'analyse.language_analyzer', 'biotool_model', 'main', 'analyse', 'batch',
+               'fetch', 'dump', 'serve', 'manifest', 'readers', 'http_cache', 'http_client',
+               'doi', 'render_cache']
     logger = {'handlers': ['stderr'],
               'propagate': False,
               'level': 'DEBUG'}
@@ -155,7 +208,7 @@ def config_logger(write_logs, log_level, log_file, verbose):
     return cfg
 
 
-def json_from_biotools(tool_id, tool_version="latest"):
+def json_from_biotools(tool_id, tool_version="latest", session=None, api_url=BIOTOOLS_API):
     """
     Import JSON of a tool from https://bio.tools.
 
@@ -163,26 +216,33 @@ def json_from_biotools(tool_id, tool_version="latest"):
     :type tool_id: STRING
     :param tool_version: Version of the tool.
     :type tool_version: STRING
+    :param session: HTTP session used for the request (default: shared client of
+        :mod:`tooldog.http_client`).
+    :type session: :class:`requests.Session`
+    :param api_url: URL of the bio.tools API.
+    :type api_url: STRING
 
     :return: dictionnary corresponding to the JSON from https://bio.tools.
     :rtype: DICT
+    :raises: :class:`tooldog.main.EntryNotFoundError` if the entry does not exist.
     """
     LOGGER.info("Loading tool entry from https://bio.tools: " + tool_id + '/' + tool_version)
-    biotools_link = "https://bio.tools/api/tool/" + tool_id + ("/version/" + tool_version if tool_version != "latest" else "/")
+    biotools_link = api_url + "/tool/" + tool_id + ("/version/" + tool_version if tool_version != "latest" else "/")
     # Access the entry with requests and get the JSON part
-    http_tool = requests.get(biotools_link)
+    from tooldog import http_cache
+    http_tool = http_cache.cached_get(biotools_link, session=session)
     json_tool = http_tool.json()
     if len(json_tool.keys()) == 1:
         # The content of JSON only contains one element which is the results we obtain
         # on bio.tools when an entry does not exist.
-        LOGGER.error('Entry not found on https://bio.tools.com. Exit.')
-        sys.exit(1)
+        raise EntryNotFoundError('Entry ' + tool_id + '/' + tool_version +
+                                 ' not found on https://bio.tools.')
     return json_tool
 
 
 def json_from_file(json_file):
     """
-    Import JSON of a tool from a local JSON file.
+    Import JSON of a tool from a local JSON file (optionally compressed with gzip).
 
     :param json_file: path to the file
     :type json_file: STRING
@@ -192,11 +252,48 @@ def json_from_file(json_file):
     """
     LOGGER.info("Loading tool entry from local file: " + json_file)
     # parse file in JSON format
-    with open(json_file, 'r') as tool_file:
+    with readers.open_text(json_file) as tool_file:
         json_tool = json.load(tool_file)
     return json_tool
 
 
+def is_file_entry(biotool_entry):
+    """
+    Tell a local JSON file from the ID[/VERSION] of a https://bio.tools entry.
+
+    :param biotool_entry: path to a JSON file or ID[/VERSION] of a https://bio.tools entry.
+    :type biotool_entry: STRING
+    :return: True if the entry is a local JSON file.
+    :rtype: BOOLEAN
+    """
+    return biotool_entry.endswith('.json') or os.path.isfile(biotool_entry)
+
+
+def json_from_entry(biotool_entry, session=None, api_url=BIOTOOLS_API):
+    """
+    Import JSON of a tool either from a local file or from https://bio.tools depending on
+    the syntax of the entry.
+
+    :param biotool_entry: path to a JSON file or ID[/VERSION] of a https://bio.tools entry.
+    :type biotool_entry: STRING
+    :param session: HTTP session reused between calls.
+    :type session: :class:`requests.Session`
+    :param api_url: URL of the bio.tools API.
+    :type api_url: STRING
+
+    :return: dictionnary corresponding to the JSON.
+    :rtype: DICT
+    """
+    if is_file_entry(biotool_entry):
+        # Importation from local file
+        return json_from_file(biotool_entry)
+    elif ('/' in biotool_entry) and (len(biotool_entry.split('/')) == 2):
+        # Importation from https://bio.tools
+        tool_ids = biotool_entry.split('/')
+        return json_from_biotools(tool_ids[0], tool_ids[1], session=session, api_url=api_url)
+    return json_from_biotools(biotool_entry, session=session, api_url=api_url)
+
+
 def json_to_biotool(json_file):
     """
     Takes JSON file from bio.tools description and loads its content to
@@ -223,8 +320,193 @@ def json_to_biotool(json_file):
     return biotool
 
 
+def xml_generator(biotool, galaxy_url=None, edam_url=None, mapping_json=None,
+                  existing_tool=None, etog=None):
+    """
+    Build the part of the Galaxy XML shared by all functions of an entry (EDAM topics and
+    operations, and citations).
+
+    See :func:`tooldog.main.write_xml` for the parameters.
+
+    :rtype: :class:`tooldog.annotate.galaxy.GalaxyToolGen`
+    """
+    from tooldog.annotate.galaxy import GalaxyToolGen
+    biotool_xml = GalaxyToolGen(biotool, galaxy_url=galaxy_url, edam_url=edam_url,
+                                mapping_json=mapping_json, existing_tool=existing_tool,
+                                etog=etog)
+    # Add EDAM annotation and citations
+    for topic in biotool.topics:
+        biotool_xml.add_edam_topic(topic)
+    for function in biotool.functions:
+        for operation in function.operations:
+            biotool_xml.add_edam_operation(operation)
+    for publi in biotool.informations.publications:
+        biotool_xml.add_citation(publi)
+    return biotool_xml
+
+
+def cwl_generator(biotool, existing_tool=None):
+    """
+    Build the part of the CWL shared by all functions of an entry (EDAM topics and
+    publications).
+
+    See :func:`tooldog.main.write_cwl` for the parameters.
+
+    :rtype: :class:`tooldog.annotate.cwl.CwlToolGen`
+    """
+    from tooldog.annotate.cwl import CwlToolGen
+    biotool_cwl = CwlToolGen(biotool, existing_tool=existing_tool)
+    # Add different Metadata
+    for topic in biotool.topics:
+        biotool_cwl.add_edam_topic(topic)
+    for publi in biotool.informations.publications:
+        biotool_cwl.add_publication(publi)
+    return biotool_cwl
+
+
+def tool_name(biotool, extension, index=None):
+    """
+    Name of the tool written for a function of an entry (as named by the command line).
+
+    :param biotool: Biotool object.
+    :type biotool: :class:`tooldog.biotool_model.Biotool`
+    :param extension: extension of the tool ('.xml' or '.cwl').
+    :type extension: STRING
+    :param index: index of the function (None for entries with a single function).
+    :type index: INT
+    :rtype: STRING
+    """
+    return biotool.tool_id + (str(index) if index is not None else '') + extension
+
+
+def _selected_functions(biotool, functions):
+    """
+    :return: index (starting at 1) and Function object of the functions to render.
+    :rtype: LIST of TUPLE
+    """
+    if functions is None:
+        functions = range(1, len(biotool.functions) + 1)
+    selected = []
+    for index in functions:
+        if not 1 <= index <= len(biotool.functions):
+            raise IndexError('Entry ' + biotool.tool_id + ' has ' +
+                             str(len(biotool.functions)) + ' function(s), no function ' +
+                             str(index) + '.')
+        selected.append((index, biotool.functions[index - 1]))
+    return selected
+
+
+def _render(biotool, fmt, functions, cache, etog, make_generator, export):
+    """
+    Render the tools of the selected functions of an entry, reading them from the render
+    cache (given or default one) when possible. The generator is only built if a tool is
+    missing from the cache.
+
+    :return: name and content of the tool of each function.
+    :rtype: LIST of TUPLE
+    """
+    from tooldog import render_cache
+    extension = '.xml' if fmt == 'galaxy' else '.cwl'
+    if cache is None:
+        cache = render_cache.get_default_cache()
+    generator = None
+    rendered = []
+    for index, function in _selected_functions(biotool, functions):
+        name = tool_name(biotool, extension, index if len(biotool.functions) > 1 else None)
+        key = None
+        if cache is not None:
+            key = render_cache.render_key(biotool, function, fmt, etog)
+            content = cache.lookup(key)
+            if content is not None:
+                rendered.append((name, content))
+                continue
+        if generator is None:
+            generator = make_generator()
+        generator.set_function(function)
+        handle = io.BytesIO()
+        export(generator, handle)
+        rendered.append((name, handle.getvalue()))
+        if key is not None:
+            cache.store(key, handle.getvalue())
+    return rendered
+
+
+def render_xml(biotool, galaxy_url=None, edam_url=None, mapping_json=None, etog=None,
+               functions=None, cache=None):
+    """
+    Build the Galaxy XML of the functions of an entry in memory, the same bytes as the
+    files written by :func:`tooldog.main.write_xml`.
+
+    :param biotool: Biotool object.
+    :type biotool: :class:`tooldog.biotool_model.Biotool`
+    :param functions: indexes (starting at 1) of the functions to render (all by default).
+    :type functions: LIST of INT
+    :param cache: render cache to use instead of the default one.
+    :type cache: :class:`tooldog.render_cache.RenderCache`
+
+    See :func:`tooldog.main.write_xml` for the other parameters.
+
+    :return: name and content of the tool of each function.
+    :rtype: LIST of TUPLE
+    """
+    if etog is None:
+        from tooldog.annotate.edam_to_galaxy import get_mapping
+        etog = get_mapping(galaxy_url=galaxy_url, edam_url=edam_url,
+                           mapping_json=mapping_json)
+    return _render(biotool, 'galaxy', functions, cache, etog,
+                   lambda: xml_generator(biotool, etog=etog),
+                   lambda generator, handle: generator.export_xml(handle))
+
+
+def render_cwl(biotool, functions=None, cache=None):
+    """
+    Build the CWL of the functions of an entry in memory, the same bytes as the files
+    written by :func:`tooldog.main.write_cwl`.
+
+    :param biotool: Biotool object.
+    :type biotool: :class:`tooldog.biotool_model.Biotool`
+    :param functions: indexes (starting at 1) of the functions to render (all by default).
+    :type functions: LIST of INT
+    :param cache: render cache to use instead of the default one.
+    :type cache: :class:`tooldog.render_cache.RenderCache`
+
+    :return: name and content of the tool of each function.
+    :rtype: LIST of TUPLE
+    """
+    return _render(biotool, 'cwl', functions, cache, None,
+                   lambda: cwl_generator(biotool),
+                   lambda generator, handle: generator.export_cwl(handle))
+
+
+def convert(json_tool, fmt='galaxy', options=None):
+    """
+    Convert a bio.tools entry to Galaxy XML or CWL without printing or writing anything.
+
+    :param json_tool: JSON of the entry (as given by https://bio.tools).
+    :type json_tool: DICT
+    :param fmt: 'galaxy' or 'cwl'.
+    :type fmt: STRING
+    :param options: options of the conversion: `functions` and `cache` (see
+        :func:`tooldog.main.render_xml`) and for Galaxy, `galaxy_url`, `edam_url`,
+        `mapping_json` and `etog` (see :func:`tooldog.main.write_xml`).
+    :type options: DICT
+
+    :return: name and content of the tool of each function of the entry.
+    :rtype: LIST of TUPLE
+    """
+    options = dict(options or {})
+    if fmt not in ('galaxy', 'cwl'):
+        raise ValueError('Unknown format ' + str(fmt) + ', use galaxy or cwl.')
+    biotool = json_to_biotool(json_tool)
+    # DOIs of publications are resolved while the description is generated
+    biotool.enrich_dois()
+    if fmt == 'galaxy':
+        return render_xml(biotool, **options)
+    return render_cwl(biotool, **options)
+
+
 def write_xml(biotool, outfile=None, galaxy_url=None, edam_url=None, mapping_json=None,
-              existing_tool=None, inout_biotool=False):
+              existing_tool=None, inout_biotool=False, etog=None):
     """
     This function uses :class:`tooldog.galaxy.GalaxyToolGen` to write XML
     using galaxyxml library.
@@ -243,18 +525,17 @@ def write_xml(biotool, outfile=None, galaxy_url=None, edam_url=None, mapping_jso
     :type existing_tool: STRING
     :param inout_biotool: add input and outputs description from https://bio.tools.
     :type inout_biotool: BOOLEAN
+    :param etog: already loaded mapping, reused instead of loading a new one.
+    :type etog: :class:`tooldog.annotate.edam_to_galaxy.EdamToGalaxy`
+
+    :return: paths of the written files (empty if written on STDOUT).
+    :rtype: LIST of STRING
     """
     LOGGER.info("Writing XML file with galaxy.py module...")
-    biotool_xml = GalaxyToolGen(biotool, galaxy_url=galaxy_url, edam_url=edam_url,
-                                mapping_json=mapping_json, existing_tool=existing_tool)
-    # Add EDAM annotation and citations
-    for topic in biotool.topics:
-        biotool_xml.add_edam_topic(topic)
-    for function in biotool.functions:
-        for operation in function.operations:
-            biotool_xml.add_edam_operation(operation)
-    for publi in biotool.informations.publications:
-        biotool_xml.add_citation(publi)
+    biotool_xml = xml_generator(biotool, galaxy_url=galaxy_url, edam_url=edam_url,
+                                mapping_json=mapping_json, existing_tool=existing_tool,
+                                etog=etog)
+    written = []
     # Add inputs and outputs
     if existing_tool:
         if inout_biotool:
@@ -263,21 +544,18 @@ def write_xml(biotool, outfile=None, galaxy_url=None, edam_url=None, mapping_jso
                     biotool_xml.add_input_file(inpt)
                 for output in function.outputs:
                     biotool_xml.add_output_file(output)
-        biotool_xml.write_xml(out_file=outfile, keep_old_command=True)
+        written.append(biotool_xml.write_xml(out_file=outfile, keep_old_command=True))
     else:
         # This will need to be changed when incorporating argparse2tool...
-        for function in biotool.functions:
-            # First make a copy of the tool to add function infos
-            function_xml = copy.deepcopy(biotool_xml)
-            for inpt in function.inputs:
-                function_xml.add_input_file(inpt)
-            for output in function.outputs:
-                function_xml.add_output_file(output)
+        for index, function in enumerate(biotool.functions):
+            # Inputs and outputs of the function replace the ones of the previous one
+            biotool_xml.set_function(function)
             # Write tool
             if len(biotool.functions) > 1:
-                function_xml.write_xml(outfile, biotool.functions.index(function) + 1)
+                written.append(biotool_xml.write_xml(outfile, index + 1))
             else:
-                function_xml.write_xml(outfile)
+                written.append(biotool_xml.write_xml(outfile))
+    return [path for path in written if path is not None]
 
 
 def write_cwl(biotool, outfile=None, existing_tool=None):
@@ -291,33 +569,29 @@ def write_cwl(biotool, outfile=None, existing_tool=None):
     :type outfile: STRING
     :param existing_tool: local path to existing CWL tool description.
     :type existing_tool: STRING
+
+    :return: paths of the written files (empty if written on STDOUT).
+    :rtype: LIST of STRING
     """
     LOGGER.info("Writing CWL file with cwl.py module...")
-    biotool_cwl = CwlToolGen(biotool, existing_tool=existing_tool)
-    # Add different Metadata
-    for topic in biotool.topics:
-        biotool_cwl.add_edam_topic(topic)
-    for publi in biotool.informations.publications:
-        biotool_cwl.add_publication(publi)
+    biotool_cwl = cwl_generator(biotool, existing_tool=existing_tool)
+    written = []
     if existing_tool:
         # For the moment, there is no way to add metadata to the cwl
-        biotool_cwl.write_cwl(outfile)
+        written.append(biotool_cwl.write_cwl(outfile))
     else:
-        for function in biotool.functions:
-            # First make a copy of the tool to add function infos
-            function_cwl = copy.deepcopy(biotool_cwl)
-            for inp in function.inputs:
-                function_cwl.add_input_file(inp)
-            for outp in function.outputs:
-                function_cwl.add_output_file(outp)
+        for index, function in enumerate(biotool.functions):
+            # Inputs and outputs of the function replace the ones of the previous one
+            biotool_cwl.set_function(function)
             # Write tool
             if len(biotool.functions) > 1:
-                function_cwl.write_cwl(outfile, biotool.functions.index(function) + 1)
+                written.append(biotool_cwl.write_cwl(outfile, index + 1))
             else:
-                function_cwl.write_cwl(outfile)
+                written.append(biotool_cwl.write_cwl(outfile))
+    return [path for path in written if path is not None]
 
 
-def annotate(biotool, args, existing_desc=None):
+def annotate(biotool, args, existing_desc=None, outfile=None, etog=None):
     """
     Run annotation (generated by analysis or existing_desc).
 
@@ -327,15 +601,26 @@ def annotate(biotool, args, existing_desc=None):
     :type args: :class:`argparse.ArgumentParser`
     :param existing_desc: Existing tool descriptor path.
     :type existing_desc: STRING
+    :param outfile: path to output file (args.OUTFILE is used otherwise).
+    :type outfile: STRING
+    :param etog: already loaded mapping between EDAM and Galaxy datatypes.
+    :type etog: :class:`tooldog.annotate.edam_to_galaxy.EdamToGalaxy`
+
+    :return: paths of the written files.
+    :rtype: LIST of STRING
     """
+    if outfile is None:
+        outfile = args.OUTFILE
     if args.GALAXY:
         # Probably need to check if existing_desc right format
-        write_xml(biotool, outfile=args.OUTFILE, galaxy_url=args.GAL_URL,
-                  edam_url=args.EDAM_URL, mapping_json=args.MAP_FILE,
-                  existing_tool=existing_desc, inout_biotool=args.INOUT_BIOT)
+        return write_xml(biotool, outfile=outfile, galaxy_url=args.GAL_URL,
+                         edam_url=args.EDAM_URL, mapping_json=args.MAP_FILE,
+                         existing_tool=existing_desc, inout_biotool=args.INOUT_BIOT,
+                         etog=etog)
     elif args.CWL:
         # Write corresponding CWL
-        write_cwl(biotool, args.OUTFILE, existing_tool=existing_desc)
+        return write_cwl(biotool, outfile, existing_tool=existing_desc)
+    return []
 
 
 def analyse(biotool, args):
@@ -349,6 +634,7 @@ def analyse(biotool, args):
     """
     LOGGER.warn("Analysis feature is in beta version.")
     output = ''
+    from tooldog.analyse.tool_analyzer import ToolAnalyzer
     # Instantiate ToolAnalyzer object
     if args.GALAXY:
         ta = ToolAnalyzer(biotool, 'galaxy', language=args.LANG, source_code=args.SOURCE)
@@ -360,12 +646,72 @@ def analyse(biotool, args):
     return output
 
 
+def process_biotool(biotool, args, outfile=None, etog=None):
+    """
+    Run the steps of ToolDog (analysis and/or annotation) selected by the arguments on
+    one Biotool object.
+
+    :param biotool: Biotool object.
+    :type biotool: :class:`tooldog.biotool_model.Biotool`
+    :param args: Parsed arguments.
+    :type args: :class:`argparse.ArgumentParser`
+    :param outfile: path to output file (args.OUTFILE is used otherwise).
+    :type outfile: STRING
+    :param etog: already loaded mapping between EDAM and Galaxy datatypes.
+    :type etog: :class:`tooldog.annotate.edam_to_galaxy.EdamToGalaxy`
+
+    :return: paths of the written files.
+    :rtype: LIST of STRING
+    """
+    if args.ORI_DESC or args.ANNOTATE or not args.ANALYSE:
+        # DOIs of publications are resolved while the description is generated
+        biotool.enrich_dois()
+    if args.ORI_DESC:
+        return annotate(biotool, args, args.ORI_DESC, outfile=outfile, etog=etog)
+    elif args.ANALYSE and not args.ANNOTATE:
+        analyse(biotool, args)
+        return []
+    elif args.ANNOTATE and not args.ANALYSE:
+        return annotate(biotool, args, outfile=outfile, etog=etog)
+    # analyse(biotool, args)
+    gen_tool = analyse(biotool, args)
+    # The existing_tool need to be changed to what will be generated by analyse().
+    return annotate(biotool, args, gen_tool, outfile=outfile, etog=etog)
+
+
+def is_batch(args):
+    """
+    Check if ToolDog has to run in batch mode (several entries or a directory of entries).
+
+    :param args: Parsed arguments.
+    :type args: :class:`argparse.ArgumentParser`
+    :rtype: BOOLEAN
+    """
+    entry = args.biotool_entry[0]
+    if len(args.biotool_entry) > 1 or os.path.isdir(entry) or \
+       readers.is_multi_entry_source(entry):
+        return True
+    return args.OUTDIR is not None or args.REPORT is not None or args.JOBS > 1 or \
+        getattr(args, 'MANIFEST', None) is not None
+
+
 def run():
     """
     Running function called by tooldog command line.
     """
 
     try:
+        if sys.argv[1:2] == ['dump']:
+            # Subcommand to dump the whole registry
+            from tooldog.dump import run_dump
+            run_dump(sys.argv[2:])
+            return
+        if sys.argv[1:2] == ['serve']:
+            # Subcommand to serve conversions over HTTP
+            from tooldog.serve import run_serve
+            run_serve(sys.argv[2:])
+            return
+
         # Parse arguments
         args = parse_arguments()
 
@@ -376,37 +722,47 @@ def run():
         # Reset LOGGER with new config
         LOGGER = logging.getLogger(__name__)
 
+        # The HTTP client is only loaded to change its default settings
+        if args.HTTP_TIMEOUT is not None:
+            from tooldog import http_client
+            http_client.configure(timeout=args.HTTP_TIMEOUT, retries=args.HTTP_RETRIES)
+        elif args.HTTP_RETRIES != defaults.DEFAULT_RETRIES:
+            from tooldog import http_client
+            http_client.configure(retries=args.HTTP_RETRIES)
+        if args.HTTP_CACHE:
+            from tooldog import http_cache
+            http_cache.configure(ttl=args.CACHE_TTL)
+        if args.DOI_CACHE:
+            doi.configure()
+        if args.RENDER_CACHE:
+            from tooldog import render_cache
+            render_cache.configure()
+
+        if is_batch(args):
+            from tooldog.batch import BatchRunner
+            runner = BatchRunner(args)
+            results = runner.run(args.biotool_entry)
+            if any(result['status'] != 'ok' for result in results):
+                sys.exit(1)
+            return
+
         # Get JSON of the tool
-        if '.json' in args.biotool_entry:
-            # Importation from local file
-            json_tool = json_from_file(args.biotool_entry)
-        elif ('/' in args.biotool_entry) and (len(args.biotool_entry.split('/')) == 2):
-            # Importation from https://bio.tools
-            tool_ids = args.biotool_entry.split('/')
-            json_tool = json_from_biotools(tool_ids[0], tool_ids[1])
-        else:
-            json_tool = json_from_biotools(args.biotool_entry)
-            # Wrong argument given for the entry
-            # LOGGER.error('biotool_entry does not have the correct syntax. Exit')
-            # parser.print_help()
-            # sys.exit(1)
+        try:
+            json_tool = json_from_entry(args.biotool_entry[0])
+        except EntryNotFoundError as exc:
+            LOGGER.error(str(exc) + ' Exit.')
+            sys.exit(1)
 
         # Load Biotool object
         biotool = json_to_biotool(json_tool)
 
-        if args.ORI_DESC:
-            annotate(biotool, args, args.ORI_DESC)
-        elif args.ANALYSE and not args.ANNOTATE:
-            analyse(biotool, args)
-        elif args.ANNOTATE and not args.ANALYSE:
-            annotate(biotool, args)
-        else:
-            # analyse(biotool, args)
-            gen_tool = analyse(biotool, args)
-            # The existing_tool need to be changed to what will be generated by analyse().
-            annotate(biotool, args, gen_tool)
+        process_biotool(biotool, args)
+        if 'tooldog.http_client' in sys.modules:
+            # Some requests were made
+            LOGGER.debug("HTTP connections: " +
+                         str(sys.modules['tooldog.http_client'].get_client().stats()))
     finally:
-        shutil.rmtree(TMP_DIR)
+        tmp.remove_tmp_dir()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+
+"""
+Manifest of the tools written in batch mode, used to only regenerate what changed.
+
+For each entry, the manifest records the fingerprint of what the tools were generated
+from: a hash of the normalized JSON of the entry, the ToolDog version, a digest of the
+content of the EDAM to Galaxy mapping and the generation options, along with the hashes
+of the written files. An entry whose fingerprint did not change since the previous run is
+skipped, and a file is only rewritten if its content changes, so its modification time
+is kept.
+"""
+
+#  Import  ------------------------------
+
+# General libraries
+import os
+import json
+import hashlib
+import logging
+
+# Class and Objects
+from tooldog import __version__
+from tooldog.cache import write_json, write_bytes
+
+#  Constant(s)  ------------------------------
+
+LOGGER = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+#  Function(s)  ------------------------------
+
+
+def entry_hash(json_tool):
+    """
+    Hash of the normalized JSON of an entry (keys sorted, no whitespace), so the same
+    entry gives the same hash whatever the way it was formatted.
+
+    :param json_tool: JSON of the entry.
+    :type json_tool: DICT
+    :return: SHA-256 of the entry.
+    :rtype: STRING
+    """
+    normalized = json.dumps(json_tool, sort_keys=True, separators=(',', ':'),
+                            ensure_ascii=False)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def fingerprint(json_tool, mapping=None, options=None):
+    """
+    Fingerprint of the generation of the tools of an entry.
+
+    :param json_tool: JSON of the entry.
+    :type json_tool: DICT
+    :param mapping: digest of the EDAM to Galaxy mapping used (None for CWL, see
+        :func:`tooldog.render_cache.mapping_digest`).
+    :type mapping: STRING
+    :param options: options of the generation.
+    :type options: DICT
+    :rtype: DICT
+    """
+    return {'entry': entry_hash(json_tool), 'tooldog_version': __version__,
+            'mapping': mapping, 'options': options or {}}
+
+
+def content_hash(content):
+    """
+    :return: SHA-256 of the content of a file.
+    :rtype: STRING
+    """
+    return hashlib.sha256(content).hexdigest()
+
+
+def write_if_changed(path, content):
+    """
+    Write a file only if its content changes (atomically, see
+    :func:`tooldog.cache.write_bytes`).
+
+    :param path: path to the file.
+    :type path: STRING
+    :param content: content of the file.
+    :type content: BYTES
+    :return: True if the file was written.
+    :rtype: BOOLEAN
+    """
+    try:
+        if os.path.getsize(path) == len(content):
+            with open(path, 'rb') as current:
+                if current.read() == content:
+                    return False
+    except (IOError, OSError):
+        # Missing file
+        pass
+    write_bytes(path, content)
+    return True
+
+#  Class(es)  ------------------------------
+
+
+class Manifest(object):
+    """
+    Fingerprints and written files of the entries of previous runs, stored in JSON.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: path to the manifest (created by :meth:`save` if missing).
+        :type path: STRING
+        """
+        self.path = path
+        self.entries = {}
+        self.changed = False
+        try:
+            with open(path, 'r') as manifest_file:
+                content = json.load(manifest_file)
+        except (IOError, OSError):
+            return
+        except ValueError:
+            LOGGER.warning("Invalid manifest " + path + ", all entries are generated.")
+            return
+        if content.get('version') == MANIFEST_VERSION:
+            self.entries = content.get('entries', {})
+
+    def is_current(self, name, key):
+        """
+        Check if the tools of an entry are up to date.
+
+        :param name: name of the entry.
+        :type name: STRING
+        :param key: fingerprint of the entry (see :func:`tooldog.manifest.fingerprint`).
+        :type key: DICT
+        :return: True if the entry had the same fingerprint in the previous run and its
+            files are still there.
+        :rtype: BOOLEAN
+        """
+        record = self.entries.get(name)
+        if record is None or record['fingerprint'] != key:
+            return False
+        return all(os.path.isfile(path) for path in record['outputs'])
+
+    def outputs(self, name):
+        """
+        :return: paths of the files written for an entry.
+        :rtype: LIST of STRING
+        """
+        return list(self.entries[name]['outputs'])
+
+    def record(self, name, key, outputs):
+        """
+        Record the fingerprint and the files of an entry.
+
+        :param name: name of the entry.
+        :type name: STRING
+        :param key: fingerprint of the entry.
+        :type key: DICT
+        :param outputs: path and SHA-256 of the content of each file written.
+        :type outputs: DICT
+        """
+        self.entries[name] = {'fingerprint': key, 'outputs': outputs}
+        self.changed = True
+
+    def forget(self, name):
+        """
+        Remove an entry (e.g. that failed), so it is generated again by the next run.
+
+        :param name: name of the entry.
+        :type name: STRING
+        """
+        if self.entries.pop(name, None) is not None:
+            self.changed = True
+
+    def save(self):
+        """
+        Write the manifest if it changed (atomically, see :func:`tooldog.cache.write_json`).
+        """
+        if not self.changed:
+            return
+        write_json(self.path, {'version': MANIFEST_VERSION, 'entries': self.entries},
+                   indent=1, sort_keys=True)
+        self.changed = False
+        LOGGER.info("Manifest of " + str(len(self.entries)) + " entries written to " +
+                    self.path)
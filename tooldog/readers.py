@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+"""
+Streaming readers of files containing many https://bio.tools entries.
+
+Entries are given one at a time, only the entry being read is kept in memory. Supported
+sources are:
+
+* JSON files with one entry or an array of entries (e.g. registry exports)
+* JSON lines files (e.g. generated by `tooldog dump`), `-` reads STDIN
+* tar archives (optionally compressed) of JSON and JSON lines files, read member by member
+  without extraction
+
+All of them can also be compressed with gzip (`.gz`).
+"""
+
+#  Import  ------------------------------
+
+# General libraries
+import os
+import sys
+import codecs
+import gzip
+import json
+import tarfile
+import logging
+
+#  Constant(s)  ------------------------------
+
+LOGGER = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 16
+MAX_RECORD_SIZE = 64 << 20  # Maximum number of characters of one entry
+JSON_EXTENSIONS = ('.json', '.json.gz')
+JSONL_EXTENSIONS = ('.jsonl', '.jsonl.gz', '.ndjson', '.ndjson.gz')
+TAR_EXTENSIONS = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+
+_DECODER = json.JSONDecoder()
+
+#  Function(s)  ------------------------------
+
+
+def iter_json_stream(stream, chunk_size=CHUNK_SIZE, max_record_size=MAX_RECORD_SIZE):
+    """
+    Incremental parser of JSON values. It reads a top-level array element by element, and
+    also accepts a sequence of JSON values (one object, JSON lines, concatenated objects).
+
+    :param stream: text stream to read from.
+    :type stream: file object
+    :param chunk_size: number of characters read at a time.
+    :type chunk_size: INT
+    :param max_record_size: maximum number of characters of one value. A malformed value
+        is only detected at the end of the stream, this bounds the memory used and the
+        text read before failing.
+    :type max_record_size: INT
+    :return: generator of the parsed values.
+    :rtype: GENERATOR of DICT
+    :raises: ValueError if a value is invalid or larger than max_record_size.
+    """
+    buf = ''
+    pos = 0
+    # Number of characters of the stream dropped from the buffer
+    offset = 0
+    in_array = None
+    eof = False
+    while True:
+        # Skip separators between values
+        while pos < len(buf) and (buf[pos].isspace() or (in_array and buf[pos] == ',')):
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                break
+            offset += len(buf)
+            buf = stream.read(chunk_size)
+            pos = 0
+            eof = not buf
+            continue
+        if in_array is None:
+            in_array = buf[pos] == '['
+            if in_array:
+                pos += 1
+                continue
+        if in_array and buf[pos] == ']':
+            in_array = None
+            pos += 1
+            continue
+        try:
+            value, end = _DECODER.raw_decode(buf, pos)
+            # A number may continue in the next chunk
+            complete = eof or end < len(buf) or isinstance(value, (dict, list))
+        except ValueError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            if len(buf) - pos >= max_record_size:
+                raise ValueError("Invalid JSON value at offset " + str(offset + pos) +
+                                 ": not complete within " + str(max_record_size) +
+                                 " characters")
+            # Read more, at least as much as already buffered so that a large value is
+            # only decoded a few times
+            chunk = stream.read(max(chunk_size, len(buf) - pos))
+            eof = not chunk
+            offset += pos
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        pos = end
+        yield value
+        if pos > chunk_size:
+            # Drop what was already parsed
+            offset += pos
+            buf = buf[pos:]
+            pos = 0
+
+
+def iter_jsonl(stream):
+    """
+    Read JSON lines, one entry per line. Blank lines are skipped.
+
+    :param stream: text stream to read from.
+    :type stream: file object
+    :rtype: GENERATOR of DICT
+    """
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _iter_text(stream, name):
+    """
+    Choose the reader for a text stream from its name.
+    """
+    if name.endswith(JSONL_EXTENSIONS):
+        return iter_jsonl(stream)
+    return iter_json_stream(stream)
+
+
+def iter_tar(fileobj=None, name=None):
+    """
+    Read the JSON and JSON lines members of a tar archive in the order of the archive,
+    without extracting them to disk.
+
+    :param fileobj: binary stream of the archive (name is opened otherwise).
+    :type fileobj: file object
+    :param name: path to the archive.
+    :type name: STRING
+    :rtype: GENERATOR of DICT
+    """
+    # 'r|*' reads the archive as a stream with transparent compression
+    with tarfile.open(name=name, fileobj=fileobj, mode='r|*') as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            member_name = member.name
+            if member_name.endswith('.gz'):
+                opener = gzip.open
+                member_name = member_name[:-3]
+            else:
+                opener = None
+            if not member_name.endswith(('.json',) + JSONL_EXTENSIONS):
+                LOGGER.debug("Skipping " + member.name + " (not a JSON file)")
+                continue
+            LOGGER.info("Reading entries from " + member.name)
+            raw = archive.extractfile(member)
+            if opener is not None:
+                raw = opener(raw)
+            # Members of a streamed archive are not seekable, so no io.TextIOWrapper
+            stream = codecs.getreader('utf-8')(raw)
+            for entry in _iter_text(stream, member_name):
+                yield entry
+
+
+def is_multi_entry_source(source):
+    """
+    Check if a source is read with the streaming readers: STDIN, JSON lines, archives and
+    JSON files (optionally compressed) containing an array of entries.
+
+    :param source: path to the source or `-` for STDIN.
+    :type source: STRING
+    :rtype: BOOLEAN
+    """
+    if source == '-' or source.endswith(JSONL_EXTENSIONS + TAR_EXTENSIONS):
+        return True
+    return source.endswith(JSON_EXTENSIONS) and os.path.isfile(source) and \
+        is_json_array(source)
+
+
+def open_text(source):
+    """
+    Open a local file as UTF-8 text, decompressing gzip files.
+
+    :param source: path to the file.
+    :type source: STRING
+    :rtype: file object
+    """
+    if source.endswith('.gz'):
+        return gzip.open(source, 'rt', encoding='utf-8')
+    return open(source, 'r', encoding='utf-8')
+
+
+def is_json_array(source):
+    """
+    Check if a JSON file contains an array (several entries) without reading all of it.
+
+    :param source: path to the file.
+    :type source: STRING
+    :rtype: BOOLEAN
+    """
+    with open_text(source) as stream:
+        while True:
+            char = stream.read(1)
+            if not char or not char.isspace():
+                return char == '['
+
+
+def iter_entries(source):
+    """
+    Read all entries of a source.
+
+    :param source: path to the source or `-` for STDIN.
+    :type source: STRING
+    :return: generator of entries (JSON of https://bio.tools).
+    :rtype: GENERATOR of DICT
+    """
+    LOGGER.info("Reading entries from " + source)
+    if source == '-':
+        for entry in iter_json_stream(sys.stdin):
+            yield entry
+    elif source.endswith(TAR_EXTENSIONS):
+        for entry in iter_tar(name=source):
+            yield entry
+    else:
+        with open_text(source) as stream:
+            name = source[:-3] if source.endswith('.gz') else source
+            for entry in _iter_text(stream, name):
+                yield entry
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+
+"""
+Content-addressed cache of rendered tools (Galaxy XML or CWL).
+
+A tool is stored under a hash of what it is rendered from: the content of the entry that
+is used by the rendering (name, ID, description, homepage, language, topics,
+publications, EDAM annotation and data of the function, and the version of the tool for
+Galaxy), the format, the EDAM to Galaxy mapping and the ToolDog version. Different
+versions of a tool, or runs with the same options, then share the same rendered bytes.
+
+Tools are stored in a SQLite database which can be shared by several processes. The least
+recently used tools are evicted above the maximum size.
+"""
+
+#  Import  ------------------------------
+
+# General libraries
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+# Class and Objects
+from tooldog import __version__
+from tooldog.cache import cache_dir
+
+#  Constant(s)  ------------------------------
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 200 * 1024 * 1024
+
+# Cache used by :func:`tooldog.main.render_xml` and :func:`tooldog.main.render_cwl` when
+# none is given
+_DEFAULT_CACHE = None
+# Digests of the mappings already hashed, by id (the mapping is kept so its id is not
+# reused)
+_MAPPING_DIGESTS = {}
+_MAPPING_DIGESTS_LOCK = threading.Lock()
+
+#  Function(s)  ------------------------------
+
+
+def configure(path=None, max_size=DEFAULT_MAX_SIZE):
+    """
+    Enable the default render cache of the process.
+
+    :param path: path to the cache database (default: `render/tools.sqlite` in the ToolDog
+        cache directory).
+    :type path: STRING
+    :param max_size: maximum size in bytes of the stored tools.
+    :type max_size: INT
+    :return: the default cache.
+    :rtype: :class:`tooldog.render_cache.RenderCache`
+    """
+    global _DEFAULT_CACHE
+    _DEFAULT_CACHE = RenderCache(path, max_size=max_size)
+    return _DEFAULT_CACHE
+
+
+def disable():
+    """
+    Disable the default render cache of the process.
+    """
+    global _DEFAULT_CACHE
+    _DEFAULT_CACHE = None
+
+
+def get_default_cache():
+    """
+    :return: the default render cache of the process, None if it is not enabled.
+    :rtype: :class:`tooldog.render_cache.RenderCache`
+    """
+    return _DEFAULT_CACHE
+
+
+def _edam(edam):
+    """
+    :return: URI and term of an EDAM annotation.
+    :rtype: LIST
+    """
+    return [edam.uri, edam.term]
+
+
+def _data(data):
+    """
+    :return: content of an input or output used by the rendering.
+    :rtype: DICT
+    """
+    return {'data_type': _edam(data.data_type),
+            'formats': [_edam(format_obj) for format_obj in data.formats],
+            'description': data.description}
+
+
+def render_content(biotool, function, fmt):
+    """
+    Content of an entry used to render the tool of one of its functions. Missing DOIs of
+    publications are resolved, as for the rendering.
+
+    :param biotool: Biotool object.
+    :type biotool: :class:`tooldog.biotool_model.Biotool`
+    :param function: function described by the tool.
+    :type function: :class:`tooldog.biotool_model.Function`
+    :param fmt: 'galaxy' or 'cwl'.
+    :type fmt: STRING
+    :rtype: DICT
+    """
+    content = {'name': biotool.name, 'tool_id': biotool.tool_id,
+               'description': biotool.description, 'homepage': biotool.homepage,
+               'language': biotool.informations.language,
+               'topics': [_edam(topic) for topic in biotool.topics],
+               'publications': [[publication.doi, publication.pmid, publication.pmcid]
+                                for publication in biotool.informations.publications],
+               'inputs': [_data(inpt) for inpt in function.inputs],
+               'outputs': [_data(output) for output in function.outputs]}
+    if fmt == 'galaxy':
+        # The Galaxy tool has a version and the operations of all functions
+        content['version'] = biotool.version
+        content['operations'] = [_edam(operation) for other in biotool.functions
+                                 for operation in other.operations]
+    return content
+
+
+def mapping_digest(etog):
+    """
+    Digest of an EDAM to Galaxy mapping (versions and datatypes), computed once per
+    mapping.
+
+    :param etog: mapping between EDAM and Galaxy datatypes.
+    :type etog: :class:`tooldog.annotate.edam_to_galaxy.EdamToGalaxy`
+    :rtype: STRING
+    """
+    with _MAPPING_DIGESTS_LOCK:
+        known = _MAPPING_DIGESTS.get(id(etog))
+        if known is not None and known[0] is etog:
+            return known[1]
+        mapping = {'galaxy_url': etog.galaxy_url, 'galaxy_version': etog.galaxy_version,
+                   'edam_version': etog.edam_version,
+                   'format': sorted(etog.format_to_datatype.items()),
+                   'data': sorted(etog.data_to_datatype.items())}
+        digest = hashlib.sha256(json.dumps(mapping, sort_keys=True).encode('utf-8'))
+        _MAPPING_DIGESTS[id(etog)] = (etog, digest.hexdigest())
+        return digest.hexdigest()
+
+
+def render_key(biotool, function, fmt, etog=None):
+    """
+    Key of the tool of one function of an entry in the render cache.
+
+    :param biotool: Biotool object.
+    :type biotool: :class:`tooldog.biotool_model.Biotool`
+    :param function: function described by the tool.
+    :type function: :class:`tooldog.biotool_model.Function`
+    :param fmt: 'galaxy' or 'cwl'.
+    :type fmt: STRING
+    :param etog: mapping between EDAM and Galaxy datatypes (Galaxy only).
+    :type etog: :class:`tooldog.annotate.edam_to_galaxy.EdamToGalaxy`
+    :return: SHA-256 of the content, format, mapping and ToolDog version.
+    :rtype: STRING
+    """
+    key = {'content': render_content(biotool, function, fmt), 'format': fmt,
+           'mapping': mapping_digest(etog) if etog is not None else None,
+           'tooldog_version': __version__}
+    normalized = json.dumps(key, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+#  Class(es)  ------------------------------
+
+
+class RenderCache(object):
+    """
+    Cache of rendered tools stored in SQLite.
+    """
+
+    def __init__(self, path=None, max_size=DEFAULT_MAX_SIZE):
+        """
+        :param path: path to the cache database.
+        :type path: STRING
+        :param max_size: maximum size in bytes of the stored tools.
+        :type max_size: INT
+        """
+        if path is None:
+            path = os.path.join(cache_dir('render'), 'tools.sqlite')
+        self.path = path
+        self.max_size = max_size
+        self.stats = {'hits': 0, 'misses': 0}
+        self._local = threading.local()
+        self._connect()
+
+    def _connect(self):
+        """
+        Connection to the database, one per process and thread.
+        """
+        if getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=60)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS tools (key TEXT PRIMARY KEY, ' +
+                         'content BLOB, size INTEGER, accessed_at REAL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS accessed ON tools (accessed_at)')
+            conn.commit()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return self._local.conn
+
+    def lookup(self, key):
+        """
+        Get a rendered tool and mark it as used.
+
+        :param key: key of the tool (see :func:`tooldog.render_cache.render_key`).
+        :type key: STRING
+        :return: content of the tool, None if missing.
+        :rtype: BYTES
+        """
+        conn = self._connect()
+        row = conn.execute('SELECT content FROM tools WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        with conn:
+            conn.execute('UPDATE tools SET accessed_at = ? WHERE key = ?', (time.time(), key))
+        return bytes(row[0])
+
+    def store(self, key, content):
+        """
+        Store a rendered tool and evict old ones if the cache is too big.
+
+        :param key: key of the tool.
+        :type key: STRING
+        :param content: content of the tool.
+        :type content: BYTES
+        """
+        conn = self._connect()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO tools VALUES (?, ?, ?, ?)',
+                         (key, sqlite3.Binary(content), len(content), time.time()))
+        self.evict()
+
+    def evict(self):
+        """
+        Remove least recently used tools until the cache fits in max_size.
+        """
+        conn = self._connect()
+        with conn:
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM tools').fetchone()[0]
+            if total <= self.max_size:
+                return
+            rows = conn.execute('SELECT key, size FROM tools ORDER BY accessed_at')
+            to_remove = []
+            for key, size in rows.fetchall():
+                if total <= self.max_size:
+                    break
+                to_remove.append((key,))
+                total -= size
+            conn.executemany('DELETE FROM tools WHERE key = ?', to_remove)
+        LOGGER.debug(str(len(to_remove)) + " tools evicted from the render cache")
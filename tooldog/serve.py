@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+
+"""
+HTTP service converting bio.tools entries to Galaxy XML or CWL (`tooldog serve`).
+
+The service is a long-running process: the EDAM to Galaxy mapping, the HTTP client (and
+its connections to bio.tools) and the DOI cache are loaded once and shared by all
+requests. Conversions run in the threads of the server, at most `max_concurrency` at a
+time; a request waiting longer than `queue_timeout` for its turn gets a 503 response.
+
+Endpoints:
+
+* `GET /health`: state of the service (JSON).
+* `GET /tool/<id>[/<version>]?format=galaxy|cwl&function=N`: convert an entry of
+  bio.tools.
+* `POST /convert?format=galaxy|cwl&function=N`: convert the bio.tools entry (JSON) given
+  as body.
+
+Entries with several functions give one tool per function: `function` selects it
+(starting at 1) and the number of functions is sent in the `X-ToolDog-Functions` header.
+"""
+
+#  Import  ------------------------------
+
+# General libraries
+import sys
+import json
+import time
+import argparse
+import logging
+import threading
+import socketserver
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, unquote
+
+# Class and Objects
+from tooldog import __version__, main, doi, defaults
+from tooldog.main import EntryNotFoundError
+
+#  Constant(s)  ------------------------------
+
+LOGGER = logging.getLogger(__name__)
+
+FORMATS = {'galaxy': 'application/xml', 'cwl': 'text/x-yaml'}
+DEFAULT_FORMAT = 'galaxy'
+MAX_BODY_SIZE = 10 * 1024 * 1024  # Largest entry accepted by POST /convert
+DEFAULT_QUEUE_TIMEOUT = 30  # Seconds a request waits for its turn
+
+#  Function(s)  ------------------------------
+
+
+def parse_arguments(argv):
+    """
+    Defines parser for `tooldog serve`.
+
+    :param argv: arguments given after `serve`.
+    :type argv: LIST of STRING
+    """
+    parser = argparse.ArgumentParser(prog='tooldog serve',
+                                     description='Serve conversions of bio.tools entries ' +
+                                     'to Galaxy XML or CWL over HTTP.')
+    parser.add_argument('--host', dest='HOST', default='127.0.0.1',
+                        help='address the service listens on (default: 127.0.0.1).')
+    parser.add_argument('--port', dest='PORT', type=int, default=8000,
+                        help='port the service listens on (default: 8000).')
+    parser.add_argument('--max_concurrency', dest='MAX_CONCURRENCY', type=int,
+                        default=defaults.DEFAULT_POOL_SIZE,
+                        help='number of conversions run at the same time (default: ' +
+                        str(defaults.DEFAULT_POOL_SIZE) + ').')
+    parser.add_argument('--queue_timeout', dest='QUEUE_TIMEOUT', type=float,
+                        default=DEFAULT_QUEUE_TIMEOUT,
+                        help='seconds a request waits for a conversion slot before a 503 ' +
+                        'response (default: ' + str(DEFAULT_QUEUE_TIMEOUT) + ').')
+    parser.add_argument('--galaxy_url', dest='GALAXY_URL',
+                        help='Galaxy instance for the mapping of EDAM to Galaxy datatypes.')
+    parser.add_argument('--edam_url', dest='EDAM_URL',
+                        help='EDAM.owl file for the mapping of EDAM to Galaxy datatypes.')
+    parser.add_argument('--mapping_file', dest='MAPPING_FILE',
+                        help='local mapping of EDAM to Galaxy datatypes.')
+    parser.add_argument('--api_url', dest='API_URL', default=main.BIOTOOLS_API,
+                        help='URL of the bio.tools API (default: ' + main.BIOTOOLS_API + ').')
+    parser.add_argument('--http_cache', action='store_true', dest='HTTP_CACHE',
+                        help='keep the entries of bio.tools in the persistent HTTP cache.')
+    parser.add_argument('--render_cache', action='store_true', dest='RENDER_CACHE',
+                        help='keep the generated tools in the persistent render cache.')
+    parser.add_argument('--no_doi_cache', action='store_false', dest='DOI_CACHE',
+                        help='do not keep resolved DOIs in the persistent DOI cache.')
+    parser.add_argument('-v', '--verbose', action='store_true', dest='VERBOSE',
+                        help='display info on STDERR.')
+    try:
+        return parser.parse_args(argv)
+    except SystemExit:
+        sys.exit(1)
+
+
+def run_serve(argv):
+    """
+    Running function called by `tooldog serve` command line.
+
+    :param argv: arguments given after `serve`.
+    :type argv: LIST of STRING
+    """
+    args = parse_arguments(argv)
+    import logging.config
+    logging.config.dictConfig(main.config_logger(False, 'WARN', None, args.VERBOSE))
+    if args.HTTP_CACHE:
+        from tooldog import http_cache
+        http_cache.configure()
+    if args.DOI_CACHE:
+        doi.configure()
+    if args.RENDER_CACHE:
+        from tooldog import render_cache
+        render_cache.configure()
+    server = ToolDogServer((args.HOST, args.PORT), galaxy_url=args.GALAXY_URL,
+                           edam_url=args.EDAM_URL, mapping_json=args.MAPPING_FILE,
+                           api_url=args.API_URL, max_concurrency=args.MAX_CONCURRENCY,
+                           queue_timeout=args.QUEUE_TIMEOUT)
+    LOGGER.warning("Serving on http://" + args.HOST + ":" + str(server.server_address[1]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+#  Class(es)  ------------------------------
+
+
+class RequestError(Exception):
+    """
+    Error sent back to the client with a HTTP status.
+    """
+
+    def __init__(self, status, message, headers=None):
+        """
+        :param status: HTTP status of the response.
+        :type status: INT
+        :param message: description of the error.
+        :type message: STRING
+        :param headers: additional headers of the response.
+        :type headers: DICT
+        """
+        Exception.__init__(self, message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class ToolDogServer(socketserver.ThreadingMixIn, HTTPServer):
+    """
+    HTTP server keeping the mapping, the HTTP client and the DOI cache of the process warm
+    between conversions.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, server_address, galaxy_url=None, edam_url=None, mapping_json=None,
+                 api_url=main.BIOTOOLS_API, max_concurrency=defaults.DEFAULT_POOL_SIZE,
+                 queue_timeout=DEFAULT_QUEUE_TIMEOUT, session=None):
+        """
+        :param server_address: host and port the server listens on (port 0 picks a free
+            one).
+        :type server_address: TUPLE
+        :param galaxy_url: link to galaxy instance.
+        :type galaxy_url: STRING
+        :param edam_url: link to EDAM owl.
+        :type edam_url: STRING
+        :param mapping_json: local JSON mapping between EDAM and Galaxy datatypes.
+        :type mapping_json: STRING
+        :param api_url: URL of the bio.tools API.
+        :type api_url: STRING
+        :param max_concurrency: number of conversions run at the same time.
+        :type max_concurrency: INT
+        :param queue_timeout: seconds a request waits for a conversion slot.
+        :type queue_timeout: FLOAT
+        :param session: HTTP session used for the requests (default: shared client of
+            :mod:`tooldog.http_client`).
+        :type session: :class:`requests.Session`
+        """
+        self.galaxy_url = galaxy_url
+        self.edam_url = edam_url
+        self.mapping_json = mapping_json
+        self.api_url = api_url
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue_timeout = queue_timeout
+        if session is None:
+            from tooldog.http_client import get_client
+            session = get_client()
+        self.session = session
+        self.slots = threading.BoundedSemaphore(self.max_concurrency)
+        self.lock = threading.Lock()
+        self.counters = {'requests': 0, 'active': 0, 'rejected': 0, 'errors': 0}
+        self.started = time.time()
+        # Load the mapping before the first request
+        from tooldog.annotate.edam_to_galaxy import get_mapping
+        self.etog = get_mapping(galaxy_url=galaxy_url, edam_url=edam_url,
+                                mapping_json=mapping_json)
+        HTTPServer.__init__(self, server_address, ToolDogHandler)
+
+    def count(self, counter, step=1):
+        """
+        Change one of the counters of the server.
+
+        :param counter: name of the counter.
+        :type counter: STRING
+        :param step: value added to the counter.
+        :type step: INT
+        """
+        with self.lock:
+            self.counters[counter] += step
+
+    def health(self):
+        """
+        :return: state of the service.
+        :rtype: DICT
+        """
+        with self.lock:
+            counters = dict(self.counters)
+        health = {'status': 'ok', 'version': __version__,
+                  'uptime': round(time.time() - self.started, 3),
+                  'max_concurrency': self.max_concurrency,
+                  'mapping': {'galaxy_url': self.etog.galaxy_url,
+                              'galaxy_version': self.etog.galaxy_version,
+                              'edam_version': self.etog.edam_version},
+                  'doi_cache': doi.get_default_cache() is not None}
+        health.update(counters)
+        return health
+
+    def fetch_entry(self, tool_id, tool_version='latest'):
+        """
+        Get the JSON of an entry of bio.tools.
+
+        :param tool_id: ID of the tool.
+        :type tool_id: STRING
+        :param tool_version: Version of the tool.
+        :type tool_version: STRING
+        :return: JSON of the entry.
+        :rtype: DICT
+        """
+        try:
+            return main.json_from_biotools(tool_id, tool_version, session=self.session,
+                                           api_url=self.api_url)
+        except EntryNotFoundError as exc:
+            raise RequestError(404, str(exc))
+        except (IOError, ValueError) as exc:
+            # Connection errors of requests are IOError, invalid JSON are ValueError
+            raise RequestError(502, 'bio.tools could not be reached: ' + str(exc))
+
+    def convert(self, json_tool, fmt=DEFAULT_FORMAT, function_index=1):
+        """
+        Convert an entry once a conversion slot is free.
+
+        :param json_tool: JSON of the entry.
+        :type json_tool: DICT
+        :param fmt: 'galaxy' or 'cwl'.
+        :type fmt: STRING
+        :param function_index: function of the entry described by the tool (starting
+            at 1).
+        :type function_index: INT
+        :return: content of the tool and number of functions of the entry.
+        :rtype: TUPLE
+        """
+        if not self.slots.acquire(timeout=self.queue_timeout):
+            self.count('rejected')
+            raise RequestError(503, 'Too many conversions in progress.',
+                               {'Retry-After': str(max(1, int(self.queue_timeout)))})
+        self.count('active')
+        try:
+            try:
+                biotool = main.json_to_biotool(json_tool)
+            except (KeyError, TypeError, AttributeError) as exc:
+                raise RequestError(400, 'Invalid bio.tools entry: ' + repr(exc))
+            return self.render(biotool, fmt, function_index), len(biotool.functions)
+        finally:
+            self.count('active', -1)
+            self.slots.release()
+
+    def render(self, biotool, fmt=DEFAULT_FORMAT, function_index=1):
+        """
+        Write the tool of one function of an entry.
+
+        :param biotool: Biotool object.
+        :type biotool: :class:`tooldog.biotool_model.Biotool`
+        :param fmt: 'galaxy' or 'cwl'.
+        :type fmt: STRING
+        :param function_index: function described by the tool (starting at 1).
+        :type function_index: INT
+        :return: content of the tool.
+        :rtype: BYTES
+        """
+        if not biotool.functions:
+            raise RequestError(422, 'Entry ' + biotool.tool_id + ' has no function.')
+        try:
+            if fmt == 'galaxy':
+                rendered = main.render_xml(biotool, etog=self.etog, functions=[function_index])
+            else:
+                rendered = main.render_cwl(biotool, functions=[function_index])
+        except IndexError as exc:
+            raise RequestError(400, str(exc))
+        return rendered[0][1]
+
+
+class ToolDogHandler(BaseHTTPRequestHandler):
+    """
+    Answer requests of :class:`tooldog.serve.ToolDogServer`.
+    """
+    protocol_version = 'HTTP/1.1'
+    server_version = 'ToolDog/' + __version__
+
+    def send_body(self, status, body, content_type, headers=None):
+        """
+        Send a complete response.
+
+        :param status: HTTP status.
+        :type status: INT
+        :param body: content of the response.
+        :type body: BYTES
+        :param content_type: media type of the content.
+        :type content_type: STRING
+        :param headers: additional headers.
+        :type headers: DICT
+        """
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, content, headers=None):
+        """
+        Send a JSON response.
+        """
+        body = json.dumps(content, sort_keys=True).encode('utf-8')
+        self.send_body(status, body, 'application/json', headers)
+
+    def parse_query(self, query):
+        """
+        :return: format and function index asked in the query.
+        :rtype: TUPLE
+        """
+        params = parse_qs(query)
+        fmt = params.get('format', [DEFAULT_FORMAT])[-1]
+        if fmt not in FORMATS:
+            raise RequestError(400, 'Unknown format ' + fmt + ', use one of: ' +
+                               ', '.join(sorted(FORMATS)) + '.')
+        try:
+            function_index = int(params.get('function', ['1'])[-1])
+        except ValueError:
+            raise RequestError(400, 'function must be an integer.')
+        return fmt, function_index
+
+    def read_entry(self):
+        """
+        :return: JSON entry sent as body of the request.
+        :rtype: DICT
+        """
+        length = self.headers.get('Content-Length')
+        if length is None:
+            raise RequestError(411, 'Content-Length is required.')
+        try:
+            length = int(length)
+        except ValueError:
+            raise RequestError(400, 'Invalid Content-Length.')
+        if length > MAX_BODY_SIZE:
+            raise RequestError(413, 'Entry larger than ' + str(MAX_BODY_SIZE) + ' bytes.')
+        try:
+            json_tool = json.loads(self.rfile.read(length).decode('utf-8'))
+        except ValueError as exc:
+            raise RequestError(400, 'Invalid JSON: ' + str(exc))
+        if not isinstance(json_tool, dict):
+            raise RequestError(400, 'The body must be a bio.tools entry (JSON object).')
+        return json_tool
+
+    def handle_request(self, method):
+        """
+        Route a request and send its response (or the error it raised).
+
+        :param method: 'GET' or 'POST'.
+        :type method: STRING
+        """
+        self.server.count('requests')
+        url = urlsplit(self.path)
+        parts = [unquote(part) for part in url.path.split('/') if part]
+        try:
+            if method == 'GET' and parts == ['health']:
+                self.send_json(200, self.server.health())
+                return
+            if method == 'GET' and len(parts) in (2, 3) and parts[0] == 'tool':
+                fmt, function_index = self.parse_query(url.query)
+                json_tool = self.server.fetch_entry(*parts[1:])
+            elif method == 'POST' and parts == ['convert']:
+                fmt, function_index = self.parse_query(url.query)
+                json_tool = self.read_entry()
+            else:
+                raise RequestError(404, 'No endpoint ' + method + ' ' + url.path + '.')
+            content, nb_functions = self.server.convert(json_tool, fmt, function_index)
+            self.send_body(200, content, FORMATS[fmt],
+                           {'X-ToolDog-Functions': str(nb_functions)})
+        except RequestError as exc:
+            if method == 'POST':
+                # The body may not have been read
+                self.close_connection = True
+            self.send_json(exc.status, {'error': str(exc)}, exc.headers)
+        except Exception as exc:
+            self.server.count('errors')
+            LOGGER.exception("Conversion failed for " + method + " " + self.path)
+            self.send_json(500, {'error': exc.__class__.__name__ + ': ' + str(exc)})
+
+    def do_GET(self):
+        self.handle_request('GET')
+
+    def do_POST(self):
+        self.handle_request('POST')
+
+    def log_message(self, format, *args):
+        LOGGER.info(self.address_string() + ' ' + format % args)
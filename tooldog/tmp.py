@@ -1,4 +1,40 @@
+#!/usr/bin/env python3
+
+"""
+Temporary directory of a ToolDog run, created on first use.
+"""
+
+#  Import  ------------------------------
+
+# General libraries
+import shutil
 import tempfile
 
-global TMP_DIR
-TMP_DIR = tempfile.mkdtemp()
\ No newline at end of file
+#  Constant(s)  ------------------------------
+
+_TMP_DIR = None
+
+#  Function(s)  ------------------------------
+
+
+def get_tmp_dir():
+    """
+    Get the temporary directory of the run, created the first time it is needed.
+
+    :return: path to the directory.
+    :rtype: STRING
+    """
+    global _TMP_DIR
+    if _TMP_DIR is None:
+        _TMP_DIR = tempfile.mkdtemp()
+    return _TMP_DIR
+
+
+def remove_tmp_dir():
+    """
+    Remove the temporary directory of the run if it was created.
+    """
+    global _TMP_DIR
+    if _TMP_DIR is not None:
+        shutil.rmtree(_TMP_DIR, ignore_errors=True)
+        _TMP_DIR = None